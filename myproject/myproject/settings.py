@@ -11,15 +11,21 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Load environment variables from the nearest .env file (next to this file,
+# the project or the repository root; see .env-example). python-dotenv is only
+# imported when there is one, so containers configured through the real
+# environment don't pay for it at startup.
+for _env_file in (Path(__file__).resolve().parent / '.env', BASE_DIR / '.env', BASE_DIR.parent / '.env'):
+    if _env_file.is_file():
+        from dotenv import load_dotenv
+        load_dotenv(_env_file)
+        break
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -90,16 +96,19 @@ DATABASES = {
     }
 }
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': os.getenv('DB_ENGINE'),
-#         'NAME': os.getenv('DB_NAME'),
-#         'USER': os.getenv('DB_USER'),
-#         'PASSWORD': os.getenv('DB_PASSWORD'),
-#         'HOST': os.getenv('DB_HOST'),
-#         'PORT': os.getenv('DB_PORT'),
-#     }
-# }
+# Set DB_ENGINE (e.g. django.db.backends.postgresql) to use another database,
+# such as for running the PostgreSQL-only partitioning tests.
+if os.getenv('DB_ENGINE'):
+    DATABASES = {
+        'default': {
+            'ENGINE': os.getenv('DB_ENGINE'),
+            'NAME': os.getenv('DB_NAME'),
+            'USER': os.getenv('DB_USER'),
+            'PASSWORD': os.getenv('DB_PASSWORD'),
+            'HOST': os.getenv('DB_HOST'),
+            'PORT': os.getenv('DB_PORT'),
+        }
+    }
 
 
 
@@ -154,3 +163,17 @@ LOGIN_URL = '/login/' # Or use reverse_lazy('login') after importing it
 LOGIN_REDIRECT_URL = '/profile/'
 LOGOUT_REDIRECT_URL = '/login/'
 AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+
+# JSON encoder used by users.responses.FastJsonResponse. 'auto' uses orjson
+# when it is installed and falls back to the standard library otherwise.
+USERS_JSON_ENCODER = 'auto'
+
+# Edge length in pixels of the square profile-picture thumbnails shown on the
+# boards (see users/thumbnails.py).
+USERS_AVATAR_THUMBNAIL_SIZE = 64
+
+# Background job queue (users/jobs.py, `manage.py run_workers`): how long
+# finished results are kept, and the base delay before retrying a failed job
+# (doubled on every further attempt). Both in seconds.
+USERS_JOB_RESULT_TTL = 24 * 60 * 60
+USERS_JOB_RETRY_DELAY = 30
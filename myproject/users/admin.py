@@ -2,6 +2,8 @@ from django.contrib import admin
 from .models import TodoItem, Project, ProjectMembership, UserProfile
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from .admin_actions import add_members, close_tasks, reassign_tasks, remove_members
+from .admin_tools import FastChangeListMixin, OwnerFilter, ProjectFilter, TaskProjectFilter, UserFilter
 
 # Register your models here.
 
@@ -15,30 +17,36 @@ class ProjectMembershipInline(admin.TabularInline):
 class ProjectAdmin(admin.ModelAdmin):
     list_display = ('name', 'owner', 'created_at', 'updated_at')
     search_fields = ('name', 'description', 'owner__username')
-    list_filter = ('owner', 'created_at', 'updated_at')
+    list_filter = (OwnerFilter, 'created_at', 'updated_at')
+    list_select_related = ('owner',)
     inlines = [ProjectMembershipInline]
+    actions = [add_members, remove_members]
     autocomplete_fields = ['owner'] # For easier owner selection
 
 @admin.register(ProjectMembership)
 class ProjectMembershipAdmin(admin.ModelAdmin):
     list_display = ('project', 'user', 'date_joined')
-    list_filter = ('project', 'user', 'date_joined')
+    list_filter = (ProjectFilter, UserFilter, 'date_joined')
+    list_select_related = ('project', 'user')
     autocomplete_fields = ['project', 'user']
 
 from .models import TodoItem, Project, ProjectMembership, UserProfile, TodoLog
 
 @admin.register(TodoLog)
-class TodoLogAdmin(admin.ModelAdmin):
+class TodoLogAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ('todo_item', 'task_date', 'log_time', 'notes')
-    list_filter = ('task_date', 'todo_item__project')
+    list_filter = ('task_date', TaskProjectFilter)
+    list_select_related = ('todo_item',)
     search_fields = ('notes', 'todo_item__title')
     autocomplete_fields = ['todo_item']
 
 @admin.register(TodoItem)
-class TodoItemAdmin(admin.ModelAdmin):
+class TodoItemAdmin(FastChangeListMixin, admin.ModelAdmin):
     list_display = ('title', 'project', 'status', 'user', 'created_at', 'updated_at')
-    list_filter = ('status', 'project', 'user', 'created_at', 'updated_at')
+    list_filter = ('status', ProjectFilter, UserFilter, 'created_at', 'updated_at')
+    list_select_related = ('project', 'user')
     search_fields = ('title', 'description')
+    actions = [reassign_tasks, close_tasks]
     readonly_fields = ('created_at', 'updated_at')
     autocomplete_fields = ['user', 'project']
 
@@ -53,9 +61,13 @@ class UserProfileInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = (UserProfileInline, )
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'get_profile_bio') # Example custom field
+    list_select_related = ('profile',)
 
     def get_profile_bio(self, instance):
-        return instance.profile.bio
+        try:
+            return instance.profile.bio
+        except UserProfile.DoesNotExist:  # Not backfilled yet; see `manage.py backfill_profiles`.
+            return ''
     get_profile_bio.short_description = 'Bio'
 
 # Re-register User model
@@ -64,3 +76,12 @@ admin.site.register(User, UserAdmin)
 
 # Register UserProfile if you want a separate admin page for it (optional, as it's inlined)
 # admin.site.register(UserProfile)
+
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'user', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    list_select_related = ('user',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
@@ -0,0 +1,127 @@
+"""
+Bulk admin actions for onboarding teams and shuffling work around.
+
+Each action that needs input renders an intermediate form (the same pattern
+as Django's delete confirmation page). On submit it makes set-based writes
+instead of one save per row:
+- memberships go in with ``bulk_create(ignore_conflicts=True)``;
+- removals are deleted with the bookkeeping receivers deferred;
+- task moves go through ``bulk_reassign``;
+- closing tasks goes through ``bulk_set_status``.
+"""
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.widgets import AutocompleteSelect, AutocompleteSelectMultiple
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.template.response import TemplateResponse
+
+from .deferred import defer_signals
+from .models import Project, ProjectMembership, TodoItem
+from .status_history import bulk_reassign, bulk_set_status
+
+
+class ProjectMembersForm(forms.Form):
+    users = forms.ModelMultipleChoiceField(
+        queryset=User.objects.all(),
+        widget=AutocompleteSelectMultiple(ProjectMembership._meta.get_field('user'), admin.site),
+    )
+
+
+class ReassignTasksForm(forms.Form):
+    user = forms.ModelChoiceField(
+        queryset=User.objects.all(), required=False, label='New owner',
+        widget=AutocompleteSelect(TodoItem._meta.get_field('user'), admin.site),
+    )
+    project = forms.ModelChoiceField(
+        queryset=Project.objects.all(), required=False, label='New project',
+        widget=AutocompleteSelect(TodoItem._meta.get_field('project'), admin.site),
+    )
+    remove_project = forms.BooleanField(required=False, label='Remove from their project')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('project') and cleaned_data.get('remove_project'):
+            raise forms.ValidationError('Pick a new project or remove the project, not both.')
+        if not (cleaned_data.get('user') or cleaned_data.get('project') or cleaned_data.get('remove_project')):
+            raise forms.ValidationError('Choose a new owner or project.')
+        return cleaned_data
+
+    def changes(self):
+        changes = {}
+        if self.cleaned_data['user']:
+            changes['user_id'] = self.cleaned_data['user'].id
+        if self.cleaned_data['project']:
+            changes['project_id'] = self.cleaned_data['project'].id
+        elif self.cleaned_data['remove_project']:
+            changes['project_id'] = None
+        return changes
+
+
+def _intermediate_form(modeladmin, request, queryset, form_class, title):
+    """
+    The bound form once the intermediate page was submitted, or a
+    TemplateResponse showing it (again, with errors).
+    """
+    form = form_class(request.POST if 'apply' in request.POST else None)
+    if 'apply' in request.POST and form.is_valid():
+        return form, None
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        'title': title,
+        'opts': modeladmin.model._meta,
+        'form': form,
+        'media': modeladmin.media + form.media,
+        'queryset': queryset,
+        'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+        'select_across': request.POST.get('select_across', '0'),
+        'action': request.POST.get('action'),
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    }
+    return None, TemplateResponse(request, 'admin/users/bulk_action_form.html', context)
+
+
+@admin.action(description='Add users to selected projects', permissions=['change'])
+def add_members(modeladmin, request, queryset):
+    form, response = _intermediate_form(modeladmin, request, queryset, ProjectMembersForm, 'Add users to projects')
+    if response:
+        return response
+    project_ids = list(queryset.values_list('id', flat=True))
+    users = form.cleaned_data['users']
+    with transaction.atomic(), defer_signals() as pending:
+        # bulk_create sends no post_save, so member counts are caught up on exit.
+        ProjectMembership.objects.bulk_create(
+            [ProjectMembership(project_id=project_id, user=user) for project_id in project_ids for user in users],
+            ignore_conflicts=True,
+        )
+        for project_id in project_ids:
+            pending.note_project(project_id)
+    modeladmin.message_user(request, f'Added {len(users)} user(s) to {len(project_ids)} project(s).', messages.SUCCESS)
+
+
+@admin.action(description='Remove users from selected projects', permissions=['change'])
+def remove_members(modeladmin, request, queryset):
+    form, response = _intermediate_form(modeladmin, request, queryset, ProjectMembersForm, 'Remove users from projects')
+    if response:
+        return response
+    with transaction.atomic(), defer_signals():
+        removed, _by_model = ProjectMembership.objects.filter(
+            project__in=queryset, user__in=form.cleaned_data['users']
+        ).delete()
+    modeladmin.message_user(request, f'Removed {removed} membership(s).', messages.SUCCESS)
+
+
+@admin.action(description='Reassign selected tasks', permissions=['change'])
+def reassign_tasks(modeladmin, request, queryset):
+    form, response = _intermediate_form(modeladmin, request, queryset, ReassignTasksForm, 'Reassign tasks')
+    if response:
+        return response
+    moved = bulk_reassign(queryset, **form.changes())
+    modeladmin.message_user(request, f'Reassigned {moved} task(s).', messages.SUCCESS)
+
+
+@admin.action(description='Mark selected tasks as done', permissions=['change'])
+def close_tasks(modeladmin, request, queryset):
+    closed = bulk_set_status(queryset, 'done')
+    modeladmin.message_user(request, f'Closed {closed} task(s).', messages.SUCCESS)
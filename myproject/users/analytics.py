@@ -0,0 +1,289 @@
+"""
+Estimation and throughput analytics for managers.
+
+Columns are pulled with ``values_list`` and crunched in whole-array passes
+with NumPy when it is installed; otherwise plain-Python versions of the same
+algorithms give the same numbers (percentiles use NumPy's default linear
+interpolation). Nothing here touches model instances.
+
+* ``estimation_error``: distribution of (time_spent - estimate) / estimate
+  over tasks that have both.
+* ``velocity``: per user and week, estimated hours of tasks finished plus
+  hours logged.
+* ``burn_down``: remaining estimated hours per day.
+* ``blocker_dwell``: how long the tasks currently in Blocker have been there.
+
+Task completion isn't timestamped, so a done task counts as finished on its
+last update (``updated_at``). Blocker dwell is measured the same way.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .models import TodoItem, TodoLog
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Upper edges of the estimation error histogram buckets (as fractions of the
+# estimate); the last bucket is open-ended.
+ERROR_EDGES = [-0.5, -0.25, 0.0, 0.25, 0.5, 1.0, 2.0]
+ERROR_LABELS = ['< -50%', '-50% to -25%', '-25% to 0%', '0% to 25%', '25% to 50%', '50% to 100%', '100% to 200%', '> 200%']
+BLOCKER_TOP = 10
+
+
+def backend_name():
+    return 'numpy' if np is not None else 'python'
+
+
+def _percentile(sorted_values, q):
+    """Linear-interpolated percentile of pre-sorted values, like numpy.percentile."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+# Estimation error
+
+def estimation_error(rows):
+    """
+    ``rows`` are (user_id, estimation_time, time_spent) for tasks with a
+    positive estimate and some time spent.
+    """
+    rows = list(rows)
+    if not rows:
+        return {'count': 0, 'histogram': [{'label': label, 'count': 0} for label in ERROR_LABELS], 'by_user': {}}
+
+    if np is not None:
+        user_ids, estimates, spent = (np.array(column) for column in zip(*rows))
+        errors = (spent.astype(float) - estimates) / estimates
+        p10, median, p90 = np.percentile(errors, [10, 50, 90])
+        histogram = np.bincount(np.searchsorted(ERROR_EDGES, errors, side='right'), minlength=len(ERROR_LABELS))
+        users, inverse = np.unique(user_ids, return_inverse=True)
+        user_counts = np.bincount(inverse)
+        user_means = np.bincount(inverse, weights=errors) / user_counts
+        summary = {
+            'mean': float(errors.mean()),
+            'median': float(median), 'p10': float(p10), 'p90': float(p90),
+            'within_25_percent': float(np.mean(np.abs(errors) <= 0.25)),
+            'histogram': histogram.tolist(),
+            'by_user': {int(user): (int(count), float(mean)) for user, count, mean in zip(users, user_counts, user_means)},
+        }
+    else:
+        errors = [(spent - estimate) / estimate for _user, estimate, spent in rows]
+        ordered = sorted(errors)
+        histogram = [0] * len(ERROR_LABELS)
+        per_user = {}
+        for (user_id, _estimate, _spent), error in zip(rows, errors):
+            histogram[bisect_right(ERROR_EDGES, error)] += 1
+            count, total = per_user.get(user_id, (0, 0.0))
+            per_user[user_id] = (count + 1, total + error)
+        summary = {
+            'mean': sum(errors) / len(errors),
+            'median': _percentile(ordered, 50), 'p10': _percentile(ordered, 10), 'p90': _percentile(ordered, 90),
+            'within_25_percent': sum(1 for error in errors if abs(error) <= 0.25) / len(errors),
+            'histogram': histogram,
+            'by_user': {user_id: (count, total / count) for user_id, (count, total) in sorted(per_user.items())},
+        }
+
+    summary['count'] = len(rows)
+    summary['histogram'] = [{'label': label, 'count': count} for label, count in zip(ERROR_LABELS, summary['histogram'])]
+    return summary
+
+
+# Velocity
+
+def _weekly_totals(rows, first_monday, weeks):
+    """
+    Sum ``(user_id, day, amount)`` rows into a {user_id: [per-week totals]}
+    grid of ``weeks`` weeks starting at ``first_monday``. Rows outside the
+    grid are ignored.
+    """
+    rows = [(user_id, day.toordinal(), amount) for user_id, day, amount in rows if day is not None]
+    origin = first_monday.toordinal()
+    if np is not None and rows:
+        user_ids, ordinals, amounts = (np.array(column) for column in zip(*rows))
+        week_index = (ordinals - origin) // 7
+        inside = (week_index >= 0) & (week_index < weeks)
+        users, inverse = np.unique(user_ids[inside], return_inverse=True)
+        cells = np.bincount(
+            inverse * weeks + week_index[inside], weights=amounts[inside].astype(float), minlength=len(users) * weeks,
+        ).reshape(len(users), weeks)
+        return {int(user): cells[row].tolist() for row, user in enumerate(users)}
+
+    grid = {}
+    for user_id, ordinal, amount in rows:
+        week = (ordinal - origin) // 7
+        if 0 <= week < weeks:
+            grid.setdefault(user_id, [0.0] * weeks)[week] += amount
+    return dict(sorted(grid.items()))
+
+
+def velocity(done_rows, log_rows, start, end):
+    """
+    Weekly per-user velocity between ``start`` and ``end``.
+
+    ``done_rows`` are (user_id, finished_on, estimation_time) for done tasks;
+    ``log_rows`` are (user_id, task_date, log_time).
+    """
+    first_monday = start - timedelta(days=start.weekday())
+    weeks = (end - first_monday).days // 7 + 1
+    completed = _weekly_totals(done_rows, first_monday, weeks)
+    logged = _weekly_totals(log_rows, first_monday, weeks)
+    users = {}
+    for user_id in sorted(completed.keys() | logged.keys()):
+        completed_weeks = completed.get(user_id, [0.0] * weeks)
+        logged_weeks = logged.get(user_id, [0.0] * weeks)
+        users[user_id] = {
+            'completed': completed_weeks,
+            'logged': logged_weeks,
+            'average_completed': sum(completed_weeks) / weeks,
+            'average_logged': sum(logged_weeks) / weeks,
+        }
+    return {'weeks': [first_monday + timedelta(weeks=week) for week in range(weeks)], 'users': users}
+
+
+# Burn-down
+
+def burn_down(rows, start, end):
+    """
+    Remaining estimated hours at the end of each day from ``start`` to
+    ``end``. ``rows`` are (created_on, finished_on or None, estimation_time).
+    """
+    days = (end - start).days + 1
+    if days <= 0:
+        return []
+    created = sorted((created_on.toordinal(), estimate) for created_on, _finished, estimate in rows)
+    finished = sorted((finished_on.toordinal(), estimate) for _created, finished_on, estimate in rows if finished_on)
+    first = start.toordinal()
+
+    if np is not None:
+        day_ordinals = np.arange(first, first + days)
+
+        def cumulative(events):
+            if not events:
+                return np.zeros(days)
+            ordinals, amounts = (np.array(column) for column in zip(*events))
+            totals = np.concatenate(([0.0], np.cumsum(amounts, dtype=float)))
+            return totals[np.searchsorted(ordinals, day_ordinals, side='right')]
+
+        remaining = (cumulative(created) - cumulative(finished)).tolist()
+    else:
+        def cumulative(events):
+            ordinals = [ordinal for ordinal, _amount in events]
+            totals = [0.0]
+            for _ordinal, amount in events:
+                totals.append(totals[-1] + amount)
+            return [totals[bisect_right(ordinals, first + offset)] for offset in range(days)]
+
+        remaining = [added - done for added, done in zip(cumulative(created), cumulative(finished))]
+
+    return [{'day': start + timedelta(days=offset), 'remaining': hours} for offset, hours in enumerate(remaining)]
+
+
+# Blocker dwell time
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECONDS_PER_DAY = 86400 * 10 ** 6
+
+
+def _microseconds(moment):
+    # Integer arithmetic keeps both backends bit-for-bit identical.
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return (moment - _EPOCH) // timedelta(microseconds=1)
+
+
+def blocker_dwell(rows, now):
+    """``rows`` are (task_id, title, blocked_since) for tasks now in Blocker."""
+    rows = list(rows)
+    if not rows:
+        return {'count': 0, 'longest': []}
+    if np is not None:
+        since = np.array([_microseconds(blocked_since) for _id, _title, blocked_since in rows], dtype=np.int64)
+        dwell = (_microseconds(now) - since) / _MICROSECONDS_PER_DAY
+        order = np.argsort(-dwell, kind='stable')[:BLOCKER_TOP]
+        stats = {'mean_days': float(dwell.mean()), 'median_days': float(np.median(dwell)), 'max_days': float(dwell.max())}
+        longest = [(rows[index], float(dwell[index])) for index in order]
+    else:
+        dwell = [(_microseconds(now) - _microseconds(blocked_since)) / _MICROSECONDS_PER_DAY for _id, _title, blocked_since in rows]
+        ordered = sorted(dwell)
+        stats = {'mean_days': sum(dwell) / len(dwell), 'median_days': _percentile(ordered, 50), 'max_days': ordered[-1]}
+        order = sorted(range(len(rows)), key=lambda index: -dwell[index])[:BLOCKER_TOP]
+        longest = [(rows[index], dwell[index]) for index in order]
+    return {
+        'count': len(rows),
+        **stats,
+        'longest': [{'id': task_id, 'title': title, 'days': days} for (task_id, title, _since), days in longest],
+    }
+
+
+# Report
+
+def analytics_report(project_id=None, start=None, end=None, today=None, now=None):
+    """
+    Everything the staff analytics page and `manage.py task_analytics` show,
+    for one project or all of them, over [start, end] (default: the last 12
+    weeks).
+    """
+    today = today or date.today()
+    now = now or timezone.now()
+    end = end or today
+    start = start or end - timedelta(weeks=12) + timedelta(days=1)
+
+    tasks = TodoItem.objects.all()
+    logs = TodoLog.objects.filter(task_date__gte=start, task_date__lte=end)
+    if project_id is not None:
+        tasks = tasks.filter(project_id=project_id)
+        logs = logs.filter(todo_item__project_id=project_id)
+
+    errors = estimation_error(
+        tasks.filter(estimation_time__gt=0, time_spent__gt=0).values_list('user_id', 'estimation_time', 'time_spent')
+    )
+    done_rows = [
+        (user_id, _to_date(updated_at), estimate)
+        for user_id, updated_at, estimate in tasks.filter(status='done').values_list('user_id', 'updated_at', 'estimation_time')
+    ]
+    velocities = velocity(done_rows, logs.values_list('todo_item__user_id', 'task_date', 'log_time'), start, end)
+    burn_rows = [
+        (_to_date(created_at), _to_date(updated_at) if status == 'done' else None, estimate)
+        for created_at, updated_at, status, estimate in tasks.filter(estimation_time__gt=0).values_list(
+            'created_at', 'updated_at', 'status', 'estimation_time'
+        )
+    ]
+    blockers = blocker_dwell(tasks.filter(status='blocker').values_list('id', 'title', 'updated_at'), now)
+
+    user_ids = set(velocities['users']) | set(errors['by_user'])
+    usernames = dict(User.objects.filter(id__in=user_ids).values_list('id', 'username'))
+    return {
+        'backend': backend_name(),
+        'start': start,
+        'end': end,
+        'estimation_error': {
+            **errors,
+            'by_user': [
+                {'user_id': user_id, 'username': usernames.get(user_id, ''), 'count': count, 'mean_error': mean}
+                for user_id, (count, mean) in errors['by_user'].items()
+            ],
+        },
+        'velocity': {
+            'weeks': velocities['weeks'],
+            'users': [
+                {'user_id': user_id, 'username': usernames.get(user_id, ''), **values}
+                for user_id, values in velocities['users'].items()
+            ],
+        },
+        'burn_down': burn_down(burn_rows, start, end),
+        'blocker_dwell': blockers,
+    }
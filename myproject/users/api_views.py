@@ -1,29 +1,44 @@
-from django.http import JsonResponse
-from django.contrib.auth.decorators import login_required
-from .models import Project, TodoItem, TodoLog
-from django.contrib.auth.models import User
-from datetime import date, timedelta
 import json
-from django.http import JsonResponse
+from datetime import date, timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db.models import Q, Sum
+from django.http import FileResponse, Http404, HttpResponseForbidden
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from . import jobs
+from .avatars import get_avatar_url, get_avatar_urls
+from .identity import accessible_project_or_404, identity_map
+from .models import Job, Project, TodoItem, TodoLog
+from .responses import FastJsonResponse, records
+from .standup import standup_summary
+from .status_history import cumulative_flow
+from .timeseries import GRANULARITIES, MAX_BUCKETS, bucket_starts, logged_hours_series
 
 @login_required
 def current_user_api(request):
-    return JsonResponse({'user_id': request.user.id})
+    return FastJsonResponse({'user_id': request.user.id})
 
 @login_required
 def project_list_api(request):
-    projects = Project.objects.filter(members=request.user)
-    projects_data = [{'id': project.id, 'name': project.name} for project in projects]
-    return JsonResponse(projects_data, safe=False)
+    columns = ('id', 'name')
+    projects = Project.objects.filter(members=request.user).values_list(*columns)
+    return FastJsonResponse(records(columns, projects), safe=False)
 
 @login_required
 def project_users_api(request, project_id):
-    project = Project.objects.get(id=project_id)
-    users = project.members.filter(id=request.user.id)
-    users_data = [{'id': user.id, 'username': user.username, 'email': user.email} for user in users]
-    return JsonResponse(users_data, safe=False)
+    project = identity_map(request).project(project_id)
+    columns = ('id', 'username', 'email')
+    users_data = records(columns, project.members.filter(id=request.user.id).values_list(*columns))
+    avatar_urls = get_avatar_urls(user['id'] for user in users_data)
+    for user in users_data:
+        user['profile_picture_url'] = avatar_urls[user['id']]
+    return FastJsonResponse(users_data, safe=False)
 
-from django.core.paginator import Paginator
 
 @login_required
 def project_tasks_api(request, project_id):
@@ -33,22 +48,13 @@ def project_tasks_api(request, project_id):
     if search_query:
         tasks_query = tasks_query.filter(title__icontains=search_query)
 
-    paginator = Paginator(tasks_query, 10) # 10 tasks per page
+    columns = ('id', 'title', 'description', 'status', 'user_id', 'estimation_time', 'time_spent')
+    paginator = Paginator(tasks_query.values_list(*columns), 10) # 10 tasks per page
     page_number = request.GET.get('page', 1)
     page_obj = paginator.get_page(page_number)
 
-    tasks_data = [{
-        'id': task.id,
-        'title': task.title,
-        'description': task.description,
-        'status': task.status,
-        'user_id': task.user.id,
-        'estimation_time': task.estimation_time,
-        'time_spent': task.time_spent
-    } for task in page_obj.object_list]
-
-    return JsonResponse({
-        'tasks': tasks_data,
+    return FastJsonResponse({
+        'tasks': records(columns, page_obj.object_list),
         'has_next': page_obj.has_next(),
         'has_previous': page_obj.has_previous(),
         'total_pages': paginator.num_pages,
@@ -70,14 +76,14 @@ def log_time_api_updated(request):
         else:
             log_date = date_str
 
-        task = TodoItem.objects.get(id=task_id)
+        task = identity_map(request).task(task_id)
         TodoLog.objects.create(
             todo_item=task,
             log_time=log_time,
             task_date=log_date
         )
-        return JsonResponse({'success': True})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'success': True})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def update_log_api_updated(request, log_id):
@@ -90,18 +96,18 @@ def update_log_api_updated(request, log_id):
             log.task_date = data['task_date']
         log.save()
 
-        task = log.todo_item
+        task = identity_map(request).related(log, 'todo_item')
         task.time_spent = task.logs.aggregate(Sum('log_time'))['log_time__sum'] or 0
         task.save()
 
         total_log_time_today = task.logs.filter(task_date=date.today()).aggregate(Sum('log_time'))['log_time__sum'] or 0
 
-        return JsonResponse({
+        return FastJsonResponse({
             'success': True,
             'total_time_spent': task.time_spent,
             'total_log_time': total_log_time_today,
         })
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def project_tasks_by_date_api(request, project_id, date_str):
@@ -110,23 +116,14 @@ def project_tasks_by_date_api(request, project_id, date_str):
     else:
         log_date = date.today()
 
-    tasks = TodoItem.objects.filter(project_id=project_id, user=request.user, logs__task_date=log_date).distinct()
-    tasks_data = []
-    for task in tasks:
-        total_log_time = task.logs.filter(task_date=log_date).aggregate(Sum('log_time'))['log_time__sum'] or 0
-        tasks_data.append({
-            'id': task.id,
-            'title': task.title,
-            'description': task.description,
-            'status': task.status,
-            'user_id': task.user.id,
-            'estimation_time': task.estimation_time,
-            'time_spent': task.time_spent,
-            'total_log_time': total_log_time
-        })
-    return JsonResponse(tasks_data, safe=False)
+    # Filtering on logs__task_date before annotating restricts the Sum to that
+    # day's logs, so every task's total comes out of a single grouped query.
+    columns = ('id', 'title', 'description', 'status', 'user_id', 'estimation_time', 'time_spent', 'total_log_time')
+    tasks = TodoItem.objects.filter(
+        project_id=project_id, user=request.user, logs__task_date=log_date
+    ).values_list(*columns[:-1]).annotate(total_log_time=Sum('logs__log_time')).order_by('id')
+    return FastJsonResponse(records(columns, tasks), safe=False)
 
-from django.db.models import Sum
 
 @login_required
 def user_stats_api(request, project_id, user_id, date_str):
@@ -141,7 +138,7 @@ def user_stats_api(request, project_id, user_id, date_str):
     tasks = TodoItem.objects.filter(project_id=project_id, user_id=user_id, logs__task_date=log_date).distinct()
     total_estimation_time = tasks.aggregate(Sum('estimation_time'))['estimation_time__sum'] or 0
 
-    return JsonResponse({
+    return FastJsonResponse({
         'total_estimation_time': total_estimation_time,
         'total_time_spent': total_time_spent
     })
@@ -150,7 +147,7 @@ def user_stats_api(request, project_id, user_id, date_str):
 def delete_log_api_updated(request, log_id):
     if request.method == 'POST':
         log = TodoLog.objects.get(id=log_id)
-        task = log.todo_item
+        task = identity_map(request).related(log, 'todo_item')
         log.delete()
 
         task.time_spent = task.logs.aggregate(Sum('log_time'))['log_time__sum'] or 0
@@ -158,19 +155,19 @@ def delete_log_api_updated(request, log_id):
 
         total_log_time_today = task.logs.filter(task_date=date.today()).aggregate(Sum('log_time'))['log_time__sum'] or 0
 
-        return JsonResponse({
+        return FastJsonResponse({
             'success': True,
             'total_time_spent': task.time_spent,
             'total_log_time': total_log_time_today,
         })
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def task_logs_api_updated(request, task_id):
-    task = TodoItem.objects.get(id=task_id)
-    logs = task.logs.all()
-    logs_data = [{'id': log.id, 'log_time': log.log_time, 'notes': log.notes, 'task_date': log.task_date} for log in logs]
-    return JsonResponse(logs_data, safe=False)
+    task = identity_map(request).task(task_id)
+    columns = ('id', 'log_time', 'notes', 'task_date')
+    logs = task.logs.values_list(*columns)
+    return FastJsonResponse(records(columns, logs), safe=False)
 
 @login_required
 def update_task_log_api(request):
@@ -179,7 +176,7 @@ def update_task_log_api(request):
         task_id = data['task_id']
         log_date_str = data['date']
 
-        task = TodoItem.objects.get(id=task_id)
+        task = identity_map(request).task(task_id)
 
         if log_date_str == 'today':
             log_date = date.today()
@@ -188,7 +185,7 @@ def update_task_log_api(request):
         else:
             # If date is null, it means the task is in the pool, so we delete any existing log for today or yesterday
             TodoLog.objects.filter(todo_item=task, task_date__in=[date.today(), date.today() - timedelta(days=1)], log_time=0).delete()
-            return JsonResponse({'success': True})
+            return FastJsonResponse({'success': True})
 
         # Get or create a log for the task and date
         log, created = TodoLog.objects.get_or_create(
@@ -197,8 +194,8 @@ def update_task_log_api(request):
             defaults={'log_time': 0}
         )
 
-        return JsonResponse({'success': True})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'success': True})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def project_logs_api(request, project_id):
@@ -208,26 +205,17 @@ def project_logs_api(request, project_id):
     else:
         log_date = date.today()
 
-    logs = TodoLog.objects.filter(todo_item__project_id=project_id, task_date=log_date)
-    logs_data = [{
-        'id': log.id,
-        'log_time': log.log_time,
-        'notes': log.notes,
-        'task_id': log.todo_item.id,
-        'user_id': log.todo_item.user.id
-    } for log in logs]
-    return JsonResponse(logs_data, safe=False)
+    columns = ('id', 'log_time', 'notes', 'task_id', 'user_id')
+    logs = TodoLog.objects.filter(
+        todo_item__project_id=project_id, task_date=log_date
+    ).values_list('id', 'log_time', 'notes', 'todo_item_id', 'todo_item__user_id')
+    return FastJsonResponse(records(columns, logs), safe=False)
 
 @login_required
 def project_blockers_api(request, project_id):
-    blockers = TodoItem.objects.filter(project_id=project_id, status='blocker')
-    blockers_data = [{
-        'id': blocker.id,
-        'title': blocker.title,
-        'description': blocker.description,
-        'user_id': blocker.user.id
-    } for blocker in blockers]
-    return JsonResponse(blockers_data, safe=False)
+    columns = ('id', 'title', 'description', 'user_id')
+    blockers = TodoItem.objects.filter(project_id=project_id, status='blocker').values_list(*columns)
+    return FastJsonResponse(records(columns, blockers), safe=False)
 
 @login_required
 def create_task_api(request):
@@ -240,18 +228,24 @@ def create_task_api(request):
             user=request.user,
             status='todo'
         )
-        return JsonResponse({'id': task.id, 'title': task.title, 'description': task.description, 'estimation_time': task.estimation_time, 'status': task.status, 'user_id': task.user.id})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'id': task.id, 'title': task.title, 'description': task.description, 'estimation_time': task.estimation_time, 'status': task.status, 'user_id': task.user_id})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def user_profile_picture_api(request, user_id):
-    user = User.objects.get(id=user_id)
-    profile = user.profile
-    if profile.profile_picture:
-        return JsonResponse({'profile_picture_url': profile.profile_picture.url})
-    return JsonResponse({'profile_picture_url': None})
+    return FastJsonResponse({'profile_picture_url': get_avatar_url(user_id)})
+
+@login_required
+def user_profile_pictures_api(request):
+    """
+    Batched avatar lookup: ?ids=1,2,3 returns {"1": url_or_null, ...}.
+    """
+    try:
+        user_ids = [int(user_id) for user_id in request.GET.get('ids', '').split(',') if user_id.strip()]
+    except ValueError:
+        return FastJsonResponse({'error': 'ids must be a comma-separated list of integers.'}, status=400)
+    return FastJsonResponse(get_avatar_urls(user_ids))
 
-from django.db.models import Sum
 
 @login_required
 def log_time_api(request):
@@ -259,27 +253,27 @@ def log_time_api(request):
         data = json.loads(request.body)
         task_id = data['task_id']
         log_time = data['log_time']
-        task = TodoItem.objects.get(id=task_id)
+        task = identity_map(request).task(task_id)
         TodoLog.objects.create(
             todo_item=task,
             log_time=log_time,
             task_date=date.today()
         )
-        return JsonResponse({'success': True})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'success': True})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def task_total_time_api(request, task_id):
-    task = TodoItem.objects.get(id=task_id)
+    task = identity_map(request).task(task_id)
     total_time = task.logs.aggregate(Sum('log_time'))['log_time__sum'] or 0
-    return JsonResponse({'total_time': total_time})
+    return FastJsonResponse({'total_time': total_time})
 
 @login_required
 def task_logs_api(request, task_id):
-    task = TodoItem.objects.get(id=task_id)
-    logs = task.logs.all()
-    logs_data = [{'id': log.id, 'log_time': log.log_time, 'notes': log.notes, 'task_date': log.task_date} for log in logs]
-    return JsonResponse(logs_data, safe=False)
+    task = identity_map(request).task(task_id)
+    columns = ('id', 'log_time', 'notes', 'task_date')
+    logs = task.logs.values_list(*columns)
+    return FastJsonResponse(records(columns, logs), safe=False)
 
 @login_required
 def update_log_api(request, log_id):
@@ -289,23 +283,23 @@ def update_log_api(request, log_id):
         log.log_time = data['log_time']
         log.notes = data['notes']
         log.save()
-        return JsonResponse({'success': True})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'success': True})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 @login_required
 def delete_log_api(request, log_id):
     if request.method == 'POST':
         log = TodoLog.objects.get(id=log_id)
         log.delete()
-        return JsonResponse({'success': True})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'success': True})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 
 @login_required
 def create_log_api(request, task_id):
     if request.method == 'POST':
         data = json.loads(request.body)
-        task = TodoItem.objects.get(id=task_id)
+        task = identity_map(request).task(task_id)
         log = TodoLog.objects.create(
             todo_item=task,
             log_time=data['log_time'],
@@ -318,12 +312,12 @@ def create_log_api(request, task_id):
 
         total_log_time_today = task.logs.filter(task_date=date.today()).aggregate(Sum('log_time'))['log_time__sum'] or 0
 
-        return JsonResponse({
+        return FastJsonResponse({
             'success': True,
             'total_time_spent': task.time_spent,
             'total_log_time': total_log_time_today,
         })
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
 
 
 @login_required
@@ -333,7 +327,7 @@ def update_task_log_api(request):
         task_id = data['task_id']
         log_date_str = data['date']
 
-        task = TodoItem.objects.get(id=task_id)
+        task = identity_map(request).task(task_id)
 
         if log_date_str == 'today':
             log_date = date.today()
@@ -342,7 +336,7 @@ def update_task_log_api(request):
         else:
             # If date is null, it means the task is in the pool, so we delete any existing log for today or yesterday
             TodoLog.objects.filter(todo_item=task, task_date__in=[date.today(), date.today() - timedelta(days=1)], log_time=0).delete()
-            return JsonResponse({'success': True})
+            return FastJsonResponse({'success': True})
 
         # Get or create a log for the task and date
         log, created = TodoLog.objects.get_or_create(
@@ -351,5 +345,150 @@ def update_task_log_api(request):
             defaults={'log_time': 0}
         )
 
-        return JsonResponse({'success': True})
-    return JsonResponse({'error': 'Invalid request method'}, status=405)
+        return FastJsonResponse({'success': True})
+    return FastJsonResponse({'error': 'Invalid request method'}, status=405)
+
+
+@login_required
+@require_POST
+def enqueue_job_api(request, kind):
+    """
+    Queue a background job. Parameters come from the query string and the
+    form or JSON body; the response carries the job id and the URL to poll.
+    """
+    params = request.GET.dict()
+    if request.content_type == 'application/json' and request.body:
+        try:
+            params.update(json.loads(request.body))
+        except json.JSONDecodeError:
+            return FastJsonResponse({'error': 'Invalid JSON.'}, status=400)
+    else:
+        params.update(request.POST.dict())
+    try:
+        payload = jobs.prepare_payload(kind, request, params)
+    except jobs.UnknownJobKind:
+        return FastJsonResponse({'error': f'Unknown job kind: {kind}'}, status=404)
+    except Http404 as e:
+        return FastJsonResponse({'error': str(e) or 'Not found.'}, status=404)
+    except PermissionDenied:
+        return FastJsonResponse({'error': 'Permission denied.'}, status=403)
+
+    job = jobs.enqueue(kind, request.user, payload)
+    return FastJsonResponse({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('job_status_api', args=[job.id]),
+    }, status=202)
+
+@login_required
+def job_status_api(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    if job.is_expired:
+        return FastJsonResponse({'error': 'Job result has expired.'}, status=410)
+    data = {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error if job.status == Job.STATUS_FAILED else '',
+        'download_url': reverse('job_download', args=[job.id]) if job.result_file else None,
+        'expires_at': job.expires_at,
+    }
+    return FastJsonResponse(data)
+
+@login_required
+def job_download(request, job_id):
+    job = get_object_or_404(Job, id=job_id, user=request.user, status=Job.STATUS_DONE)
+    if job.is_expired or not job.result_file:
+        raise Http404('No downloadable result for this job.')
+    filename = job.result_file.name.rsplit('/', 1)[-1]
+    return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename)
+
+
+@login_required
+def project_summary_api(request, project_id):
+    """JSON variant of the project summary page, served from the standup digests."""
+    project = accessible_project_or_404(request, project_id)
+    today = date.today()
+    return FastJsonResponse({
+        'project': {'id': project.id, 'name': project.name},
+        'today': today,
+        'yesterday': today - timedelta(days=1),
+        'summary': standup_summary(project, today),
+    })
+
+
+@login_required
+def logged_hours_timeseries_api(request):
+    """
+    Logged hours per day, week or month for a chart.
+
+    Query parameters: ``project``, ``user`` and/or ``task`` (at least one),
+    ``bucket`` (day, week or month; default day), ``start`` and ``end``
+    (YYYY-MM-DD; default the 30 days ending today).
+    """
+    granularity = request.GET.get('bucket', 'day')
+    if granularity not in GRANULARITIES:
+        return FastJsonResponse({'error': f'bucket must be one of {", ".join(GRANULARITIES)}.'}, status=400)
+    try:
+        scope = {
+            name: int(request.GET[name]) if request.GET.get(name) else None
+            for name in ('project', 'user', 'task')
+        }
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else date.today()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return FastJsonResponse({'error': 'Invalid project, user, task, start or end parameter.'}, status=400)
+    if not any(scope.values()):
+        return FastJsonResponse({'error': 'Give at least one of project, user or task.'}, status=400)
+    if start > end or len(bucket_starts(start, end, granularity)) > MAX_BUCKETS:
+        return FastJsonResponse({'error': f'start must not be after end, and the range must span at most {MAX_BUCKETS} buckets.'}, status=400)
+
+    # Everyone may chart their own hours; anything else needs access to the project.
+    visible_projects = Project.objects.filter(Q(owner=request.user) | Q(members=request.user))
+    project_id = scope['project']
+    if scope['task'] is not None:
+        task = get_object_or_404(TodoItem.objects.only('user_id', 'project_id'), id=scope['task'])
+        if task.user_id != request.user.id and not visible_projects.filter(id=task.project_id).exists():
+            return HttpResponseForbidden()
+    if project_id is not None and not visible_projects.filter(id=project_id).exists():
+        return HttpResponseForbidden()
+    if scope['user'] not in (None, request.user.id) and project_id is None and scope['task'] is None:
+        return HttpResponseForbidden()
+
+    series = logged_hours_series(
+        start, end, granularity, project_id=project_id, user_id=scope['user'], task_id=scope['task'],
+    )
+    return FastJsonResponse({
+        'bucket': granularity,
+        'start': start,
+        'end': end,
+        'series': [{'start': bucket, 'hours': hours} for bucket, hours in series],
+        'total_hours': sum(hours for _bucket, hours in series),
+    })
+
+
+CUMULATIVE_FLOW_MAX_DAYS = 366
+
+@login_required
+def project_cumulative_flow_api(request, project_id):
+    """
+    Tasks per status at the end of each day (cumulative flow), plus the
+    not-done count per day for a burn-down. ``start``/``end`` default to the
+    30 days ending today.
+    """
+    accessible_project_or_404(request, project_id)
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else date.today()
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return FastJsonResponse({'error': 'start and end must be YYYY-MM-DD dates.'}, status=400)
+    if start > end or (end - start).days >= CUMULATIVE_FLOW_MAX_DAYS:
+        return FastJsonResponse({'error': f'start must not be after end, and the range must span at most {CUMULATIVE_FLOW_MAX_DAYS} days.'}, status=400)
+
+    flow = cumulative_flow(project_id, start, end)
+    series = flow['series']
+    remaining = [sum(counts) - done for counts, done in zip(zip(*series.values()), series['done'])]
+    return FastJsonResponse({'days': flow['days'], 'series': series, 'remaining': remaining})
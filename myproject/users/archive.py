@@ -0,0 +1,94 @@
+"""
+Archive tier for finished work.
+
+`manage.py archive --older-than DAYS` moves done tasks that haven't been
+touched for that long, with all their logs, from TodoItem/TodoLog into
+ArchivedTodoItem/ArchivedTodoLog. It works in batches, one transaction per
+batch, so the hot tables (and their indexes) only hold live work.
+
+Archived rows keep their ids. Reads fall through to the archive where
+history is asked for:
+- todo_detail and the log API serve archived tasks read-only;
+- the task report and CSV export include them with ``archived=1``;
+- the logged-hours time series always counts archived logs, so charts don't
+  change when rows move.
+
+ProjectStats, analytics and the Kanban board only cover live tasks.
+Archiving isn't a status change, so no TaskStatusEvents are written and
+cumulative-flow charts keep the tasks in Done.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Max
+
+from .deferred import defer_signals
+from .models import ArchivedTodoItem, ArchivedTodoLog, TodoItem, TodoLog
+
+ARCHIVE_BATCH_SIZE = 1000
+
+TASK_FIELDS = ['id', 'user_id', 'project_id', 'title', 'description', 'time_spent', 'estimation_time',
+               'status', 'created_at', 'updated_at']
+LOG_FIELDS = ['id', 'todo_item_id', 'log_time', 'task_date', 'notes']
+
+
+def archivable_tasks(cutoff):
+    """Done tasks last updated before ``cutoff``."""
+    return TodoItem.objects.filter(status='done', updated_at__lt=cutoff)
+
+
+def _archive_batch(task_ids):
+    ArchivedTodoItem.objects.bulk_create(
+        [ArchivedTodoItem(**row) for row in TodoItem.objects.filter(id__in=task_ids).values(*TASK_FIELDS)]
+    )
+    logs = TodoLog.objects.filter(todo_item_id__in=task_ids)
+    ArchivedTodoLog.objects.bulk_create([ArchivedTodoLog(**row) for row in logs.values(*LOG_FIELDS)])
+    with defer_signals() as pending:
+        pending.archiving = True
+        _logs, by_model = logs.delete()
+        TodoItem.objects.filter(id__in=task_ids).delete()
+    return by_model.get(TodoLog._meta.label, 0)
+
+
+def archive_tasks(cutoff, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Move done tasks last updated before ``cutoff`` and their logs to the
+    archive tables. Returns (tasks, logs) moved (or that would be, with
+    ``dry_run``). ``progress``, if given, is called after each batch with the
+    running totals.
+    """
+    if dry_run:
+        tasks = archivable_tasks(cutoff)
+        return tasks.count(), TodoLog.objects.filter(todo_item__in=tasks).count()
+
+    moved_tasks = moved_logs = 0
+    while True:
+        with transaction.atomic():
+            task_ids = list(archivable_tasks(cutoff).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not task_ids:
+                break
+            moved_logs += _archive_batch(task_ids)
+        moved_tasks += len(task_ids)
+        if progress is not None:
+            progress(moved_tasks, moved_logs)
+    return moved_tasks, moved_logs
+
+
+def latest_archived_log_date():
+    """
+    The latest task_date in the archive (date.min if it's empty), so
+    time-series queries over recent days can skip the archive table.
+
+    Not cached: the cache is per process, so other workers would keep a stale
+    date after an archive run. MAX over the task_date index is a single probe.
+    """
+    return ArchivedTodoLog.objects.aggregate(latest=Max('task_date'))['latest'] or date.min
+
+
+def find_task(todo_id):
+    """The live TodoItem with this id or, failing that, its archived copy (None if neither exists)."""
+    task = TodoItem.objects.select_related('project').filter(id=todo_id).first()
+    if task is None:
+        task = ArchivedTodoItem.objects.select_related('project').filter(id=todo_id).first()
+    return task
+
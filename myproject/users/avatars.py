@@ -0,0 +1,68 @@
+"""
+Cached user id -> profile picture URL lookups.
+
+The Kanban and DS boards show an avatar for every card. Resolving them through
+``user.profile.profile_picture.url`` costs a profile query and a storage call
+per user, so URLs are cached per user and fetched for many users at once.
+The cached URL points at the versioned thumbnail (see thumbnails.py), not the
+full-size upload. A picture without a thumbnail yet is served as-is while an
+``avatar_thumbnail`` job renders one; the job then drops the cached URL.
+UserProfile saves and deletes invalidate the entry (see models.py).
+"""
+from django.core.cache import cache
+
+AVATAR_CACHE_TIMEOUT = 60 * 60 * 24
+# Users without a picture are cached too, as an empty string.
+_NO_AVATAR = ''
+
+
+def avatar_cache_key(user_id):
+    return f'users:avatar_url:{user_id}'
+
+
+def invalidate_avatar_url(user_id):
+    cache.delete(avatar_cache_key(user_id))
+
+
+def get_avatar_urls(user_ids):
+    """
+    Return a dict mapping each user id to its profile picture URL (or None).
+
+    Cache hits cost one get_many; all misses are resolved with a single
+    UserProfile query and written back with one set_many. Thumbnails are
+    never rendered here.
+    """
+    from .models import UserProfile
+    from .thumbnails import thumbnail_url
+
+    user_ids = {int(user_id) for user_id in user_ids}
+    if not user_ids:
+        return {}
+
+    keys = {avatar_cache_key(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys)
+    urls = {keys[key]: url for key, url in cached.items()}
+
+    missing = user_ids - urls.keys()
+    if missing:
+        fetched = dict.fromkeys(missing, _NO_AVATAR)
+        storage = UserProfile._meta.get_field('profile_picture').storage
+        profiles = UserProfile.objects.filter(user_id__in=missing).exclude(profile_picture='')
+        unrendered = []
+        for user_id, name in profiles.values_list('user_id', 'profile_picture'):
+            if name:
+                fetched[user_id] = thumbnail_url(storage, name)
+                if fetched[user_id] is None:
+                    fetched[user_id] = storage.url(name)
+                    unrendered.append((user_id, name))
+        if unrendered:
+            from .jobs import enqueue_avatar_thumbnails
+            enqueue_avatar_thumbnails(unrendered)
+        cache.set_many({avatar_cache_key(user_id): url for user_id, url in fetched.items()}, AVATAR_CACHE_TIMEOUT)
+        urls.update(fetched)
+
+    return {user_id: url or None for user_id, url in urls.items()}
+
+
+def get_avatar_url(user_id):
+    return get_avatar_urls([user_id])[int(user_id)]
@@ -0,0 +1,145 @@
+"""
+Deferring the users app's bookkeeping receivers during bulk writes.
+
+Several post_save/post_delete receivers in models.py do per-row work:
+- recompute a task's time_spent after each log write;
+- get_or_create a profile after each user save;
+- adjust ProjectStats;
+- refresh standup digests;
+- invalidate time-series caches.
+
+That's fine for one row but costs N aggregates for N rows in fixtures,
+imports and admin bulk actions. Inside ``defer_signals()`` those receivers
+only note which tasks, users and projects they touched. When the block
+exits, ``DeferredWork.apply`` does the same work once, set-based:
+
+    with defer_signals():
+        for row in rows:
+            TodoLog.objects.create(...)
+
+It also works as a decorator. Nested blocks join the outermost one. If the
+block raises, nothing is caught up. The
+status history receivers are never deferred, because a transition can't be
+reconstructed afterwards.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+BATCH_SIZE = 1000
+
+_state = threading.local()
+
+
+class DeferredWork:
+    """Ids touched while receivers were deferred, and the catch-up work for them."""
+
+    def __init__(self):
+        self.task_ids = set()
+        self.project_ids = set()
+        self.user_ids = set()
+        self.profile_user_ids = set()
+        # Set by users/archive.py: the deleted tasks live on in the archive,
+        # so they haven't left their project.
+        self.archiving = False
+
+    def note_task(self, task):
+        """Record a TodoItem write (old and new project/owner included)."""
+        self.task_ids.add(task.pk)
+        self.project_ids.update({task.project_id, task.loaded_value('project_id')})
+        self.user_ids.update({task.user_id, task.loaded_value('user_id')})
+
+    def note_log(self, log):
+        self.task_ids.update({log.todo_item_id, log.loaded_value('todo_item_id')})
+
+    def note_project(self, project_id):
+        self.project_ids.add(project_id)
+
+    def note_profile(self, user_id):
+        self.profile_user_ids.add(user_id)
+
+    def apply(self, keep_unlogged_time=False):
+        """
+        Catch up on everything recorded: backfill missing profiles, recompute
+        time_spent from logs, rebuild ProjectStats and drop the digests and
+        time-series caches involved. With ``keep_unlogged_time``, tasks
+        without logs keep their stored time_spent instead of resetting to 0.
+        """
+        from .models import Project, TodoItem
+        from .project_stats import recompute
+        from .standup import invalidate_project
+        from .timeseries import bump_generations
+
+        if self.profile_user_ids:
+            backfill_profiles(self.profile_user_ids)
+
+        task_ids = list(self.task_ids - {None})
+        if task_ids:
+            recompute_time_spent(task_ids, keep_unlogged_time=keep_unlogged_time)
+            for start in range(0, len(task_ids), BATCH_SIZE):
+                owners = TodoItem.objects.filter(id__in=task_ids[start:start + BATCH_SIZE]).values_list('project_id', 'user_id')
+                for project_id, user_id in owners:
+                    self.project_ids.add(project_id)
+                    self.user_ids.add(user_id)
+
+        project_ids = self.project_ids - {None}
+        if project_ids:
+            recompute(Project.objects.filter(id__in=project_ids))
+            invalidate_project(*project_ids)
+        if task_ids or project_ids or self.user_ids - {None}:
+            bump_generations(project_ids=project_ids, user_ids=self.user_ids - {None}, task_ids=task_ids)
+
+
+def pending_work():
+    """The DeferredWork of the active ``defer_signals()`` block, or None."""
+    return getattr(_state, 'pending', None)
+
+
+@contextmanager
+def defer_signals():
+    outer = pending_work()
+    if outer is not None:
+        yield outer
+        return
+    pending = _state.pending = DeferredWork()
+    try:
+        yield pending
+    finally:
+        _state.pending = None
+    # Only catch up after a clean exit: when the block raised, its writes are
+    # (or will be) rolled back, and apply() would mask the error with its own.
+    if not transaction.get_connection().needs_rollback:
+        pending.apply()
+
+
+def recompute_time_spent(task_ids, keep_unlogged_time=False, batch_size=BATCH_SIZE):
+    """Set time_spent to the sum of each task's logs with one UPDATE per batch."""
+    from django.db.models import F, OuterRef, Subquery, Sum, Value
+    from django.db.models.functions import Coalesce
+
+    from .models import TodoItem, TodoLog
+
+    logged = TodoLog.objects.filter(todo_item=OuterRef('pk')).order_by().values('todo_item').annotate(
+        total=Sum('log_time')
+    ).values('total')
+    fallback = F('time_spent') if keep_unlogged_time else Value(0.0)
+    task_ids = list(task_ids)
+    for start in range(0, len(task_ids), batch_size):
+        TodoItem.objects.filter(id__in=task_ids[start:start + batch_size]).update(
+            time_spent=Coalesce(Subquery(logged), fallback)
+        )
+
+
+def backfill_profiles(user_ids=None):
+    """Create the missing UserProfile rows (for ``user_ids``, or every user) in one bulk insert."""
+    from django.contrib.auth.models import User
+
+    from .models import UserProfile
+
+    users = User.objects.filter(profile__isnull=True)
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+    missing = [UserProfile(user_id=user_id) for user_id in users.values_list('id', flat=True)]
+    UserProfile.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(missing)
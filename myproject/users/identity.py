@@ -0,0 +1,122 @@
+"""
+Request-scoped identity map for Project, User, UserProfile and TodoItem lookups.
+
+A view often needs the same row several times: once to check access, again
+through a foreign key after a save, and once more to serialize it.
+``identity_map(request)`` returns a map that loads each (model, pk) at most
+once and hands back the same instance after that.
+
+The map is stored on the request object, so nothing carries over to the next
+request and there is nothing to invalidate. Within a request, a view that
+changes a row other than through the instance it got from the map should
+``discard()`` it.
+"""
+from django.db.models import Q
+from django.http import Http404
+
+
+class IdentityMap:
+    def __init__(self, user=None):
+        self.request_user = user
+        self._instances = {}
+        # Project ids already checked against the request user's projects, with the verdict.
+        self._accessible = {}
+        if user is not None and user.is_authenticated:
+            self.add(user)
+
+    @staticmethod
+    def _key(model, pk):
+        # ``model`` may be an instance, including the lazy request.user.
+        return model._meta.concrete_model._meta.label, int(pk)
+
+    def add(self, instance):
+        """Remember ``instance``; returns the instance already mapped for its row, if any."""
+        return self._instances.setdefault(self._key(instance, instance.pk), instance)
+
+    def discard(self, instance):
+        key = self._key(instance, instance.pk)
+        self._instances.pop(key, None)
+        if key[0] == 'users.Project':
+            self._accessible.pop(key[1], None)
+
+    def get(self, model, pk, queryset=None):
+        """
+        The ``model`` instance with this pk, fetched from ``queryset`` (default
+        all rows) the first time. Raises ``model.DoesNotExist`` if it's missing.
+        """
+        key = self._key(model, pk)
+        if key not in self._instances:
+            queryset = queryset if queryset is not None else model._default_manager.all()
+            self._instances[key] = queryset.get(pk=pk)
+        return self._instances[key]
+
+    def related(self, instance, name):
+        """
+        ``instance.<name>`` for a forward foreign key, resolved through the map
+        (None if the key is empty) and cached on the instance.
+        """
+        field = instance._meta.get_field(name)
+        if field.is_cached(instance):
+            value = field.get_cached_value(instance)
+            return self.add(value) if value is not None else None
+        pk = getattr(instance, field.attname)
+        value = self.get(field.related_model, pk) if pk is not None else None
+        field.set_cached_value(instance, value)
+        return value
+
+    def project(self, pk):
+        from .models import Project
+        return self.get(Project, pk)
+
+    def user(self, pk):
+        from django.contrib.auth.models import User
+        return self.get(User, pk)
+
+    def task(self, pk):
+        from .models import TodoItem
+        return self.get(TodoItem, pk)
+
+    def accessible_project(self, pk):
+        """
+        The project with this pk if the request's user owns it or is a member,
+        otherwise raises ``Project.DoesNotExist``. Checked once per request.
+        """
+        from .models import Project
+        pk = int(pk)
+        if pk not in self._accessible:
+            visible = Project.objects.filter(Q(owner=self.request_user) | Q(members=self.request_user), pk=pk)
+            key = self._key(Project, pk)
+            if key in self._instances:
+                self._accessible[pk] = visible.exists()
+            else:
+                project = visible.distinct().first()
+                self._accessible[pk] = project is not None
+                if project is not None:
+                    self.add(project)
+        if not self._accessible[pk]:
+            raise Project.DoesNotExist(f'Project {pk} is not accessible to this user.')
+        return self.project(pk)
+
+    def profile(self, user=None):
+        """``user``'s profile (default the request's user), created if missing."""
+        from .models import UserProfile
+        user = self.add(user if user is not None else self.request_user)
+        profile = UserProfile.for_user(user)
+        return self.add(profile)
+
+
+def identity_map(request):
+    """The request's IdentityMap, created on first use."""
+    try:
+        return request._identity_map
+    except AttributeError:
+        request._identity_map = IdentityMap(getattr(request, 'user', None))
+        return request._identity_map
+
+
+def accessible_project_or_404(request, project_id):
+    from .models import Project
+    try:
+        return identity_map(request).accessible_project(project_id)
+    except (Project.DoesNotExist, ValueError, TypeError):
+        raise Http404('No Project matches the given query.')
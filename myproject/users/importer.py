@@ -0,0 +1,304 @@
+"""
+Bulk import of tasks and their logs from CSV or JSON Lines, used by
+`manage.py import_tasks` and the staff upload page (through the job queue).
+
+Input is streamed, never loaded whole:
+
+* JSONL: one task per line, optionally with nested ``"logs": [...]``.
+* CSV: one task per row. Logs come from a second CSV whose ``ref`` column
+  matches the task's ``ref``.
+
+Task fields are ``ref`` (optional; the id in the old tracker), ``username``
+(or ``user_id``), ``project`` (name or id; optional), ``title``,
+``description``, ``status``, ``estimation_time_hours`` and
+``time_spent_hours``. Log fields are ``log_time``, ``task_date``
+(YYYY-MM-DD) and ``notes``. Rows are checked with the same rules as
+TodoForm and TodoLogForm. Users and projects are resolved from in-memory
+maps loaded once, so validation makes no queries.
+
+Valid rows are written with bulk_create, one transaction per batch. Invalid
+rows are skipped and reported. bulk_create bypasses the model signals, so
+the importer does their work once at the end instead:
+- recompute time_spent from the imported logs;
+- record TaskStatusEvents;
+- rebuild ProjectStats;
+- drop the standup digests and time-series caches of the touched projects.
+"""
+import io
+import json
+from dataclasses import dataclass, field
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .deferred import DeferredWork
+from .forms import TodoForm, TodoLogForm
+from .models import Project, TaskStatusEvent, TodoItem, TodoLog
+from .positions import assign_end_positions
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportTodoForm(TodoForm):
+    """
+    TodoForm's rules minus the project field, which is resolved from the id
+    map. Descriptions are optional, as they are for create_task_api; old
+    trackers often have none.
+    """
+    class Meta(TodoForm.Meta):
+        fields = ['title', 'description', 'status']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['description'].required = False
+
+
+@dataclass
+class ImportResult:
+    tasks: int = 0
+    logs: int = 0
+    skipped: int = 0
+    errors: list = field(default_factory=list)
+
+    def error(self, where, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'{where}: {message}')
+
+    def as_dict(self):
+        return {'tasks': self.tasks, 'logs': self.logs, 'skipped': self.skipped, 'errors': self.errors}
+
+
+def detect_format(name):
+    return 'jsonl' if name.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def _text(stream):
+    # Uploaded and storage files are binary; csv/json want text.
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def read_records(stream, fmt):
+    """Yield (line_number, dict) from a CSV or JSONL stream."""
+    stream = _text(stream)
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+                continue
+            yield line_number, record if isinstance(record, dict) else ValueError('expected a JSON object')
+    else:
+        import csv
+
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def _form_errors(form):
+    return '; '.join(f'{name}: {" ".join(messages)}' for name, messages in form.errors.items())
+
+
+class TaskImporter:
+    """
+    ``default_user`` owns rows without a username. ``create_projects`` creates
+    unknown project names instead of rejecting the row. With ``dry_run``
+    nothing is written.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, default_user=None, create_projects=False, dry_run=False):
+        self.batch_size = batch_size
+        self.default_user = default_user
+        self.create_projects = create_projects
+        self.dry_run = dry_run
+        self.result = ImportResult()
+        self.user_ids = dict(User.objects.values_list('username', 'id'))
+        self.known_user_ids = set(self.user_ids.values())
+        self.project_ids = dict(Project.objects.values_list('name', 'id'))
+        self.known_project_ids = set(self.project_ids.values())
+        self.task_ids_by_ref = {}
+        self.imported_task_ids = []
+        self.touched_projects = set()
+        self.touched_users = set()
+        self._tasks = []
+        self._logs = []
+
+    # Resolution
+
+    def _resolve_user(self, record):
+        if record.get('user_id') not in (None, ''):
+            try:
+                user_id = int(record['user_id'])
+            except (TypeError, ValueError):
+                return None, f'invalid user_id {record["user_id"]!r}'
+            return (user_id, None) if user_id in self.known_user_ids else (None, f'unknown user_id {user_id}')
+        username = (record.get('username') or '').strip()
+        if not username:
+            if self.default_user is None:
+                return None, 'username is required'
+            return self.default_user.id, None
+        user_id = self.user_ids.get(username)
+        return (user_id, None) if user_id else (None, f'unknown user {username!r}')
+
+    def _resolve_project(self, value):
+        value = str(value).strip() if value is not None else ''
+        if not value:
+            return None, None
+        if value.isdigit() and int(value) in self.known_project_ids:
+            return int(value), None
+        if value in self.project_ids:
+            return self.project_ids[value], None
+        if not self.create_projects:
+            return None, f'unknown project {value!r}'
+        if self.dry_run:
+            return None, None
+        project = Project.objects.create(name=value)
+        self.project_ids[value] = project.id
+        self.known_project_ids.add(project.id)
+        return project.id, None
+
+    # Validation
+
+    def _build_logs(self, entries):
+        logs = []
+        for index, entry in enumerate(entries, start=1):
+            if not isinstance(entry, dict):
+                return None, f'log {index}: expected an object'
+            form = TodoLogForm(data=entry)
+            if not form.is_valid():
+                return None, f'log {index}: {_form_errors(form)}'
+            logs.append(form.save(commit=False))
+        return logs, None
+
+    def add_task(self, where, record):
+        if isinstance(record, Exception):
+            self.result.error(where, str(record))
+            return
+        form = ImportTodoForm(data=record)
+        if not form.is_valid():
+            self.result.error(where, _form_errors(form))
+            return
+        user_id, error = self._resolve_user(record)
+        if error is None:
+            project_id, error = self._resolve_project(record.get('project'))
+        logs = []
+        if error is None and record.get('logs'):
+            logs, error = self._build_logs(record['logs'])
+        if error:
+            self.result.error(where, error)
+            return
+
+        task = form.save(commit=False)
+        task.user_id = user_id
+        task.project_id = project_id
+        task.status = task.status or 'todo'
+        task.description = task.description or ''
+        self._tasks.append((str(record.get('ref') or ''), task, logs))
+        if len(self._tasks) >= self.batch_size:
+            self.flush()
+
+    def add_log(self, where, record):
+        if isinstance(record, Exception):
+            self.result.error(where, str(record))
+            return
+        task_id = self.task_ids_by_ref.get(str(record.get('ref') or ''))
+        if task_id is None:
+            self.result.error(where, f'unknown task ref {record.get("ref")!r}')
+            return
+        form = TodoLogForm(data=record)
+        if not form.is_valid():
+            self.result.error(where, _form_errors(form))
+            return
+        log = form.save(commit=False)
+        log.todo_item_id = task_id
+        self._logs.append(log)
+        if len(self._logs) >= self.batch_size:
+            self.flush()
+
+    # Writing
+
+    def _insert_tasks(self, tasks):
+        assign_end_positions(tasks)
+        TodoItem.objects.bulk_create(tasks)
+        if tasks and tasks[0].pk is None:
+            # Backends that can't return ids from a bulk INSERT (SQLite on
+            # Django 3.2): read them back by the rows' own values. Every task
+            # in a batch gets its own position in its column, so the key is
+            # unique within the batch, and other writers' rows don't match it.
+            key_fields = ('user_id', 'title', 'created_at', 'project_id', 'status', 'position')
+            by_key = {tuple(getattr(task, name) for name in key_fields): task for task in tasks}
+            created = [task.created_at for task in tasks]
+            rows = TodoItem.objects.filter(created_at__range=(min(created), max(created))).values_list('id', *key_fields)
+            for pk, *key in rows:
+                task = by_key.get(tuple(key))
+                if task is not None:
+                    if task.pk is not None:
+                        raise RuntimeError(f'Two tasks match imported task {task.title!r}; not guessing its id.')
+                    task.pk = pk
+            if any(task.pk is None for task in tasks):
+                raise RuntimeError('Could not read back the ids of imported tasks.')
+
+    def flush(self):
+        tasks, logs = self._tasks, self._logs
+        self._tasks, self._logs = [], []
+        if self.dry_run:
+            self.result.tasks += len(tasks)
+            self.result.logs += len(logs) + sum(len(task_logs) for _ref, _task, task_logs in tasks)
+            for ref, _task, _logs in tasks:
+                if ref:
+                    self.task_ids_by_ref[ref] = 0
+            return
+        with transaction.atomic():
+            if tasks:
+                self._insert_tasks([task for _ref, task, _logs in tasks])
+                for ref, task, task_logs in tasks:
+                    if ref:
+                        self.task_ids_by_ref[ref] = task.pk
+                    for log in task_logs:
+                        log.todo_item_id = task.pk
+                    logs.extend(task_logs)
+                TaskStatusEvent.objects.bulk_create([
+                    TaskStatusEvent(task_id=task.pk, project_id=task.project_id, to_status=task.status)
+                    for _ref, task, _logs in tasks if task.project_id is not None
+                ], batch_size=self.batch_size)
+            if logs:
+                TodoLog.objects.bulk_create(logs, batch_size=self.batch_size)
+        for _ref, task, _logs in tasks:
+            self.imported_task_ids.append(task.pk)
+            self.touched_projects.add(task.project_id)
+            self.touched_users.add(task.user_id)
+        self.result.tasks += len(tasks)
+        self.result.logs += len(logs)
+
+    def finish(self):
+        """Flush what's left and redo, once, the work the skipped signals would have done."""
+        self.flush()
+        if self.dry_run or not self.imported_task_ids:
+            return self.result
+
+        work = DeferredWork()
+        work.task_ids.update(self.imported_task_ids)
+        work.project_ids.update(self.touched_projects)
+        work.user_ids.update(self.touched_users)
+        # Tasks with logs take their time from them; the rest keep the file's time_spent_hours.
+        work.apply(keep_unlogged_time=True)
+        return self.result
+
+
+def import_tasks(tasks_stream, tasks_format, logs_stream=None, **options):
+    """Import a tasks stream (and optional logs CSV stream); returns an ImportResult."""
+    importer = TaskImporter(**options)
+    for line_number, record in read_records(tasks_stream, tasks_format):
+        importer.add_task(f'tasks line {line_number}', record)
+    if logs_stream is not None:
+        importer.flush()  # Logs refer to tasks by ref, so their ids must exist first.
+        for line_number, record in read_records(logs_stream, 'csv'):
+            importer.add_log(f'logs line {line_number}', record)
+    return importer.finish()
@@ -0,0 +1,267 @@
+"""
+A small database-backed job queue for work that is too slow to run inside a
+request: CSV exports, task report aggregates and project summaries.
+
+Views enqueue a Job row and hand its id back to the browser, which polls
+`job_status_api` until the job is done and then downloads or reads the result.
+`manage.py run_workers` claims queued jobs and runs them in a process pool.
+
+Each job kind registers two callables:
+
+* ``prepare(request, params)`` runs in the enqueueing request. It checks
+  access and returns the JSON payload stored on the job (raise Http404 or
+  PermissionDenied to refuse).
+* the handler, ``handler(job)``, runs in a worker. It either returns a
+  JSON-serializable result or saves ``job.result_file`` itself. It may call
+  ``job.set_progress(percent)`` along the way.
+"""
+import io
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils import timezone
+
+from .models import Job, Project, UserProfile
+from .reports import project_summary_data, task_report_totals, write_csv_report
+
+logger = logging.getLogger(__name__)
+
+RESULT_TTL = timedelta(seconds=getattr(settings, 'USERS_JOB_RESULT_TTL', 24 * 60 * 60))
+RETRY_DELAY = timedelta(seconds=getattr(settings, 'USERS_JOB_RETRY_DELAY', 30))
+
+_registry = {}
+
+
+class UnknownJobKind(Exception):
+    pass
+
+
+def register(kind, prepare):
+    """Decorator registering ``handler`` for jobs of ``kind``."""
+    def decorator(handler):
+        _registry[kind] = (prepare, handler)
+        return handler
+    return decorator
+
+
+def job_kinds():
+    return sorted(_registry)
+
+
+def prepare_payload(kind, request, params):
+    if kind not in _registry:
+        raise UnknownJobKind(kind)
+    prepare, _handler = _registry[kind]
+    return prepare(request, params)
+
+
+def enqueue(kind, user, payload=None, max_attempts=3):
+    if kind not in _registry:
+        raise UnknownJobKind(kind)
+    return Job.objects.create(kind=kind, user=user, payload=payload or {}, max_attempts=max_attempts)
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest runnable job from queued to running and return
+    it, or None when nothing is runnable.
+
+    The claim is a conditional UPDATE, so two workers racing for the same row
+    can't both win; the loser just tries the next candidate.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.STATUS_QUEUED, run_after__lte=now).order_by('run_after', 'id')
+    for job_id in candidates.values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job_id):
+    """
+    Run a claimed job to completion. Failures are retried with exponential
+    backoff until ``max_attempts`` is reached.
+    """
+    job = Job.objects.select_related('user').get(id=job_id)
+    _prepare, handler = _registry[job.kind]
+    try:
+        result = handler(job)
+    except Exception:
+        logger.exception('Job %s failed (attempt %s of %s)', job.pk, job.attempts, job.max_attempts)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.STATUS_QUEUED
+            job.run_after = timezone.now() + RETRY_DELAY * 2 ** (job.attempts - 1)
+        else:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'run_after', 'finished_at'])
+        return job.status
+
+    now = timezone.now()
+    job.result = result
+    job.status = Job.STATUS_DONE
+    job.progress = 100
+    job.error = ''
+    job.finished_at = now
+    job.expires_at = now + RESULT_TTL
+    job.save(update_fields=['result', 'result_file', 'status', 'progress', 'error', 'finished_at', 'expires_at'])
+    return job.status
+
+
+WORKER_DIED = 'The worker running this job died.'
+
+
+def _release(running):
+    """
+    Put jobs whose worker died back in the queue, or mark them failed once
+    they have used up their attempts (a job that keeps crashing its worker
+    must not be retried forever). Returns (requeued, failed).
+    """
+    running = running.filter(status=Job.STATUS_RUNNING)
+    failed = running.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_FAILED, error=WORKER_DIED, finished_at=timezone.now(),
+    )
+    requeued = running.filter(attempts__lt=F('max_attempts')).update(status=Job.STATUS_QUEUED, error=WORKER_DIED)
+    return requeued, failed
+
+
+def requeue_stale_jobs(older_than):
+    """Release jobs left 'running' by a worker that died mid-job. Returns (requeued, failed)."""
+    return _release(Job.objects.filter(started_at__lt=timezone.now() - older_than))
+
+
+def release_jobs(job_ids):
+    """Release the given running jobs after their worker process crashed. Returns (requeued, failed)."""
+    return _release(Job.objects.filter(id__in=job_ids))
+
+
+def purge_expired_jobs():
+    """Delete finished jobs whose results have expired, along with their files."""
+    expired = Job.objects.filter(expires_at__lte=timezone.now())
+    count = 0
+    for job in expired.iterator():
+        if job.result_file:
+            job.result_file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
+
+
+# Job kinds
+
+REPORT_FILTER_PARAMS = ('q', 'status', 'start_date', 'end_date', 'project')
+
+
+def _prepare_csv_report(request, params):
+    return {}
+
+
+@register('csv_report', prepare=_prepare_csv_report)
+def csv_report_job(job):
+    buffer = io.StringIO()
+    write_csv_report(job.user, buffer, progress=job.set_progress)
+    job.result_file.save(f'todo_report_{job.pk}.csv', ContentFile(buffer.getvalue().encode('utf-8')), save=False)
+
+
+def _prepare_task_report(request, params):
+    return {key: params[key] for key in REPORT_FILTER_PARAMS if params.get(key)}
+
+
+@register('task_report', prepare=_prepare_task_report)
+def task_report_job(job):
+    return task_report_totals(job.user, job.payload)
+
+
+def _prepare_project_summary(request, params):
+    try:
+        project_id = int(params.get('project_id', ''))
+    except ValueError:
+        raise Http404('project_id is required.')
+    if not Project.objects.filter(Q(owner=request.user) | Q(members=request.user), id=project_id).exists():
+        raise PermissionDenied
+    return {'project_id': project_id}
+
+
+@register('project_summary', prepare=_prepare_project_summary)
+def project_summary_job(job):
+    project = Project.objects.get(id=job.payload['project_id'])
+    return project_summary_data(project)
+
+
+IMPORT_UPLOAD_PREFIX = 'task_imports/'
+
+
+def _prepare_import_tasks(request, params):
+    from . import importer
+    # Only staff, and only files the upload view stored.
+    if not request.user.is_staff:
+        raise PermissionDenied
+    names = [params.get('tasks'), params.get('logs')]
+    for name in filter(None, names):
+        if not name.startswith(IMPORT_UPLOAD_PREFIX) or not default_storage.exists(name):
+            raise Http404('Unknown import file.')
+    if not params.get('tasks'):
+        raise Http404('tasks is required.')
+    return {
+        'tasks': params['tasks'],
+        'logs': params.get('logs') or None,
+        'format': params.get('format') or importer.detect_format(params['tasks']),
+        'create_projects': bool(params.get('create_projects')),
+    }
+
+
+@register('import_tasks', prepare=_prepare_import_tasks)
+def import_tasks_job(job):
+    # The importer (forms, csv) is loaded by the workers that run imports,
+    # not by every web process that imports this registry.
+    from . import importer
+    payload = job.payload
+    logs_file = default_storage.open(payload['logs'], 'rb') if payload.get('logs') else None
+    try:
+        with default_storage.open(payload['tasks'], 'rb') as tasks_file:
+            result = importer.import_tasks(
+                tasks_file, payload['format'], logs_file,
+                default_user=job.user, create_projects=payload.get('create_projects', False),
+            )
+    finally:
+        if logs_file is not None:
+            logs_file.close()
+    for name in filter(None, [payload['tasks'], payload.get('logs')]):
+        default_storage.delete(name)
+    return result.as_dict()
+
+
+def _prepare_avatar_thumbnail(request, params):
+    # Queued by avatars.py for pictures without a thumbnail, never through the API.
+    raise PermissionDenied
+
+
+@register('avatar_thumbnail', prepare=_prepare_avatar_thumbnail)
+def avatar_thumbnail_job(job):
+    from .avatars import invalidate_avatar_url
+    from .thumbnails import generate_thumbnail, thumbnail_is_stale
+    storage = UserProfile._meta.get_field('profile_picture').storage
+    name = job.payload['name']
+    if thumbnail_is_stale(storage, name):
+        generate_thumbnail(storage, name)
+    # The user's cached avatar URL still points at the original picture.
+    invalidate_avatar_url(job.user_id)
+
+
+def enqueue_avatar_thumbnails(pictures):
+    """Queue an avatar_thumbnail job per (user_id, picture name) pair, in one INSERT."""
+    Job.objects.bulk_create([
+        Job(kind='avatar_thumbnail', user_id=user_id, payload={'name': name}, max_attempts=1)
+        for user_id, name in pictures
+    ])
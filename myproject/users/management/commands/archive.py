@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from users.archive import ARCHIVE_BATCH_SIZE, archive_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Move done tasks that have not been updated for --older-than days, '
+        'with their logs, into the archive tables, in batches. Archived tasks '
+        'stay readable from the task page and the report (with "include archived").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Archive done tasks last updated more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Tasks moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived.')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than must be >= 0 and --batch-size >= 1.')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+
+        if options['dry_run']:
+            tasks, logs = archive_tasks(cutoff, dry_run=True)
+            self.stdout.write(f'Would archive {tasks} task(s) and {logs} log(s).')
+            return
+
+        def progress(tasks, logs):
+            self.stdout.write(f'  ... {tasks} task(s), {logs} log(s)')
+
+        tasks, logs = archive_tasks(cutoff, batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Archived {tasks} task(s) and {logs} log(s).'))
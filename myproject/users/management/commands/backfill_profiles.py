@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from users.deferred import backfill_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the missing UserProfile rows in one bulk insert. Profiles are '
+        'only created when a user is created, so users loaded from fixtures or '
+        'raw SQL may lack one until this runs (or until first accessed).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report how many users lack a profile; change nothing.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            missing = User.objects.filter(profile__isnull=True).count()
+            self.stdout.write(f'{missing} user(s) without a profile.')
+            return
+        created = backfill_profiles()
+        self.stdout.write(self.style.SUCCESS(f'Created {created} profile(s).'))
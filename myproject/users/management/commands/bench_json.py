@@ -0,0 +1,71 @@
+import timeit
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+
+from users.models import TodoItem
+from users.responses import FastJsonResponse, OrjsonEncoder, StdlibEncoder, orjson, records
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark JSON serialization of task payloads: the current '
+        'JsonResponse path (model instances -> dicts) against FastJsonResponse '
+        'fed from values_list() tuples.'
+    )
+
+    columns = ('id', 'title', 'description', 'status', 'user_id', 'estimation_time', 'time_spent', 'created_at')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='Number of tasks in the payload.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per variant.')
+
+    def handle(self, *args, **options):
+        count = options['tasks']
+        repeat = options['repeat']
+        created_at = datetime(2025, 7, 1, 9, 30, tzinfo=timezone.utc)
+
+        # Unsaved instances stand in for what the ORM hands the current views;
+        # the tuples are what values_list() returns for the same rows.
+        tasks = [
+            TodoItem(
+                id=i, user_id=1, title=f'Task {i}', description='Lorem ipsum dolor sit amet ' * 4,
+                status='inprogress', estimation_time=2.5, time_spent=1.25, created_at=created_at,
+            )
+            for i in range(count)
+        ]
+        rows = [tuple(getattr(task, column) for column in self.columns) for task in tasks]
+
+        def current_path():
+            data = [{
+                'id': task.id,
+                'title': task.title,
+                'description': task.description,
+                'status': task.status,
+                'user_id': task.user_id,
+                'estimation_time': task.estimation_time,
+                'time_spent': task.time_spent,
+                'created_at': task.created_at,
+            } for task in tasks]
+            return JsonResponse(data, safe=False).content
+
+        variants = [
+            ('JsonResponse from model instances', current_path),
+            ('FastJsonResponse[stdlib] from tuples',
+             lambda: FastJsonResponse(records(self.columns, rows), encoder=StdlibEncoder(), safe=False).content),
+        ]
+        if orjson is not None:
+            variants.append((
+                'FastJsonResponse[orjson] from tuples',
+                lambda: FastJsonResponse(records(self.columns, rows), encoder=OrjsonEncoder(), safe=False).content,
+            ))
+        else:
+            self.stdout.write(self.style.WARNING('orjson is not installed; skipping the orjson variant.'))
+
+        self.stdout.write(f'Serializing {count} tasks, best of {repeat} runs:')
+        baseline = None
+        for label, func in variants:
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            baseline = baseline or best
+            self.stdout.write(f'  {label:<40} {best * 1000:8.2f} ms  ({baseline / best:4.1f}x)')
@@ -0,0 +1,71 @@
+import re
+import timeit
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from users.models import Project, TodoItem, TodoLog
+from users.partitioning import TABLE
+
+
+class Command(BaseCommand):
+    help = (
+        'PostgreSQL only: show that a single-day TodoLog query (what standup '
+        'digests run) touches one partition. Prints the query plan and '
+        'timings against a whole-table aggregate. '
+        '--seed adds synthetic logs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Synthetic logs to add (spread over --months).')
+        parser.add_argument('--months', type=int, default=24, help='Months the synthetic logs span.')
+        parser.add_argument('--day', type=date.fromisoformat, help='Day to query (default: the latest logged day).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'TodoLog partitioning needs PostgreSQL; this database is {connection.vendor}.')
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'], options['months'])
+            self.report(options['day'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, count, months):
+        user = User.objects.create_user(username='bench_partitions')
+        project = Project.objects.create(name='Partition benchmark')
+        tasks = TodoItem.objects.bulk_create(
+            [TodoItem(user=user, project=project, title=f'Bench {i}', description='') for i in range(100)]
+        )
+        if tasks[0].pk is None:
+            tasks = list(TodoItem.objects.filter(project=project))
+        first_day = date.today() - timedelta(days=30 * months)
+        span = 30 * months
+        TodoLog.objects.bulk_create(
+            [TodoLog(todo_item=tasks[i % len(tasks)], log_time=1, task_date=first_day + timedelta(days=i % span))
+             for i in range(count)],
+            batch_size=1000,
+        )
+        self.stdout.write(f'Seeded {count} logs over {months} months.')
+
+    def report(self, day, repeat):
+        day = day or TodoLog.objects.order_by('-task_date').values_list('task_date', flat=True).first()
+        if day is None:
+            self.stdout.write(self.style.WARNING('No logs to query; use --seed.'))
+            return
+        one_day = TodoLog.objects.filter(task_date=day).values('todo_item__project_id').annotate(hours=Sum('log_time'))
+        all_days = TodoLog.objects.values('todo_item__project_id').annotate(hours=Sum('log_time'))
+
+        plan = one_day.explain()
+        self.stdout.write(f'Plan for task_date={day}:')
+        for line in plan.splitlines():
+            self.stdout.write(f'  {line}')
+        touched = sorted(set(re.findall(rf'\b{TABLE}_(?:p\d{{6}}|default)\b', plan)))
+        self.stdout.write(f'Partitions touched: {len(touched)} ({", ".join(touched) or "table is not partitioned"})')
+
+        for label, queryset in ((f'one day ({day})', one_day), ('all days', all_days)):
+            best = min(timeit.repeat(lambda: list(queryset.all()), number=1, repeat=repeat))
+            self.stdout.write(f'  {label:<24} {best * 1000:8.2f} ms')
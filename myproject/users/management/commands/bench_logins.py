@@ -0,0 +1,60 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from users.models import UserProfile
+
+
+def _legacy_profile_receiver(sender, instance, created, **kwargs):
+    # What every User save used to do before profile creation became create-only.
+    if not created:
+        UserProfile.objects.get_or_create(user=instance)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark a standup-time login burst: many users logging in back to '
+        'back. Reports queries per login and logins per second, with and '
+        'without the old get_or_create-on-every-save profile receiver. '
+        'Password hashing is skipped (force_login) since it is the same in '
+        'both runs. Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Users logging in during the burst.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed bursts per variant.')
+
+    def handle(self, *args, **options):
+        count = options['users']
+        repeat = options['repeat']
+
+        with transaction.atomic():
+            users = [User.objects.create_user(username=f'bench_login_{i}') for i in range(count)]
+
+            variants = [('create-only profile receiver', False), ('legacy get_or_create on every save', True)]
+            self.stdout.write(f'Logging in {count} users, best of {repeat} bursts:')
+            for label, legacy in variants:
+                if legacy:
+                    post_save.connect(_legacy_profile_receiver, sender=User)
+                try:
+                    best, queries = None, None
+                    for _ in range(repeat):
+                        with CaptureQueriesContext(connection) as captured:
+                            started = time.perf_counter()
+                            for user in users:
+                                Client().force_login(user)
+                            elapsed = time.perf_counter() - started
+                        best = elapsed if best is None else min(best, elapsed)
+                        queries = len(captured)
+                finally:
+                    post_save.disconnect(_legacy_profile_receiver, sender=User)
+                self.stdout.write(
+                    f'  {label:<38} {queries / count:5.1f} queries/login  {count / best:8.0f} logins/s'
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import Project, StandupDigest
+from users.standup import build_recent_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the standup digests behind the project summary page. Run it '
+        'shortly before standup (e.g. from cron) so the first page view is warm.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Build for this day (YYYY-MM-DD) instead of today.')
+        parser.add_argument('--days', type=int, default=2,
+                            help='Number of days ending at --date to build (default: 2, yesterday and today).')
+        parser.add_argument('--project', type=int, action='append', dest='projects',
+                            help='Only this project id (repeatable).')
+        parser.add_argument('--keep-days', type=int, default=14,
+                            help='Delete digests older than this many days.')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError('--date must be in YYYY-MM-DD format.')
+
+        projects = Project.objects.all()
+        if options['projects']:
+            projects = projects.filter(id__in=options['projects'])
+
+        built = build_recent_digests(days=options['days'], today=today, projects=projects)
+        deleted, _ = StandupDigest.objects.filter(day__lt=today - timedelta(days=options['keep_days'])).delete()
+        self.stdout.write(self.style.SUCCESS(f'Built {built} digest(s); deleted {deleted} old digest(s).'))
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importer import DEFAULT_BATCH_SIZE, detect_format, import_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import tasks (CSV or JSON Lines, optionally with nested logs) and '
+        'logs (CSV keyed by task ref). See users/importer.py for the columns.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tasks', help='Tasks file (.csv or .jsonl).')
+        parser.add_argument('--logs', help='Logs CSV whose ref column matches the tasks file.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Tasks file format (default: from the extension).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows per bulk insert and transaction.')
+        parser.add_argument('--default-user', help='Username owning rows without one.')
+        parser.add_argument('--create-projects', action='store_true', help='Create unknown projects by name.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+
+    def handle(self, *args, **options):
+        default_user = None
+        if options['default_user']:
+            default_user = User.objects.filter(username=options['default_user']).first()
+            if default_user is None:
+                raise CommandError(f"Unknown user {options['default_user']!r}.")
+
+        logs_file = None
+        try:
+            with open(options['tasks'], 'rb') as tasks_file:
+                if options['logs']:
+                    logs_file = open(options['logs'], 'rb')
+                result = import_tasks(
+                    tasks_file, options['format'] or detect_format(options['tasks']), logs_file,
+                    batch_size=max(1, options['batch_size']), default_user=default_user,
+                    create_projects=options['create_projects'], dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+        finally:
+            if logs_file is not None:
+                logs_file.close()
+
+        for error in result.errors:
+            self.stderr.write(error)
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.tasks} task(s) and {result.logs} log(s); skipped {result.skipped} invalid row(s).'
+        ))
@@ -0,0 +1,33 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from users.partitioning import DEFAULT_MONTHS_AHEAD, partition_todolog
+
+
+class Command(BaseCommand):
+    help = (
+        'PostgreSQL only: convert users_todolog to a table range-partitioned by '
+        'month on task_date, or, if it already is, add partitions for the '
+        'coming months. Safe to run repeatedly (e.g. monthly from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=DEFAULT_MONTHS_AHEAD,
+                            help='Create partitions up to this many months from now.')
+        parser.add_argument('--keep-unpartitioned', action='store_true',
+                            help='Keep the original table as users_todolog_unpartitioned instead of dropping it.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                f'Partitioning needs PostgreSQL; this database is {connection.vendor}. '
+                'Other backends rely on the (task_date, todo_item) index instead.'
+            )
+        try:
+            created = partition_todolog(options['ahead'], keep_unpartitioned=options['keep_unpartitioned'])
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        for name in created:
+            self.stdout.write(f'  created {name}')
+        self.stdout.write(self.style.SUCCESS(f'{len(created)} partition(s) created.'))
@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PHASE_MARKER = '#phase '
+PHASES = ('interpreter', 'setup', 'urls', 'templates')
+
+# Runs in a fresh interpreter under -X importtime. Markers on stderr split
+# the import log into phases; wall times per phase go to stdout as JSON.
+CHILD_SCRIPT = f'''
+import json, sys, time
+
+timings = {{}}
+def phase(name):
+    sys.stderr.write({PHASE_MARKER!r} + name + "\\n")
+    sys.stderr.flush()
+    return time.perf_counter()
+
+started = phase("setup")
+import django
+django.setup()  # settings, apps, models, admin autodiscovery
+started, timings["setup"] = phase("urls"), time.perf_counter() - started
+from django.urls import get_resolver
+resolver = get_resolver()
+resolver.url_patterns, resolver.reverse_dict  # imports every view module
+started, timings["urls"] = phase("templates"), time.perf_counter() - started
+from django.template import engines
+engines.all()  # builds the engines, importing every templatetag library (crispy_forms, ...)
+timings["templates"] = time.perf_counter() - started
+print(json.dumps(timings))
+'''
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(stderr):
+    """{phase: [(module, self_us, cumulative_us, depth), ...]} from an -X importtime log."""
+    phases = {name: [] for name in PHASES}
+    current = 'interpreter'
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            current = line[len(PHASE_MARKER):].strip()
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            phases.setdefault(current, []).append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return phases
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile a cold start in a fresh interpreter with -X importtime: wall and import time for app loading, '
+        'URLconf resolution and template engine setup, and the most expensive imports.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3,
+                            help='Fresh interpreters to start; the fastest run is reported (default 3).')
+        parser.add_argument('--top', type=int, default=20, help='How many imports and packages to list.')
+        parser.add_argument('--json', action='store_true', help='Print the full profile as JSON.')
+
+    def _run_once(self):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            raise CommandError(f'Startup failed:\n{completed.stderr[-2000:]}')
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        return timings, parse_importtime(completed.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self._run_once() for _ in range(max(1, options['runs']))]
+        timings, phases = min(runs, key=lambda run: sum(run[0].values()))
+        top = options['top']
+
+        imports = [(module, self_us, cumulative_us, depth, phase)
+                   for phase, rows in phases.items() for module, self_us, cumulative_us, depth in rows]
+        packages = {}
+        for module, self_us, _cumulative_us, _depth, _phase in imports:
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+        bytecode_cached = not sys.dont_write_bytecode and not os.environ.get('PYTHONDONTWRITEBYTECODE')
+
+        profile = {
+            'runs': len(runs),
+            'bytecode_cached': bytecode_cached,
+            'phases': {
+                phase: {
+                    'wall_ms': round(timings[phase] * 1000, 1) if phase in timings else None,
+                    'import_ms': round(sum(row[1] for row in phases.get(phase, [])) / 1000, 1),
+                    'modules': len(phases.get(phase, [])),
+                }
+                for phase in PHASES
+            },
+            'imports': [
+                {'module': module, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000, 'phase': phase}
+                for module, self_us, cumulative_us, _depth, phase in sorted(imports, key=lambda row: -row[2])[:top]
+            ],
+            'packages': [
+                {'package': package, 'self_ms': self_us / 1000}
+                for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+            ],
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(profile, indent=2))
+            return
+
+        self.stdout.write(f'Fastest of {len(runs)} cold start(s):')
+        self.stdout.write(f'  {"phase":<12} {"wall ms":>9} {"import ms":>10} {"modules":>8}')
+        for phase, row in profile['phases'].items():
+            wall = f'{row["wall_ms"]:.1f}' if row['wall_ms'] is not None else '-'
+            self.stdout.write(f'  {phase:<12} {wall:>9} {row["import_ms"]:>10.1f} {row["modules"]:>8}')
+        self.stdout.write(f'\nTop {top} imports by cumulative time:')
+        for row in profile['imports']:
+            self.stdout.write(f'  {row["cumulative_ms"]:>8.1f} ms  (self {row["self_ms"]:>6.1f})  {row["module"]}  [{row["phase"]}]')
+        self.stdout.write('\nSelf time by top-level package:')
+        for row in profile['packages']:
+            self.stdout.write(f'  {row["self_ms"]:>8.1f} ms  {row["package"]}')
+        if not bytecode_cached:
+            self.stdout.write(self.style.WARNING(
+                '\nBytecode caching is off (PYTHONDONTWRITEBYTECODE), so every start compiles every module '
+                'from source and self times include compilation. Ship an image with precompiled bytecode '
+                '(python -m compileall) and leave caching on.'
+            ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from users.models import Project
+from users.project_stats import recompute, stale_projects
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the denormalized ProjectStats counters from tasks, logs and '
+        'memberships. Needed after bulk edits that bypass model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', dest='projects',
+                            help='Only this project id (repeatable).')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report projects whose counters are stale; change nothing.')
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options['projects']:
+            projects = projects.filter(id__in=options['projects'])
+
+        if options['check']:
+            stale = stale_projects(projects)
+            for project_id in stale:
+                self.stdout.write(f'Project {project_id} has stale stats.')
+            self.stdout.write(f'{len(stale)} project(s) with stale stats.')
+            return
+
+        repaired = recompute(projects)
+        self.stdout.write(self.style.SUCCESS(f'Repaired stats for {len(repaired)} project(s).'))
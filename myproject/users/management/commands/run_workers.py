@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+# Nothing here may import models at module level: spawned workers import this
+# module to find _init_worker before Django is set up.
+
+
+def _init_worker():
+    if not apps.ready:
+        django.setup()
+
+
+def _run(job_id):
+    from users import jobs
+    return jobs.run_job(job_id)
+
+
+def _pool(processes):
+    # Spawned rather than forked, so workers never inherit the parent's
+    # database connections and open their own.
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (exports, report aggregates, summaries) in a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: CPU count).')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--purge-interval', type=float, default=300.0,
+                            help='Seconds between sweeps for expired job results.')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Requeue jobs left running for this many seconds by a dead worker.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained instead of polling forever.')
+
+    def handle(self, *args, **options):
+        from users import jobs
+
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+        purge_interval = options['purge_interval']
+
+        requeued, failed = jobs.requeue_stale_jobs(timedelta(seconds=options['stale_after']))
+        if requeued or failed:
+            self.stdout.write(f'Requeued {requeued} and failed {failed} stale job(s).')
+
+        in_flight = {}
+        last_purge = 0.0
+        self.stdout.write(f'Running jobs with {processes} process(es).')
+
+        pool = _pool(processes)
+        try:
+            while True:
+                try:
+                    while len(in_flight) < processes:
+                        job = jobs.claim_next_job()
+                        if job is None:
+                            break
+                        in_flight[pool.submit(_run, job.id)] = job
+                        self.stdout.write(f'Started {job}.')
+
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                    else:
+                        done, _pending = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            job = in_flight[future]
+                            try:
+                                self.stdout.write(f'Finished {job.kind} #{job.pk}: {future.result()}.')
+                            except BrokenProcessPool:
+                                raise
+                            except Exception as e:
+                                self.stderr.write(f'Job #{job.pk} crashed its worker: {e!r}')
+                            del in_flight[future]
+                except BrokenProcessPool:
+                    # A child died (segfault, OOM kill) and took the pool with
+                    # it. Release every job it was running and start afresh.
+                    requeued, failed = jobs.release_jobs([job.pk for job in in_flight.values()])
+                    self.stderr.write(
+                        f'A worker process died; requeued {requeued} and failed {failed} job(s).'
+                    )
+                    in_flight.clear()
+                    pool.shutdown(wait=False)
+                    pool = _pool(processes)
+
+                if time.monotonic() - last_purge >= purge_interval:
+                    purged = jobs.purge_expired_jobs()
+                    if purged:
+                        self.stdout.write(f'Purged {purged} expired job(s).')
+                    last_purge = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write('Shutting down; waiting for running jobs to finish.')
+        finally:
+            pool.shutdown(wait=True)
@@ -0,0 +1,95 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import serving
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the project with gunicorn: gthread (WSGI) or uvicorn (ASGI) workers sized from the CPU count, '
+        'app preloaded in the master, optional warm-up, and per-worker utilization logging.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default='0.0.0.0:8000', help='Address to listen on (default: 0.0.0.0:8000).')
+        parser.add_argument('--worker-class', choices=serving.WORKER_CLASSES, default='gthread',
+                            help='gthread (WSGI, default) or uvicorn (ASGI).')
+        parser.add_argument('--workers', type=int, help='Override the worker count derived from the CPU count.')
+        parser.add_argument('--threads', type=int, help='Override the threads per gthread worker.')
+        parser.add_argument('--timeout', type=int, default=30, help='Seconds before a silent worker is restarted.')
+        parser.add_argument('--max-requests', type=int, default=0,
+                            help='Recycle a worker after this many requests (with 10%% jitter); 0 never does.')
+        parser.add_argument('--no-preload', action='store_true',
+                            help='Load the app in every worker instead of once in the master.')
+        parser.add_argument('--warm-up', action='store_true',
+                            help='Build the URL resolver and compile every template before forking.')
+        parser.add_argument('--stats-interval', type=float, default=60.0,
+                            help='Seconds between worker utilization reports; 0 turns them off.')
+        parser.add_argument('--print-config', action='store_true',
+                            help='Print the gunicorn settings as JSON and exit without serving.')
+
+    def handle(self, *args, **options):
+        config = serving.worker_config(options['worker_class'])
+        if options['workers']:
+            config['workers'] = max(1, options['workers'])
+        if options['threads'] and options['worker_class'] == 'gthread':
+            config['threads'] = max(1, options['threads'])
+        config.update({
+            'bind': options['bind'],
+            'timeout': options['timeout'],
+            'preload_app': not options['no_preload'],
+        })
+        if options['max_requests']:
+            config['max_requests'] = options['max_requests']
+            config['max_requests_jitter'] = max(1, options['max_requests'] // 10)
+
+        self.stdout.write(
+            f'{config["workers"]} {options["worker_class"]} worker(s) x {config["threads"]} thread(s) '
+            f'on {os.cpu_count() or 1} CPU(s), bind {config["bind"]}, preload {config["preload_app"]}.'
+        )
+        if options['print_config']:
+            self.stdout.write(json.dumps(config, indent=2, sort_keys=True))
+            return
+
+        try:
+            from gunicorn.app.base import BaseApplication
+        except ImportError:
+            raise CommandError('gunicorn is not installed; `pip install gunicorn` (and uvicorn for --worker-class uvicorn).')
+
+        asgi = options['worker_class'] == 'uvicorn'
+        tracker = serving.UtilizationTracker(config['threads'])
+        warm = options['warm_up']
+        stats_interval = options['stats_interval']
+        stdout = self.stdout
+
+        def load():
+            if asgi:
+                from myproject.asgi import application
+                wrapped = serving.TrackedASGIApplication(application, tracker)
+            else:
+                from myproject.wsgi import application
+                wrapped = serving.TrackedWSGIApplication(application, tracker)
+            if warm:
+                started = time.perf_counter()
+                templates = serving.warm_up()
+                stdout.write(f'Warmed up URL resolver and {templates} template(s) in {time.perf_counter() - started:.2f}s.')
+            return wrapped
+
+        def post_worker_init(worker):
+            tracker.report()  # Start counting from the fork, not from the master's load
+            if stats_interval > 0:
+                serving.start_reporter(tracker, stats_interval, log=worker.log.info)
+
+        class Server(BaseApplication):
+            def load_config(self):
+                for key, value in config.items():
+                    self.cfg.set(key, value)
+                self.cfg.set('post_worker_init', post_worker_init)
+
+            def load(self):
+                return load()
+
+        Server().run()
@@ -0,0 +1,57 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.analytics import analytics_report
+from users.responses import dumps
+
+
+class Command(BaseCommand):
+    help = 'Print estimation accuracy, velocity, burn-down and blocker dwell time analytics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, help='Only this project id (default: all projects).')
+        parser.add_argument('--start', help='First day (YYYY-MM-DD; default: 12 weeks before --end).')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD; default: today).')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON.')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError:
+            raise CommandError('--start and --end must be in YYYY-MM-DD format.')
+
+        report = analytics_report(project_id=options['project'], start=start, end=end)
+        if options['json']:
+            self.stdout.write(dumps(report).decode('utf-8'))
+            return
+
+        self.stdout.write(f"Analytics for {report['start']} to {report['end']} ({report['backend']} backend)")
+        errors = report['estimation_error']
+        self.stdout.write(f"\nEstimation error over {errors['count']} task(s)")
+        if errors['count']:
+            self.stdout.write(
+                f"  median {errors['median']:+.2f}, p10 {errors['p10']:+.2f}, p90 {errors['p90']:+.2f}, "
+                f"{errors['within_25_percent']:.0%} within 25%"
+            )
+            for bucket in errors['histogram']:
+                self.stdout.write(f"  {bucket['label']:>14}  {bucket['count']}")
+
+        self.stdout.write('\nVelocity (average per week: estimated hours completed / hours logged)')
+        for row in report['velocity']['users']:
+            self.stdout.write(f"  {row['username']:<20} {row['average_completed']:.1f} / {row['average_logged']:.1f}")
+
+        burn_down = report['burn_down']
+        if burn_down:
+            self.stdout.write(
+                f"\nBurn-down: {burn_down[0]['remaining']:.1f}h remaining on {burn_down[0]['day']}, "
+                f"{burn_down[-1]['remaining']:.1f}h on {burn_down[-1]['day']}"
+            )
+
+        blockers = report['blocker_dwell']
+        self.stdout.write(f"\nBlocked tasks: {blockers['count']}")
+        if blockers['count']:
+            self.stdout.write(f"  mean {blockers['mean_days']:.1f} days, longest {blockers['max_days']:.1f} days")
+            for task in blockers['longest']:
+                self.stdout.write(f"  #{task['id']} {task['title']}: {task['days']:.1f} days")
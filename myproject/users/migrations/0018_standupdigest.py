@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StandupDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('data', models.JSONField(default=dict)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standup_digests', to='users.project')),
+            ],
+            options={
+                'unique_together': {('project', 'day')},
+            },
+        ),
+    ]
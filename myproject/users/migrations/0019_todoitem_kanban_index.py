@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_standupdigest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['project', 'status', 'created_at'], name='users_todoi_project_5121d6_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_project_stats(apps, schema_editor):
+    Project = apps.get_model('users', 'Project')
+    ProjectStats = apps.get_model('users', 'ProjectStats')
+    TodoItem = apps.get_model('users', 'TodoItem')
+    ProjectMembership = apps.get_model('users', 'ProjectMembership')
+
+    stats = {project_id: ProjectStats(project_id=project_id) for project_id in Project.objects.values_list('id', flat=True)}
+    task_rows = TodoItem.objects.filter(project__isnull=False).order_by().values_list('project_id', 'status').annotate(
+        count=models.Count('id'), hours=models.Sum('time_spent'),
+    )
+    for project_id, status, count, hours in task_rows:
+        if hasattr(stats[project_id], f'{status}_count'):
+            setattr(stats[project_id], f'{status}_count', count)
+        stats[project_id].total_hours += hours or 0
+    member_rows = ProjectMembership.objects.order_by().values_list('project_id').annotate(count=models.Count('id'))
+    for project_id, count in member_rows:
+        stats[project_id].member_count = count
+    ProjectStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0019_todoitem_kanban_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.project')),
+                ('todo_count', models.IntegerField(default=0)),
+                ('inprogress_count', models.IntegerField(default=0)),
+                ('done_count', models.IntegerField(default=0)),
+                ('blocker_count', models.IntegerField(default=0)),
+                ('member_count', models.IntegerField(default=0)),
+                ('total_hours', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'project stats',
+            },
+        ),
+        migrations.RunPython(populate_project_stats, migrations.RunPython.noop),
+    ]
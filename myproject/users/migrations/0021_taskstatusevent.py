@@ -0,0 +1,43 @@
+# Generated by Django 3.2.25 on 2026-10-19 14:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_status_events(apps, schema_editor):
+    # Without history, each existing task enters its project in its current
+    # status when it was created.
+    TodoItem = apps.get_model('users', 'TodoItem')
+    TaskStatusEvent = apps.get_model('users', 'TaskStatusEvent')
+    tasks = TodoItem.objects.filter(project__isnull=False).values_list('id', 'project_id', 'status', 'created_at')
+    TaskStatusEvent.objects.bulk_create([
+        TaskStatusEvent(task_id=task_id, project_id=project_id, to_status=status, timestamp=created_at)
+        for task_id, project_id, status, created_at in tasks.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_projectstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=10)),
+                ('to_status', models.CharField(blank=True, max_length=10)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='users.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to='users.todoitem')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='taskstatusevent',
+            index=models.Index(fields=['project', 'timestamp'], name='users_tasks_project_79b49e_idx'),
+        ),
+        migrations.RunPython(backfill_status_events, migrations.RunPython.noop),
+    ]
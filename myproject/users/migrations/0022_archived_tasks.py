@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0021_taskstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTodoItem',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('time_spent', models.FloatField(default=0)),
+                ('estimation_time', models.FloatField(default=0)),
+                ('status', models.CharField(choices=[('todo', 'To Do'), ('inprogress', 'In Progress'), ('done', 'Done'), ('blocker', 'Blocker')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_todo_items', to='users.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_todo_items', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTodoLog',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('log_time', models.FloatField(default=0)),
+                ('task_date', models.DateField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('todo_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='users.archivedtodoitem')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedtodolog',
+            index=models.Index(fields=['task_date'], name='users_archi_task_da_2e7369_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtodoitem',
+            index=models.Index(fields=['user', 'created_at'], name='users_archi_user_id_13a461_idx'),
+        ),
+    ]
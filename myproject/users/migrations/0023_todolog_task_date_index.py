@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0022_archived_tasks'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todolog',
+            index=models.Index(fields=['task_date', 'todo_item'], name='users_todol_task_da_c936a3_idx'),
+        ),
+    ]
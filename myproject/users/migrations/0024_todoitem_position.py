@@ -0,0 +1,72 @@
+# Generated by Django 3.2.25 on 2026-10-19 15:19
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+# Copied from users/positions.py as of this migration, so later changes to
+# the rank scheme can't change what this migration writes.
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+
+def rank_between(before=None, after=None):
+    before, after = before or '', after or None
+    if after is not None and before >= after:
+        raise ValueError(f'{before!r} does not sort before {after!r}.')
+    if after is not None:
+        prefix = 0
+        while prefix < len(after) and (before[prefix] if prefix < len(before) else '0') == after[prefix]:
+            prefix += 1
+        if prefix:
+            return after[:prefix] + rank_between(before[prefix:], after[prefix:])
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    if after is not None and len(after) > 1:
+        return after[0]
+    return DIGITS[low] + rank_between(before[1:], None)
+
+
+def ranks_between(before, after, count):
+    if count <= 0:
+        return []
+    middle = rank_between(before, after)
+    half = (count - 1) // 2
+    return ranks_between(before, middle, half) + [middle] + ranks_between(middle, after, count - 1 - half)
+
+
+def populate_positions(apps, schema_editor):
+    # Existing columns keep their old order: oldest task first.
+    TodoItem = apps.get_model('users', 'TodoItem')
+    rows = TodoItem.objects.order_by('project_id', 'status', 'created_at', 'id').values_list('id', 'project_id', 'status')
+    tasks = []
+    for _column, column_rows in groupby(rows.iterator(), key=lambda row: row[1:]):
+        ids = [task_id for task_id, _project_id, _status in column_rows]
+        tasks.extend(TodoItem(id=task_id, position=rank) for task_id, rank in zip(ids, ranks_between(None, None, len(ids))))
+    TodoItem.objects.bulk_update(tasks, ['position'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0023_todolog_task_date_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='todoitem',
+            name='users_todoi_project_5121d6_idx',
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='position',
+            field=models.CharField(blank=True, default='', max_length=80),
+        ),
+        migrations.RunPython(populate_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['project', 'status', 'position'], name='users_todoi_project_26a3c7_idx'),
+        ),
+    ]
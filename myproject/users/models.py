@@ -2,8 +2,38 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+class LoadedValuesMixin:
+    """
+    Keeps the column values an instance was loaded (or last saved) with in
+    ``_loaded_values``, keyed by attname, so save/delete hooks can tell what
+    changed without re-reading the row. Instances that were never loaded or
+    saved have an empty dict.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Refreshed after post_save, so every receiver sees the pre-save values.
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields if field.attname not in deferred
+        }
+
+    def loaded_value(self, attname, default=None):
+        return getattr(self, '_loaded_values', {}).get(attname, default)
+
+    @property
+    def is_tracked(self):
+        return bool(getattr(self, '_loaded_values', None))
+
+
 # Create your models here.
-class TodoItem(models.Model):
+class TodoItem(LoadedValuesMixin, models.Model):
     """
     The TodoItem model (also referred to as the Task model) represents a user's task or to-do item.
     It tracks the user, title, description, time spent (in minutes), creation and update timestamps,
@@ -30,6 +60,14 @@ class TodoItem(models.Model):
         choices=STATUS_CHOICES,
         default='todo',
     )
+    # Lexicographic rank within the Kanban column (see users/positions.py)
+    position = models.CharField(max_length=80, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Kanban columns: one project's tasks of one status, in board order
+            models.Index(fields=['project', 'status', 'position']),
+        ]
 
     @property
     def time_spent_hours(self):
@@ -39,9 +77,29 @@ class TodoItem(models.Model):
     def estimation_time_hours(self):
         return self.estimation_time
 
+    # ArchivedTodoItem sets this to True; templates use it to hide editing.
+    is_archived = False
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # New tasks, and tasks moved to another column without a new
+        # position, go to the end of their column. Saving with 'position' in
+        # update_fields means the caller picked it (the Kanban move API).
+        update_fields = kwargs.get('update_fields')
+        explicit = update_fields is not None and 'position' in update_fields
+        if not explicit and (not self.position or self._changes_column()):
+            from .positions import end_of_column
+            self.position = end_of_column(self.project_id, self.status)
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'position']
+        super().save(*args, **kwargs)
+
+    def _changes_column(self):
+        loaded = getattr(self, '_loaded_values', {})
+        return any(attname in loaded and loaded[attname] != getattr(self, attname) for attname in ('status', 'project_id'))
+
     def update_time_spent(self):
         total_time_hours = self.logs.aggregate(total=models.Sum('log_time'))['total'] or 0
         self.time_spent = total_time_hours
@@ -49,12 +107,20 @@ class TodoItem(models.Model):
 
 # Project and ProjectMembership Models
 
-class TodoLog(models.Model):
+class TodoLog(LoadedValuesMixin, models.Model):
     todo_item = models.ForeignKey(TodoItem, on_delete=models.CASCADE, related_name='logs')
     log_time = models.FloatField(default=0)
     task_date = models.DateField(null=True, blank=True)
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Standup digests and time series read one day (or range) at a
+            # time. On PostgreSQL the table can also be partitioned by month;
+            # see users/partitioning.py.
+            models.Index(fields=['task_date', 'todo_item']),
+        ]
+
     def __str__(self):
         return f"Log for {self.todo_item.title} on {self.task_date}"
 
@@ -69,6 +135,55 @@ class Project(models.Model):
     def __str__(self):
         return self.name
 
+class ProjectStats(models.Model):
+    """
+    Denormalized counters for one project: tasks per status, members and
+    hours logged. Kept current by the receivers below (see
+    users/project_stats.py) so project lists can show them without
+    aggregating; `manage.py repair_project_stats` rebuilds them.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    todo_count = models.IntegerField(default=0)
+    inprogress_count = models.IntegerField(default=0)
+    done_count = models.IntegerField(default=0)
+    blocker_count = models.IntegerField(default=0)
+    member_count = models.IntegerField(default=0)
+    total_hours = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'project stats'
+
+    def __str__(self):
+        return f'Stats for {self.project_id}'
+
+    @property
+    def task_count(self):
+        return self.todo_count + self.inprogress_count + self.done_count + self.blocker_count
+
+class TaskStatusEvent(models.Model):
+    """
+    Append-only history of task status transitions, for cumulative-flow and
+    burn-down charts. Written by the TodoItem save/delete hooks below, and in
+    bulk by users/status_history.py for queryset updates.
+
+    ``from_status`` is blank when a task enters the project (created or moved
+    in) and ``to_status`` is blank when it leaves (deleted or moved out).
+    ``project`` is the task's project at the time of the event.
+    """
+    task = models.ForeignKey(TodoItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='status_events')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='status_events')
+    from_status = models.CharField(max_length=10, blank=True)
+    to_status = models.CharField(max_length=10, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f'Task {self.task_id}: {self.from_status or "-"} -> {self.to_status or "-"}'
+
 class ProjectMembership(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_memberships')
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='memberships')
@@ -80,16 +195,29 @@ class ProjectMembership(models.Model):
     def __str__(self):
         return f'{self.user.username} - {self.project.name}'
 
+from datetime import date
+
 from django.conf import settings
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
+from django.db import transaction
+from .avatars import invalidate_avatar_url
+from .deferred import pending_work
+from .thumbnails import delete_thumbnails, generate_thumbnail_in_background
+
+# The bookkeeping receivers below only record ids inside defer_signals() and
+# leave the work to its set-based catch-up (see users/deferred.py).
 
 @receiver(post_save, sender='users.TodoLog')
 @receiver(post_delete, sender='users.TodoLog')
 def update_todo_time_spent(sender, instance, **kwargs):
+    pending = pending_work()
+    if pending is not None:
+        pending.note_log(instance)
+        return
     instance.todo_item.update_time_spent()
 
-class UserProfile(models.Model):
+class UserProfile(LoadedValuesMixin, models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
@@ -97,20 +225,344 @@ class UserProfile(models.Model):
     def __str__(self):
         return f'{self.user.username} Profile'
 
+    @classmethod
+    def for_user(cls, user):
+        """``user.profile``, created on first access if the user has none yet."""
+        try:
+            return user.profile
+        except cls.DoesNotExist:
+            profile, _created = cls.objects.get_or_create(user=user)
+            user.profile = profile
+            return profile
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_avatar(sender, instance, **kwargs):
+    invalidate_avatar_url(instance.user_id)
+    storage, user_id = instance.profile_picture.storage, instance.user_id
+    if kwargs.get('signal') is post_delete:
+        old, new = instance.profile_picture.name, None
+    else:
+        # _loaded_values holds the name as read from the row, or the FieldFile after a save.
+        old = getattr(instance.loaded_value('profile_picture'), 'name', instance.loaded_value('profile_picture'))
+        new = instance.profile_picture.name
+        if instance.is_tracked and old == new:
+            return  # Bio-only edit: the thumbnail is still current.
+    if old:
+        transaction.on_commit(lambda: delete_thumbnails(storage, old))
+    if new:
+        # Thumbnail the upload once it's committed, so the first board load
+        # after an upload doesn't have to.
+        transaction.on_commit(lambda: generate_thumbnail_in_background(
+            storage, new, on_done=lambda: invalidate_avatar_url(user_id)
+        ))
+
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
+def create_user_profile(sender, instance, created, raw, **kwargs):
+    # Only new users need a profile. Every login saves last_login, so doing a
+    # lookup on each save cost every login a query; users that somehow lack a
+    # profile get one from UserProfile.for_user() or `backfill_profiles`.
+    if not created or raw:
+        return
+    pending = pending_work()
+    if pending is not None:
+        pending.note_profile(instance.pk)
+        return
+    UserProfile.objects.create(user=instance)
+
+class Job(models.Model):
+    """
+    A unit of background work (report export, summary, ...) picked up by
+    `manage.py run_workers`. Handlers are registered in users/jobs.py under
+    the job's ``kind``.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    progress = models.FloatField(default=0)  # Percent complete, 0-100
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='job_results/', blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk} ({self.status})'
+
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
+
+    def set_progress(self, percent):
+        self.progress = max(0, min(100, percent))
+        Job.objects.filter(pk=self.pk).update(progress=self.progress)
+
+
+class StandupDigest(models.Model):
+    """
+    Snapshot of one project's standup data for one day: hours logged per
+    member and per task. Built by users/standup.py and kept current by the
+    TodoLog save/delete hooks, so the project summary page reads two rows
+    instead of aggregating every member's logs.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='standup_digests')
+    day = models.DateField()
+    data = models.JSONField(default=dict)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('project', 'day')
+
+    def __str__(self):
+        return f'{self.project.name} standup {self.day}'
+
+
+@receiver(post_save, sender=TodoLog)
+@receiver(post_delete, sender=TodoLog)
+def refresh_standup_digest(sender, instance, **kwargs):
+    from .standup import refresh_member
+    pending = pending_work()
+    if pending is not None:
+        pending.note_log(instance)
+        return
+    todo = instance.todo_item
+    affected = {(todo.project_id, todo.user_id, instance.task_date)}
+    if instance.is_tracked:
+        old_todo_id, old_date = instance.loaded_value('todo_item_id'), instance.loaded_value('task_date')
+        if old_todo_id != instance.todo_item_id:
+            old = TodoItem.objects.filter(id=old_todo_id).values_list('project_id', 'user_id').first()
+            if old:
+                affected.add((old[0], old[1], old_date))
+        elif old_date != instance.task_date:
+            affected.add((todo.project_id, todo.user_id, old_date))
+    for project_id, user_id, day in affected:
+        refresh_member(project_id, user_id, day)
+
+@receiver(post_save, sender=TodoItem)
+def invalidate_standup_on_task_change(sender, instance, created, **kwargs):
+    pending = pending_work()
+    if pending is not None:
+        pending.note_task(instance)
+        return
+    if created or not instance.is_tracked:
+        return
+    # Titles, owners and projects are baked into digests; rebuild them lazily.
+    if any(instance.loaded_value(attname) != getattr(instance, attname) for attname in ('title', 'user_id', 'project_id')):
+        from .standup import invalidate_project
+        invalidate_project(instance.loaded_value('project_id'), instance.project_id)
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def invalidate_standup_on_membership_change(sender, instance, **kwargs):
+    from .standup import invalidate_project
+    pending = pending_work()
+    if pending is not None:
+        pending.note_project(instance.project_id)
+        return
+    invalidate_project(instance.project_id)
+
+@receiver(m2m_changed, sender=Project.members.through)
+def invalidate_standup_on_members_add(sender, instance, action, reverse, pk_set, **kwargs):
+    # project.members.add() bulk-creates memberships without post_save.
+    from .standup import invalidate_project
+    if action != 'post_add' or not pk_set:
+        return
+    project_ids = pk_set if reverse else {instance.pk}
+    pending = pending_work()
+    if pending is not None:
+        for project_id in project_ids:
+            pending.note_project(project_id)
+        return
+    invalidate_project(*project_ids)
+
+@receiver(post_save, sender=Project)
+def create_project_stats(sender, instance, created, **kwargs):
+    if not created:
+        return
+    pending = pending_work()
+    if pending is not None:
+        pending.note_project(instance.pk)
+        return
+    ProjectStats.objects.get_or_create(project=instance)
+
+@receiver(post_save, sender=TodoItem)
+def update_project_stats_on_task_save(sender, instance, created, **kwargs):
+    from .project_stats import task_saved
+    pending = pending_work()
+    if pending is not None:
+        pending.note_task(instance)
+        return
+    task_saved(instance, created)
+
+@receiver(post_delete, sender=TodoItem)
+def update_project_stats_on_task_delete(sender, instance, **kwargs):
+    from .project_stats import task_deleted
+    pending = pending_work()
+    if pending is not None:
+        pending.note_task(instance)
+        return
+    task_deleted(instance)
+
+@receiver(post_save, sender=ProjectMembership)
+@receiver(post_delete, sender=ProjectMembership)
+def update_project_member_count(sender, instance, **kwargs):
+    from .project_stats import member_count_changed
+    pending = pending_work()
+    if pending is not None:
+        pending.note_project(instance.project_id)
+        return
+    if kwargs.get('signal') is post_delete:
+        member_count_changed(instance.project_id, -1)
+    elif kwargs.get('created'):
+        member_count_changed(instance.project_id, 1)
+
+@receiver(m2m_changed, sender=Project.members.through)
+def update_project_member_count_on_add(sender, instance, action, reverse, pk_set, **kwargs):
+    # project.members.add() bulk-creates memberships without post_save;
+    # removals go through post_delete above.
+    from .project_stats import member_count_changed
+    if action != 'post_add' or not pk_set:
+        return
+    pending = pending_work()
+    if pending is not None:
+        for project_id in (pk_set if reverse else {instance.pk}):
+            pending.note_project(project_id)
+        return
+    if reverse:
+        # user.projects.add(...): instance is the user, pk_set the projects.
+        for project_id in pk_set:
+            member_count_changed(project_id, 1)
     else:
-        # For existing users, ensure their profile exists, creating if necessary.
-        # Then save it (e.g., to update auto_now fields on the profile if any).
-        # This also handles the case where a User might have been created without
-        # the signal firing (e.g. loaddata, or if signal was temporarily disconnected)
-        profile, created = UserProfile.objects.get_or_create(user=instance)
-        if not created:
-            # If the profile already existed, we might want to save it if it has
-            # auto_now fields or custom save logic that needs to run.
-            # However, only save if necessary to avoid extra DB hits.
-            # For a simple UserProfile like this one, it might not be strictly needed
-            # unless there are fields on UserProfile that are updated by its save() method.
-            pass # Or profile.save() if specific conditions require it.
\ No newline at end of file
+        member_count_changed(instance.pk, len(pk_set))
+
+@receiver(post_save, sender=TodoLog)
+@receiver(post_delete, sender=TodoLog)
+def invalidate_timeseries_on_backdated_log(sender, instance, **kwargs):
+    # Elapsed days are cached as immutable (see timeseries.py); only a log
+    # written, moved or deleted on one of those days can make them stale.
+    pending = pending_work()
+    if pending is not None:
+        pending.note_log(instance)
+        return
+    today = date.today()
+    touched = {(instance.todo_item_id, instance.task_date)}
+    if instance.is_tracked:
+        touched.add((instance.loaded_value('todo_item_id'), instance.loaded_value('task_date')))
+    touched = {(task_id, day) for task_id, day in touched if task_id is not None and day is not None and day < today}
+    if not touched:
+        return
+    from .timeseries import invalidate_logged_day
+    rows = TodoItem.objects.filter(id__in={task_id for task_id, _day in touched}).values_list('id', 'project_id', 'user_id')
+    tasks = {task_id: (project_id, user_id) for task_id, project_id, user_id in rows}
+    for task_id, day in touched:
+        if task_id in tasks:
+            project_id, user_id = tasks[task_id]
+            invalidate_logged_day(day, project_id, user_id, task_id)
+
+@receiver(post_save, sender=TodoItem)
+def invalidate_timeseries_on_task_move(sender, instance, created, **kwargs):
+    pending = pending_work()
+    if pending is not None:
+        pending.note_task(instance)
+        return
+    if created or not instance.is_tracked:
+        return
+    old_project_id, old_user_id = instance.loaded_value('project_id'), instance.loaded_value('user_id')
+    if (old_project_id, old_user_id) != (instance.project_id, instance.user_id):
+        from .timeseries import bump_generations
+        bump_generations(
+            project_ids={old_project_id, instance.project_id},
+            user_ids={old_user_id, instance.user_id},
+        )
+
+@receiver(post_save, sender=TodoItem)
+def record_task_status_event(sender, instance, created, **kwargs):
+    from .status_history import status_events_for_save
+    events = status_events_for_save(instance, created)
+    if events:
+        TaskStatusEvent.objects.bulk_create(events)
+
+@receiver(post_delete, sender=TodoItem)
+def record_task_removal_event(sender, instance, **kwargs):
+    pending = pending_work()
+    if pending is not None and pending.archiving:
+        return
+    if instance.project_id is not None:
+        # The task row is gone, so the event can't point at it any more.
+        TaskStatusEvent.objects.create(project_id=instance.project_id, from_status=instance.status)
+
+
+class ArchivedTodoItem(models.Model):
+    """
+    A done TodoItem moved out of the hot table by `manage.py archive` (see
+    users/archive.py). It keeps its original id, so todo_detail links keep
+    working, and the fields the task pages and reports read.
+    """
+    is_archived = True
+
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_todo_items')
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_todo_items')
+    title = models.CharField(max_length=100)
+    description = models.TextField()
+    time_spent = models.FloatField(default=0)
+    estimation_time = models.FloatField(default=0)
+    status = models.CharField(max_length=10, choices=TodoItem.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    @property
+    def time_spent_hours(self):
+        return self.time_spent
+
+    @property
+    def estimation_time_hours(self):
+        return self.estimation_time
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedTodoLog(models.Model):
+    id = models.IntegerField(primary_key=True)
+    todo_item = models.ForeignKey(ArchivedTodoItem, on_delete=models.CASCADE, related_name='logs')
+    log_time = models.FloatField(default=0)
+    task_date = models.DateField(null=True, blank=True)
+    notes = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Logged-hours time series read archived logs by day too.
+            models.Index(fields=['task_date']),
+        ]
+
+    def __str__(self):
+        return f"Archived log for {self.todo_item.title} on {self.task_date}"
@@ -0,0 +1,175 @@
+"""
+Monthly range partitioning of the TodoLog table. PostgreSQL only.
+
+Standup digests, time series and the board filter logs by ``task_date``,
+nearly always a single day. With ``users_todolog`` partitioned by month,
+PostgreSQL prunes such queries down to one partition, whatever the table's
+total size.
+
+Partitioning is opt-in: `manage.py partition_todologs` converts the table in
+one transaction.
+1. Rename the table to ``users_todolog_unpartitioned``.
+2. Create a partitioned ``users_todolog`` with monthly partitions covering
+   the existing data plus ``ahead`` months, and a DEFAULT partition for
+   dates beyond them.
+3. Copy the rows over and recreate the indexes and the foreign key.
+
+Run it again (e.g. monthly from cron) to add upcoming months; rows already
+sitting in the DEFAULT partition for those months are moved in.
+
+A partitioned table's primary key has to include the partition key, so it
+becomes ``(id, task_date)``. That makes ``task_date`` NOT NULL: the
+conversion refuses to run while any log has no date, and logs written
+afterwards need one.
+
+The tests for the conversion only run against PostgreSQL: point the suite at
+one with the ``DB_*`` settings from .env-example.
+
+Other databases get no partitioning; `partition_todologs` and
+`bench_log_partitions` refuse to run there. The (task_date, todo_item) index
+from migration 0023 is what keeps date-filtered queries cheap on them.
+"""
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+
+TABLE = 'users_todolog'
+UNPARTITIONED_TABLE = 'users_todolog_unpartitioned'
+DEFAULT_PARTITION = 'users_todolog_default'
+DEFAULT_MONTHS_AHEAD = 3
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def month_starts(first, last):
+    """First days of every month from ``first``'s to ``last``'s, inclusive."""
+    months, current = [], month_start(first)
+    while current <= last:
+        months.append(current)
+        current = next_month(current)
+    return months
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def add_months(day, months):
+    for _ in range(months):
+        day = next_month(day)
+    return day
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        "SELECT c.relkind = 'p' FROM pg_class c WHERE c.relname = %s AND pg_table_is_visible(c.oid)", [TABLE]
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def existing_partitions(cursor):
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE parent.relname = %s', [TABLE]
+    )
+    return {name for name, in cursor.fetchall()}
+
+
+def _attach_month(cursor, month):
+    """Create the partition for ``month``, moving in any rows the DEFAULT partition holds for it."""
+    name, end = partition_name(month), next_month(month)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE task_date >= %s AND task_date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved', [month, end]
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{end}')")
+
+
+def ensure_partitions(cursor, first, last):
+    """Add the missing monthly partitions from ``first``'s month to ``last``'s. Returns their names."""
+    existing = existing_partitions(cursor)
+    added = []
+    for month in month_starts(first, last):
+        if partition_name(month) not in existing:
+            _attach_month(cursor, month)
+            added.append(partition_name(month))
+    return added
+
+
+def partition_todolog(months_ahead=DEFAULT_MONTHS_AHEAD, keep_unpartitioned=False, today=None):
+    """
+    Convert ``users_todolog`` to a monthly-partitioned table, or, if it
+    already is one, add partitions up to ``months_ahead`` months from now.
+    Returns the names of the partitions created.
+    """
+    if connection.vendor != 'postgresql':
+        raise ImproperlyConfigured(f'TodoLog partitioning needs PostgreSQL; this database is {connection.vendor}.')
+    today = today or date.today()
+    horizon = add_months(month_start(today), months_ahead)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            return ensure_partitions(cursor, month_start(today), horizon)
+
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE} WHERE task_date IS NULL')
+        undated = cursor.fetchone()[0]
+        if undated:
+            raise ImproperlyConfigured(
+                f'{undated} log(s) have no task_date. Partitioned logs need one, as it is part of the primary key.'
+            )
+        cursor.execute(f'SELECT MIN(task_date) FROM {TABLE}')
+        first = cursor.fetchone()[0] or today
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexdef NOT LIKE %s',
+            [TABLE, 'CREATE UNIQUE INDEX%'],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'", [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+
+        # Free the original index names for the new table.
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}')
+        for index_name, _definition in indexes:
+            cursor.execute(f'ALTER INDEX {index_name} RENAME TO {index_name[:55]}_unpart')
+
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS) PARTITION BY RANGE (task_date)'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} ALTER COLUMN task_date SET NOT NULL')
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_id_task_date_pk PRIMARY KEY (id, task_date)')
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+        created = [DEFAULT_PARTITION]
+        for month in month_starts(first, horizon):
+            cursor.execute(
+                f"CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+            )
+            created.append(partition_name(month))
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}')
+
+        for _index_name, definition in indexes:
+            cursor.execute(definition)
+        for constraint_name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {constraint_name} {definition}')
+        if sequence:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id')
+        if not keep_unpartitioned:
+            cursor.execute(f'DROP TABLE {UNPARTITIONED_TABLE}')
+    return created
@@ -0,0 +1,158 @@
+"""
+Kanban card order as lexicographic ranks.
+
+Every TodoItem has a ``position``: a short base-36 string that sorts where the
+card sits in its (project, status) column. Moving a card between two others
+gives it a new rank between theirs, so a move is one single-row UPDATE and no
+other card gets renumbered, however long the column is.
+
+``rank_between(a, b)`` builds such a rank. Ranks never end in ``'0'``, which
+guarantees there is always room for another one between two distinct ranks.
+Cards added at either end of a column (new tasks, drops at the top) step the
+neighbouring rank like a counter instead, so the common case keeps ranks
+short. Ranks still get longer as cards keep landing in the same gap. Once one
+would pass ``MAX_RANK_LENGTH``, or two cards end up with the same rank (two
+tasks created at the same time), ``rebalance_column`` evenly re-spaces that
+one column.
+
+Bulk status changes and reassignments (admin actions) keep each card's rank,
+so moved cards interleave with the ones already in their new column.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+MAX_RANK_LENGTH = 64
+# Ranks stepped at a column's ends are at least this long: room for BASE**4
+# appends before they have to grow.
+STEP_WIDTH = 4
+
+
+def rank_between(before=None, after=None):
+    """
+    A rank that sorts after ``before`` and before ``after``. Either may be
+    None (or '') for the start or end of the column.
+    """
+    before, after = before or '', after or None
+    if after is not None and before >= after:
+        raise ValueError(f'{before!r} does not sort before {after!r}.')
+    if after is not None:
+        # Keep the common prefix and find a rank between the remainders.
+        prefix = 0
+        while prefix < len(after) and (before[prefix] if prefix < len(before) else '0') == after[prefix]:
+            prefix += 1
+        if prefix:
+            return after[:prefix] + rank_between(before[prefix:], after[prefix:])
+    low = DIGITS.index(before[0]) if before else 0
+    high = DIGITS.index(after[0]) if after is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    if after is not None and len(after) > 1:
+        return after[0]
+    return DIGITS[low] + rank_between(before[1:], None)
+
+
+def ranks_between(before, after, count):
+    """``count`` increasing ranks between ``before`` and ``after``, spread by bisection."""
+    if count <= 0:
+        return []
+    middle = rank_between(before, after)
+    half = (count - 1) // 2
+    return ranks_between(before, middle, half) + [middle] + ranks_between(middle, after, count - 1 - half)
+
+
+def _step(rank, delta):
+    """
+    The next rank above (``delta=1``) or below (``delta=-1``) ``rank``, read
+    as a fixed-width base-36 number. None when the width is used up.
+    """
+    width = max(len(rank), STEP_WIDTH)
+    value = int(rank.ljust(width, '0'), BASE) + delta
+    while 0 <= value < BASE ** width:
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        stepped = ''.join(reversed(digits))
+        if not stepped.endswith('0'):
+            return stepped
+        value = int(stepped, BASE) + delta
+    return None
+
+
+def rank_after(before):
+    """A rank for the end of a column whose last card has rank ``before``."""
+    return (before and _step(before, 1)) or rank_between(before, None)
+
+
+def rank_before(after):
+    """A rank for the start of a column whose first card has rank ``after``."""
+    return (after and _step(after, -1)) or rank_between(None, after)
+
+
+def column(project_id, status):
+    from .models import TodoItem
+    return TodoItem.objects.filter(project_id=project_id, status=status)
+
+
+def last_position(project_id, status):
+    return column(project_id, status).aggregate(last=Max('position'))['last'] or None
+
+
+def end_of_column(project_id, status):
+    """A position after every card in the column, for new tasks and cards moved in."""
+    rank = rank_after(last_position(project_id, status))
+    if len(rank) > MAX_RANK_LENGTH:
+        rebalance_column(project_id, status)
+        rank = rank_after(last_position(project_id, status))
+    return rank
+
+
+def assign_end_positions(tasks):
+    """
+    Give unsaved tasks positions at the end of their columns, in list order,
+    for bulk_create (which skips TodoItem.save). One query per column.
+    """
+    last = {}
+    for task in tasks:
+        key = (task.project_id, task.status)
+        if key not in last:
+            last[key] = last_position(*key)
+        task.position = last[key] = rank_after(last[key])
+
+
+def rebalance_column(project_id, status):
+    """Give every card in the column a fresh, evenly spaced rank, keeping their order."""
+    from .models import TodoItem
+    with transaction.atomic():
+        tasks = list(column(project_id, status).select_for_update().order_by('position', 'id').only('id', 'position'))
+        for task, rank in zip(tasks, ranks_between(None, None, len(tasks))):
+            task.position = rank
+        TodoItem.objects.bulk_update(tasks, ['position'], batch_size=1000)
+
+
+def _rank_for(before_rank, after_rank):
+    if before_rank and after_rank:
+        return rank_between(before_rank, after_rank)
+    if after_rank:
+        return rank_before(after_rank)
+    return rank_after(before_rank)
+
+
+def position_between(project_id, status, before, after):
+    """
+    A position for a card dropped between the ``before`` and ``after`` ranks
+    (None for the column's ends). Falls back to rebalancing the column when
+    the neighbours tie or the new rank would be too long; the neighbours'
+    ranks are then re-read by id, so pass ``(id, rank)`` pairs.
+    """
+    before_id, before_rank = before or (None, None)
+    after_id, after_rank = after or (None, None)
+    if not (before_rank and after_rank and before_rank >= after_rank):
+        rank = _rank_for(before_rank, after_rank)
+        if len(rank) <= MAX_RANK_LENGTH:
+            return rank
+    rebalance_column(project_id, status)
+    ranks = dict(column(project_id, status).filter(id__in=[before_id, after_id]).values_list('id', 'position'))
+    return _rank_for(ranks.get(before_id), ranks.get(after_id))
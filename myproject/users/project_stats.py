@@ -0,0 +1,142 @@
+"""
+Denormalized per-project counters (see the ProjectStats model).
+
+Project lists show task counts by status, member counts and hours for every
+project. Rather than aggregating TodoItems for each row, the counters are
+kept on ProjectStats and adjusted with single F() UPDATEs as tasks, logs and
+memberships change (receivers in models.py). Task hours follow
+TodoItem.time_spent, which TodoLog writes already keep in sync.
+
+Changes made behind the ORM's back (queryset.update(), raw SQL) are not
+seen; `manage.py repair_project_stats` recomputes the counters from scratch.
+"""
+from django.db.models import Count, F, Sum
+
+from .models import Project, ProjectMembership, ProjectStats, TodoItem
+
+STATUS_COUNT_FIELDS = {status: f'{status}_count' for status, _label in TodoItem.STATUS_CHOICES}
+COUNTER_FIELDS = [*STATUS_COUNT_FIELDS.values(), 'member_count', 'total_hours']
+
+
+def status_field(status):
+    return STATUS_COUNT_FIELDS.get(status)
+
+
+def apply_deltas(project_id, deltas):
+    """
+    Add ``deltas`` ({counter field: amount}) to a project's counters in one
+    UPDATE. A project without a stats row gets one computed from scratch.
+    """
+    deltas = {field: amount for field, amount in deltas.items() if field and amount}
+    if project_id is None or not deltas:
+        return
+    updated = ProjectStats.objects.filter(project_id=project_id).update(
+        **{field: F(field) + amount for field, amount in deltas.items()}
+    )
+    if not updated:
+        recompute(Project.objects.filter(id=project_id))
+
+
+def computed_stats(projects):
+    """{project_id: {counter field: value}} computed from the source tables."""
+    project_ids = list(projects.values_list('id', flat=True))
+    stats = {project_id: dict.fromkeys(COUNTER_FIELDS, 0) for project_id in project_ids}
+
+    task_rows = TodoItem.objects.filter(project_id__in=project_ids).order_by().values_list(
+        'project_id', 'status'
+    ).annotate(count=Count('id'), hours=Sum('time_spent'))
+    for project_id, status, count, hours in task_rows:
+        if status in STATUS_COUNT_FIELDS:
+            stats[project_id][STATUS_COUNT_FIELDS[status]] = count
+        stats[project_id]['total_hours'] += hours or 0
+
+    member_rows = ProjectMembership.objects.filter(project_id__in=project_ids).order_by().values_list(
+        'project_id'
+    ).annotate(count=Count('id'))
+    for project_id, count in member_rows:
+        stats[project_id]['member_count'] = count
+    return stats
+
+
+def recompute(projects=None):
+    """
+    Rewrite the counters of ``projects`` (default: all) from the source
+    tables. Returns the ids of projects whose stored counters were wrong or
+    missing.
+    """
+    projects = projects if projects is not None else Project.objects.all()
+    expected = computed_stats(projects)
+    stored = {
+        stats.project_id: stats
+        for stats in ProjectStats.objects.filter(project_id__in=expected)
+    }
+    repaired = []
+    for project_id, values in expected.items():
+        stats = stored.get(project_id)
+        if stats is None:
+            ProjectStats.objects.create(project_id=project_id, **values)
+            repaired.append(project_id)
+        elif not _matches(stats, values):
+            ProjectStats.objects.filter(project_id=project_id).update(**values)
+            repaired.append(project_id)
+    return repaired
+
+
+def _matches(stats, values):
+    for field, value in values.items():
+        stored = getattr(stats, field)
+        # Hours are accumulated as floats; ignore rounding noise.
+        if abs(stored - value) > 1e-6:
+            return False
+    return True
+
+
+def stale_projects(projects=None):
+    """Ids of projects whose counters disagree with the source tables (read-only)."""
+    projects = projects if projects is not None else Project.objects.all()
+    expected = computed_stats(projects)
+    stored = {stats.project_id: stats for stats in ProjectStats.objects.filter(project_id__in=expected)}
+    return [
+        project_id for project_id, values in expected.items()
+        if project_id not in stored or not _matches(stored[project_id], values)
+    ]
+
+
+def task_saved(task, created):
+    """Move a task's contribution between counters after it was saved."""
+    new = (task.project_id, task.status, task.time_spent or 0)
+    if created:
+        old = (None, None, 0)
+    elif task.is_tracked:
+        old = (task.loaded_value('project_id'), task.loaded_value('status'), task.loaded_value('time_spent') or 0)
+    else:
+        # Saved from an instance that wasn't loaded from the database, so the
+        # previous values are unknown.
+        recompute(Project.objects.filter(id=task.project_id))
+        return
+    if old == new:
+        return
+    _move_task(old, new)
+
+
+def task_deleted(task):
+    _move_task((task.project_id, task.status, task.time_spent or 0), (None, None, 0))
+
+
+def _move_task(old, new):
+    old_project, old_status, old_hours = old
+    new_project, new_status, new_hours = new
+    if old_project == new_project:
+        deltas = {'total_hours': new_hours - old_hours}
+        if old_status != new_status:
+            deltas[status_field(old_status)] = -1
+            deltas[status_field(new_status)] = deltas.get(status_field(new_status), 0) + 1
+        apply_deltas(new_project, deltas)
+        return
+    apply_deltas(old_project, {status_field(old_status): -1, 'total_hours': -old_hours})
+    apply_deltas(new_project, {status_field(new_status): 1, 'total_hours': new_hours})
+
+
+def member_count_changed(project_id, delta):
+    apply_deltas(project_id, {'member_count': delta})
+
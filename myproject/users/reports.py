@@ -0,0 +1,207 @@
+"""
+Report builders shared by the report views and the background job queue.
+
+Each function takes plain arguments (a user, a project, a dict of filter
+parameters) rather than a request, so the same code can run inline in a view
+or later in a `run_workers` process.
+"""
+from datetime import date, timedelta
+
+from django.db.models import BooleanField, F, Q, Sum, Value
+
+from .models import ArchivedTodoItem, Project, TodoItem, UserProfile
+from .standup import standup_summary
+from .timeseries import MAX_BUCKETS, logged_hours_by_project
+
+CSV_REPORT_HEADER = [
+    'Username', 'Email', 'Bio',
+    'Todo Title', 'Todo Description', 'Project Name', 'Status',
+    'Time Spent (hours)', 'Created At', 'Updated At'
+]
+
+
+def apply_report_filters(tasks, params):
+    """
+    Apply the task report's search and filter parameters (q, status,
+    start_date, end_date, project) to a TodoItem queryset.
+    """
+    query = params.get('q')
+    if query:
+        tasks = tasks.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(project__name__icontains=query)
+        )
+    if params.get('status'):
+        tasks = tasks.filter(status=params['status'])
+    if params.get('start_date'):
+        tasks = tasks.filter(created_at__gte=params['start_date'])
+    if params.get('end_date'):
+        tasks = tasks.filter(created_at__lte=params['end_date'])
+    if params.get('project'):
+        tasks = tasks.filter(project_id=params['project'])
+    return tasks
+
+
+def report_tasks(user, params, order_by):
+    """
+    The task report's rows: the user's filtered tasks with time spent, in
+    ``order_by`` order. With ``params['archived']`` archived tasks are
+    included; the result is then a union of (sort key, id, archived) rows to
+    paginate, turned back into tasks with ``load_report_tasks``.
+    """
+    tasks = apply_report_filters(TodoItem.objects.filter(user=user, time_spent__gt=0), params)
+    if not params.get('archived'):
+        return tasks.order_by(order_by)
+    archived = apply_report_filters(ArchivedTodoItem.objects.filter(user=user, time_spent__gt=0), params)
+
+    def keys(queryset, is_archived):
+        return queryset.order_by().annotate(
+            sort_key=F(order_by.lstrip('-')), archived=Value(is_archived, output_field=BooleanField()),
+        ).values_list('sort_key', 'id', 'archived')
+
+    direction = '-' if order_by.startswith('-') else ''
+    return keys(tasks, False).union(keys(archived, True), all=True).order_by(f'{direction}sort_key', f'{direction}id')
+
+
+def load_report_tasks(rows):
+    """Live and archived tasks for a page of ``report_tasks`` union rows, in order."""
+    rows = list(rows)
+    found = {}
+    for model, is_archived in ((TodoItem, False), (ArchivedTodoItem, True)):
+        ids = [task_id for _key, task_id, archived in rows if archived == is_archived]
+        if ids:
+            found.update(((task.id, is_archived), task) for task in model.objects.filter(id__in=ids).select_related('project'))
+    return [found[task_id, bool(archived)] for _key, task_id, archived in rows if (task_id, bool(archived)) in found]
+
+
+def write_csv_report(user, out, progress=None, include_archived=False):
+    """
+    Write the user's time report as CSV to the file-like object ``out``.
+
+    ``progress``, if given, is called with a percentage as rows are written.
+    """
+    try:
+        profile = user.profile
+        user_bio = profile.bio if profile else ""
+    except UserProfile.DoesNotExist: # Django raises User.profile.RelatedObjectDoesNotExist if profile doesn't exist
+        user_bio = ""
+
+    todo_items = TodoItem.objects.filter(user=user, time_spent__gt=0).select_related('project') # Only include todos with time spent
+    querysets = [todo_items]
+    if include_archived:
+        querysets.append(ArchivedTodoItem.objects.filter(user=user, time_spent__gt=0).select_related('project'))
+
+    import csv  # Only CSV exports need it
+
+    writer = csv.writer(out)
+    writer.writerow(CSV_REPORT_HEADER)
+
+    total = sum(queryset.count() for queryset in querysets)
+    if not total:
+        # Write a row with user info even if there are no todos
+        writer.writerow([
+            user.username, user.email, user_bio,
+            'N/A', 'N/A', 'N/A', 'N/A', 'N/A', 'N/A', 'N/A'
+        ])
+        return
+
+    items = (item for queryset in querysets for item in queryset.iterator(chunk_size=2000))
+    for index, item in enumerate(items, start=1):
+        writer.writerow([
+            user.username,
+            user.email,
+            user_bio,
+            item.title,
+            item.description,
+            item.project.name if item.project else 'N/A', # Project Name
+            item.get_status_display(),
+            item.time_spent_hours,
+            item.created_at.strftime('%Y-%m-%d %H:%M:%S') if item.created_at else '',
+            item.updated_at.strftime('%Y-%m-%d %H:%M:%S') if item.updated_at else ''
+        ])
+        if progress is not None and index % 1000 == 0:
+            progress(100 * index / total)
+
+
+def task_report_totals(user, params, today=None):
+    """
+    Aggregates behind the task report: today's total plus hours per status
+    and per project for the filtered tasks.
+    """
+    today = today or date.today()
+    total_today = TodoItem.objects.filter(
+        user=user, created_at__date=today
+    ).aggregate(total_time=Sum('time_spent'))['total_time'] or 0
+
+    tasks = apply_report_filters(TodoItem.objects.filter(user=user, time_spent__gt=0), params)
+    by_status = dict(tasks.order_by().values_list('status').annotate(hours=Sum('time_spent')))
+    by_project = [
+        {'project_id': project_id, 'project_name': name, 'hours': hours}
+        for project_id, name, hours in tasks.order_by().values_list(
+            'project_id', 'project__name'
+        ).annotate(hours=Sum('time_spent'))
+    ]
+    return {
+        'total_time_spent_today_hours': total_today,
+        'hours_by_status': by_status,
+        'hours_by_project': by_project,
+    }
+
+
+def project_summary_data(project, today=None):
+    """
+    Yesterday/today standup data for every member of ``project``: hours
+    logged per member and per task title. Served from the standup digests
+    (see standup.py).
+    """
+    return standup_summary(project, today)
+
+
+LOGGED_HOURS_DEFAULT_WEEKS = 8
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def logged_hours_report(user, params, today=None):
+    """
+    Hours the user logged per week and project, over the report's
+    start_date/end_date (default: the last eight weeks), optionally limited
+    to one project.
+
+    Elapsed weeks come from the timeseries cache, so only the current week
+    is aggregated on a warm cache however long the range is.
+    """
+    today = today or date.today()
+    end = _parse_date(params.get('end_date')) or today
+    start = _parse_date(params.get('start_date')) or end - timedelta(weeks=LOGGED_HOURS_DEFAULT_WEEKS - 1)
+    if start > end:
+        start, end = end, start
+    start = max(start, end - timedelta(weeks=MAX_BUCKETS - 1))
+    try:
+        project_id = int(params['project']) if params.get('project') else None
+    except ValueError:
+        project_id = None
+
+    buckets = logged_hours_by_project(start, end, 'week', project_id=project_id, user_id=user.id, today=today)
+    project_ids = sorted({pk for _week, hours in buckets for pk in hours}, key=lambda pk: (pk is None, pk))
+    names = dict(Project.objects.filter(id__in=[pk for pk in project_ids if pk is not None]).values_list('id', 'name'))
+    weeks = [
+        {
+            'start': week,
+            'end': week + timedelta(days=6),
+            'hours': [hours.get(pk, 0) for pk in project_ids],
+            'total': sum(hours.values()),
+        }
+        for week, hours in reversed(buckets)
+    ]
+    return {
+        'projects': [names.get(pk, 'No project') for pk in project_ids],
+        'weeks': weeks,
+        'total': sum(week['total'] for week in weeks),
+    }
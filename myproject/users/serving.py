@@ -0,0 +1,179 @@
+"""
+Production serving for `manage.py serve` (gunicorn).
+
+The worker model is derived from the CPU count, so every host gets the same
+configuration for the same hardware and throughput numbers can be compared:
+
+- ``gthread`` (WSGI, the default): ``cpus + 1`` workers with ``4`` threads
+  each. Views spend most of their time waiting on the database, so threads
+  overlap that wait.
+- ``uvicorn`` (ASGI): ``2 * cpus + 1`` workers. Every view in this project
+  is synchronous, and Django runs sync views one at a time per ASGI worker,
+  so concurrency has to come from processes.
+
+The app is loaded once in the master before forking (``preload``), so
+workers share its memory and start instantly; ``warm_up`` additionally
+builds the URL resolver and compiles every template there. Each worker wraps
+the app in a ``UtilizationTracker`` and logs how busy its threads were every
+``stats_interval`` seconds.
+"""
+import importlib.util
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+GTHREAD_THREADS = 4
+WORKER_CLASSES = ('gthread', 'uvicorn')
+
+
+def worker_config(worker_class='gthread', cpus=None):
+    """Workers, threads and gunicorn worker class for this host (see the module docstring)."""
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f'Unknown worker class {worker_class!r}; use one of {", ".join(WORKER_CLASSES)}.')
+    cpus = cpus or os.cpu_count() or 1
+    if worker_class == 'gthread':
+        return {'worker_class': 'gthread', 'workers': cpus + 1, 'threads': GTHREAD_THREADS}
+    return {'worker_class': uvicorn_worker_class(), 'workers': 2 * cpus + 1, 'threads': 1}
+
+
+def uvicorn_worker_class():
+    # uvicorn.workers moved to the separate uvicorn-worker package.
+    if importlib.util.find_spec('uvicorn_worker') is not None:
+        return 'uvicorn_worker.UvicornWorker'
+    return 'uvicorn.workers.UvicornWorker'
+
+
+def warm_up():
+    """
+    Do in the master what every worker would otherwise do on its first
+    requests: import every view, build the URL resolver's lookup tables and
+    compile every template (kept when the cached template loader is on, as
+    it is with DEBUG off). Returns the number of templates compiled.
+    """
+    from django.db import connections
+    from django.template import engines
+    from django.template.exceptions import TemplateSyntaxError
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    resolver.reverse_dict  # Populates the reverse and namespace tables too
+    compiled = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _dirs, files in os.walk(directory):
+                for filename in files:
+                    if not filename.endswith('.html'):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory)
+                    try:
+                        engine.get_template(name)
+                    except TemplateSyntaxError:
+                        # Only stock admin templates meant to be extended fail to compile standalone.
+                        continue
+                    compiled += 1
+    # Workers must not inherit the master's database connections.
+    connections.close_all()
+    return compiled
+
+
+class UtilizationTracker:
+    """
+    Counts requests in flight in one worker and integrates them over time.
+    ``report()`` returns the figures since the previous report: requests
+    served, the share of the worker's ``capacity`` (threads) that was busy
+    and the peak concurrency.
+    """
+    def __init__(self, capacity, clock=time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self._reset(clock())
+
+    def _reset(self, now):
+        self.started = self.last_change = now
+        self.busy = 0.0
+        self.requests = 0
+        self.peak = self.in_flight
+
+    def _advance(self, now):
+        self.busy += self.in_flight * (now - self.last_change)
+        self.last_change = now
+
+    def begin(self):
+        with self.lock:
+            self._advance(self.clock())
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def end(self):
+        with self.lock:
+            self._advance(self.clock())
+            self.in_flight -= 1
+            self.requests += 1
+
+    def report(self):
+        with self.lock:
+            now = self.clock()
+            self._advance(now)
+            elapsed = now - self.started
+            stats = {
+                'requests': self.requests,
+                'utilization': self.busy / (self.capacity * elapsed) if elapsed > 0 else 0.0,
+                'peak': self.peak,
+                'seconds': elapsed,
+            }
+            self._reset(now)
+        return stats
+
+
+class TrackedWSGIApplication:
+    def __init__(self, application, tracker):
+        self.application = application
+        self.tracker = tracker
+
+    def __call__(self, environ, start_response):
+        self.tracker.begin()
+        try:
+            return self.application(environ, start_response)
+        finally:
+            self.tracker.end()
+
+
+class TrackedASGIApplication:
+    def __init__(self, application, tracker):
+        self.application = application
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        self.tracker.begin()
+        try:
+            return await self.application(scope, receive, send)
+        finally:
+            self.tracker.end()
+
+
+def format_report(pid, capacity, stats):
+    return (
+        f'worker {pid}: {stats["requests"]} requests in {stats["seconds"]:.0f}s, '
+        f'{stats["utilization"]:.0%} of {capacity} thread(s) busy, peak {stats["peak"]}'
+    )
+
+
+def _report_forever(tracker, interval, log):
+    while True:
+        time.sleep(interval)
+        log(format_report(os.getpid(), tracker.capacity, tracker.report()))
+
+
+def start_reporter(tracker, interval, log=logger.info):
+    """Log the tracker's figures every ``interval`` seconds from a daemon thread."""
+    thread = threading.Thread(target=_report_forever, args=(tracker, interval, log), daemon=True,
+                              name='utilization-reporter')
+    thread.start()
+    return thread
@@ -0,0 +1,131 @@
+"""
+Precomputed standup digests for the project summary page.
+
+A StandupDigest row holds one project's standup data for one day:
+
+    {"members": [{"id": 3, "username": "ana", "total": 5.5,
+                  "tasks": [["Fix login", 3.0], ["Review", 2.5]]}, ...]}
+
+Tasks are stored as [title, hours] pairs rather than an object so their order
+survives databases that reorder JSON keys.
+
+Digests are built lazily the first time a day is requested, or ahead of time
+by `manage.py build_standup_digests`. After that, TodoLog writes refresh only
+the affected member's entry. Membership changes and task renames drop the
+project's digests so they get rebuilt.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Min, Sum
+
+from .models import Project, StandupDigest, TodoLog
+
+
+def _member_hours(project_id, day, user_ids=None):
+    """
+    Hours per member and task title for one project/day, from one grouped
+    query. Returns {user_id: [[title, hours], ...]}, with tasks in the order
+    their first log was written.
+    """
+    logs = TodoLog.objects.filter(todo_item__project_id=project_id, task_date=day)
+    if user_ids is not None:
+        logs = logs.filter(todo_item__user_id__in=user_ids)
+    rows = logs.values_list('todo_item__user_id', 'todo_item__title').annotate(
+        hours=Sum('log_time'), first_log=Min('id'),
+    ).order_by('first_log')
+
+    hours = {}
+    for user_id, title, total, _first_log in rows:
+        hours.setdefault(user_id, []).append([title, total])
+    return hours
+
+
+def _member_entry(user_id, username, tasks):
+    # Several tasks can share a title; merge them like the page always has.
+    merged = {}
+    for title, hours in tasks:
+        merged[title] = merged.get(title, 0) + hours
+    return {
+        'id': user_id,
+        'username': username,
+        'total': sum(merged.values()),
+        'tasks': [[title, hours] for title, hours in merged.items()],
+    }
+
+
+def build_digest(project, day):
+    """(Re)build and store the digest for ``project`` on ``day``."""
+    hours = _member_hours(project.id, day)
+    members = project.members.order_by('id').values_list('id', 'username')
+    data = {'members': [_member_entry(user_id, username, hours.get(user_id, [])) for user_id, username in members]}
+    digest, _created = StandupDigest.objects.update_or_create(project=project, day=day, defaults={'data': data})
+    return digest
+
+
+def get_digests(project, days):
+    """Return {day: StandupDigest} for ``days``, building any that are missing."""
+    digests = {digest.day: digest for digest in StandupDigest.objects.filter(project=project, day__in=days)}
+    for day in days:
+        if day not in digests:
+            digests[day] = build_digest(project, day)
+    return digests
+
+
+def refresh_member(project_id, user_id, day):
+    """
+    Recompute one member's entry in an existing digest after their logs for
+    ``day`` changed. Days without a digest are left to be built on demand.
+    """
+    if project_id is None or day is None:
+        return
+    with transaction.atomic():
+        digest = StandupDigest.objects.select_for_update().filter(project_id=project_id, day=day).first()
+        if digest is None:
+            return
+        members = digest.data.get('members', [])
+        for index, member in enumerate(members):
+            if member['id'] == user_id:
+                tasks = _member_hours(project_id, day, [user_id]).get(user_id, [])
+                members[index] = _member_entry(user_id, member['username'], tasks)
+                digest.save(update_fields=['data', 'built_at'])
+                return
+
+
+def invalidate_project(*project_ids):
+    StandupDigest.objects.filter(project_id__in=[pk for pk in project_ids if pk is not None]).delete()
+
+
+def standup_summary(project, today=None):
+    """
+    Yesterday/today standup data for every member of ``project``, served from
+    the digests. Each item has the shape the project summary template uses.
+    """
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    digests = get_digests(project, [yesterday, today])
+
+    today_members = {member['id']: member for member in digests[today].data['members']}
+    summary_data = []
+    for member in digests[yesterday].data['members']:
+        today_entry = today_members.get(member['id'], {'total': 0, 'tasks': []})
+        summary_data.append({
+            'member': {'id': member['id'], 'username': member['username']},
+            'total_yesterday': member['total'],
+            'total_today': today_entry['total'],
+            'yesterday_tasks': dict(member['tasks']),
+            'today_tasks': dict(today_entry['tasks']),
+        })
+    return summary_data
+
+
+def build_recent_digests(days=2, today=None, projects=None):
+    """Rebuild the last ``days`` days of digests for ``projects`` (default: all)."""
+    today = today or date.today()
+    projects = projects if projects is not None else Project.objects.all()
+    built = 0
+    for project in projects:
+        for offset in range(days):
+            build_digest(project, today - timedelta(days=offset))
+            built += 1
+    return built
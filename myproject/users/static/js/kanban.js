@@ -97,12 +97,50 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    async function updateTaskStatusAPI(taskId, newStatus) { // Called on drag-and-drop
-        console.log(`Attempting to update task ${taskId} to status ${newStatus}`);
-        const payload = { status: newStatus };
+    // Sends the card's last known updated_at along, so the server rejects the
+    // change (409) if the task was saved in the meantime.
+    function withUpdatedAt(taskId, payload) {
+        const taskCard = document.querySelector(`.task-card[data-task-id="${taskId}"]`);
+        const updatedAt = taskCard ? taskCard.dataset.updatedAt : '';
+        return updatedAt ? { ...payload, updated_at: updatedAt } : payload;
+    }
+
+    // Replaces a card with the server's copy of the task, in the right column.
+    function applyServerTask(task) {
+        const oldCard = document.querySelector(`.task-card[data-task-id="${task.id}"]`);
+        const column = document.getElementById(`${task.status}-tasks`);
+        if (!oldCard || !column) return;
+        const newCard = renderTask(task);
+        // The inline-edit response has no owner details; keep the ones already shown.
+        const oldUser = oldCard.querySelector('.task-user-info');
+        if (oldUser) newCard.querySelector('.task-user-info').replaceWith(oldUser);
+        oldCard.remove();
+        column.appendChild(newCard);
+    }
+
+    // The nearest cards of the same project above and below a dropped card.
+    // Cards are ordered within their project's column, so with "All Projects"
+    // selected the cards of other projects in between don't count.
+    function dropNeighbours(taskCard) {
+        const projectId = taskCard.dataset.projectId;
+        const nearest = (step) => {
+            let card = step(taskCard);
+            while (card && card.dataset.projectId !== projectId) card = step(card);
+            return card ? card.dataset.taskId : null;
+        };
+        return {
+            before_id: nearest(card => card.previousElementSibling),
+            after_id: nearest(card => card.nextElementSibling),
+        };
+    }
+
+    async function updateTaskStatusAPI(taskId, newStatus, neighbours) { // Called on drag-and-drop
+        console.log(`Attempting to move task ${taskId} to status ${newStatus}`, neighbours);
+        const payload = withUpdatedAt(taskId, { status: newStatus, ...neighbours });
         try {
-            const response = await fetch(`/todo/inline_edit/${taskId}/`, {
-                method: 'POST',
+            // One row is written: the card gets a rank between its neighbours.
+            const response = await fetch(`/api/kanban/tasks/${taskId}/move/`, {
+                method: 'PATCH',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': CSRF_TOKEN,
@@ -111,6 +149,13 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify(payload)
             });
 
+            if (response.status === 409) {
+                // Someone (or an earlier drag) saved the task first: show the server's version.
+                const conflict = await response.json();
+                applyServerTask(conflict.todo);
+                alert(`${conflict.error} The card now shows the latest version.`);
+                return;
+            }
             if (!response.ok) {
                 let errorData;
                 try { errorData = await response.json(); } catch (e) { errorData = { error: `HTTP error! status: ${response.status}` }; }
@@ -123,6 +168,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('Task status updated successfully:', result.todo);
                 const taskCard = document.querySelector(`.task-card[data-task-id="${taskId}"]`);
                 if (taskCard) {
+                    taskCard.setAttribute('data-updated-at', result.todo.updated_at || '');
                     taskCard.setAttribute('data-status', result.todo.status);
                     // Update other relevant data attributes if the server could have changed them
                     taskCard.setAttribute('data-title', result.todo.title);
@@ -170,15 +216,21 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log(`Attempting to update task ${taskId} with data:`, updateData); // {title, description}
         try {
             const response = await fetch(`/todo/inline_edit/${taskId}/`, {
-                method: 'POST',
+                method: 'PATCH',
                 headers: {
                     'Content-Type': 'application/json',
                     'X-CSRFToken': CSRF_TOKEN,
                     'X-Requested-With': 'XMLHttpRequest'
                 },
-                body: JSON.stringify(updateData)
+                body: JSON.stringify(withUpdatedAt(taskId, updateData))
             });
 
+            if (response.status === 409) {
+                const conflict = await response.json();
+                applyServerTask(conflict.todo);
+                alert(`${conflict.error} Your edit was not saved; the card now shows the latest version.`);
+                return;
+            }
             if (!response.ok) {
                 let errorData;
                 try { errorData = await response.json(); } catch (e) { errorData = { error: `HTTP error! status: ${response.status}` }; }
@@ -192,6 +244,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const taskCard = document.querySelector(`.task-card[data-task-id="${taskId}"]`);
                 if (taskCard) {
                     // Update data attributes with server response
+                    taskCard.setAttribute('data-updated-at', result.todo.updated_at || '');
                     taskCard.setAttribute('data-title', result.todo.title);
                     taskCard.setAttribute('data-description', result.todo.description || '');
                     taskCard.setAttribute('data-status', result.todo.status); // Status might change if API allows
@@ -303,7 +356,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('Task moved:', evt.item, 'to', evt.to.id, 'from', evt.from.id);
                 const taskId = evt.item.dataset.taskId;
                 const newStatus = evt.to.id.replace('-tasks', ''); // e.g., 'todo', 'inprogress', 'done'
-                updateTaskStatusAPI(taskId, newStatus);
+                if (evt.from === evt.to && evt.oldIndex === evt.newIndex) return; // Dropped where it was
+                updateTaskStatusAPI(taskId, newStatus, dropNeighbours(evt.item));
+                shiftColumnCount(evt);
             }
         });
 
@@ -317,7 +372,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('Task moved:', evt.item, 'to', evt.to.id, 'from', evt.from.id);
                 const taskId = evt.item.dataset.taskId;
                 const newStatus = evt.to.id.replace('-tasks', '');
-                updateTaskStatusAPI(taskId, newStatus);
+                if (evt.from === evt.to && evt.oldIndex === evt.newIndex) return;
+                updateTaskStatusAPI(taskId, newStatus, dropNeighbours(evt.item));
+                shiftColumnCount(evt);
             }
         });
 
@@ -331,7 +388,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('Task moved:', evt.item, 'to', evt.to.id, 'from', evt.from.id);
                 const taskId = evt.item.dataset.taskId;
                 const newStatus = evt.to.id.replace('-tasks', '');
-                updateTaskStatusAPI(taskId, newStatus);
+                if (evt.from === evt.to && evt.oldIndex === evt.newIndex) return;
+                updateTaskStatusAPI(taskId, newStatus, dropNeighbours(evt.item));
+                shiftColumnCount(evt);
             }
         });
 
@@ -345,7 +404,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('Task moved:', evt.item, 'to', evt.to.id, 'from', evt.from.id);
                 const taskId = evt.item.dataset.taskId;
                 const newStatus = evt.to.id.replace('-tasks', '');
-                updateTaskStatusAPI(taskId, newStatus);
+                if (evt.from === evt.to && evt.oldIndex === evt.newIndex) return;
+                updateTaskStatusAPI(taskId, newStatus, dropNeighbours(evt.item));
+                shiftColumnCount(evt);
             }
         });
     } else {
@@ -376,6 +437,7 @@ document.addEventListener('DOMContentLoaded', () => {
         taskCard.setAttribute('data-estimation-time', String(task.estimation_time_hours || '0'));
         taskCard.setAttribute('data-project-id', task.project_id || '');
         taskCard.setAttribute('data-project-name', task.project_name || '');
+        taskCard.setAttribute('data-updated-at', task.updated_at || '');
 
         // Create and add status badge
         const statusBadge = document.createElement('div');
@@ -498,39 +560,86 @@ document.addEventListener('DOMContentLoaded', () => {
     //     });
     // }
 
+    // --- Column-aware loading ---
+    // The board loads per-column counts plus the first page of cards in each
+    // column, then fetches further pages as a column is scrolled to the bottom.
+    const COLUMN_PAGE_SIZE = 20;
+    const columnLists = { todo: todoTasks, inprogress: inprogressTasks, blocker: blockerTasks, done: doneTasks };
+    const columnState = {}; // status -> { nextCursor, loading }
+    let currentProjectId = 'all';
+
+    function projectQuery(projectId) {
+        return (projectId && projectId !== 'all') ? `&project_id=${encodeURIComponent(projectId)}` : '';
+    }
+
+    function setColumnCount(status, count) {
+        const countElement = document.getElementById(`${status}-count`);
+        if (countElement) countElement.textContent = count;
+    }
+
+    function shiftColumnCount(evt) { // Keep column counts in step with drag-and-drop moves
+        if (evt.from === evt.to) return;
+        [[evt.from, -1], [evt.to, 1]].forEach(([list, delta]) => {
+            const countElement = document.getElementById(list.id.replace('-tasks', '-count'));
+            if (countElement && countElement.textContent !== '') {
+                countElement.textContent = parseInt(countElement.textContent, 10) + delta;
+            }
+        });
+    }
+
+    function appendColumnTasks(status, tasks) {
+        const list = columnLists[status];
+        if (!list) {
+            console.warn(`Task column for status '${status}' not found or task list element is null.`);
+            return;
+        }
+        tasks.forEach(task => list.appendChild(renderTask(task)));
+    }
+
+    async function loadMoreColumnTasks(status) {
+        const state = columnState[status];
+        if (!state || !state.nextCursor || state.loading) return;
+        state.loading = true;
+        try {
+            const response = await fetch(`/api/kanban/columns/${status}/?limit=${COLUMN_PAGE_SIZE}&cursor=${encodeURIComponent(state.nextCursor)}${projectQuery(currentProjectId)}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const page = await response.json();
+            appendColumnTasks(status, page.tasks);
+            state.nextCursor = page.next_cursor;
+        } catch (error) {
+            console.error(`Error loading more '${status}' tasks:`, error.message);
+        } finally {
+            state.loading = false;
+        }
+    }
+
+    Object.entries(columnLists).forEach(([status, list]) => {
+        if (!list) return;
+        list.addEventListener('scroll', () => {
+            if (list.scrollTop + list.clientHeight >= list.scrollHeight - 100) {
+                loadMoreColumnTasks(status);
+            }
+        });
+    });
+
     async function fetchAndRenderInitialTasks(projectId = 'all') { // Default to 'all'
+        currentProjectId = projectId;
         // Clear existing tasks from all columns
-        if (todoTasks) todoTasks.innerHTML = '';
-        if (inprogressTasks) inprogressTasks.innerHTML = '';
-        if (blockerTasks) blockerTasks.innerHTML = '';
-        if (doneTasks) doneTasks.innerHTML = '';
-
-        let apiUrl = '/api/kanban_tasks/';
-        if (projectId && projectId !== 'all') {
-            apiUrl += `?project_id=${projectId}`;
-        }
+        Object.values(columnLists).forEach(list => { if (list) list.innerHTML = ''; });
 
         try {
-            const response = await fetch(apiUrl);
+            const response = await fetch(`/api/kanban/columns/?limit=${COLUMN_PAGE_SIZE}${projectQuery(projectId)}`);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const tasks = await response.json();
-
-            tasks.forEach(task => {
-                const card = renderTask(task);
-                // Ensure task list elements exist before appending
-                if (task.status === 'todo' && todoTasks) {
-                    todoTasks.appendChild(card);
-                } else if (task.status === 'inprogress' && inprogressTasks) {
-                    inprogressTasks.appendChild(card);
-                } else if (task.status === 'blocker' && blockerTasks) {
-                    blockerTasks.appendChild(card);
-                } else if (task.status === 'done' && doneTasks) {
-                    doneTasks.appendChild(card);
-                } else {
-                    console.warn(`Task column for status '${task.status}' not found or task list element is null.`);
-                }
+            const data = await response.json();
+
+            Object.entries(data.columns).forEach(([status, column]) => {
+                columnState[status] = { nextCursor: column.next_cursor, loading: false };
+                setColumnCount(status, column.count);
+                appendColumnTasks(status, column.tasks);
             });
         } catch (error) {
             console.error("Error fetching initial tasks:", error.message);
@@ -0,0 +1,154 @@
+"""
+Task status history (TaskStatusEvent) and the charts built from it.
+
+Every status change, and every time a task enters or leaves a project,
+appends one event. Saves through the ORM are recorded by the TodoItem hooks
+in models.py. Bulk paths that use ``queryset.update()`` must go through
+``bulk_set_status`` so their events are written in one ``bulk_create``.
+
+``cumulative_flow`` replays a project's events in a single ordered pass to
+get how many tasks sat in each status at the end of every day.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TaskStatusEvent, TodoItem
+from .project_stats import apply_deltas, status_field
+
+STATUSES = [status for status, _label in TodoItem.STATUS_CHOICES]
+
+
+def status_events_for_save(task, created):
+    """Unsaved TaskStatusEvents describing what saving ``task`` changed."""
+    now = timezone.now()
+    if created:
+        if task.project_id is None:
+            return []
+        return [TaskStatusEvent(task=task, project_id=task.project_id, to_status=task.status, timestamp=now)]
+    if not task.is_tracked:
+        # No record of the previous values; nothing reliable to append.
+        return []
+
+    old_project, old_status = task.loaded_value('project_id'), task.loaded_value('status')
+    if old_project == task.project_id:
+        if old_status == task.status or task.project_id is None:
+            return []
+        return [TaskStatusEvent(task=task, project_id=task.project_id, from_status=old_status,
+                                to_status=task.status, timestamp=now)]
+
+    events = []
+    if old_project is not None:
+        events.append(TaskStatusEvent(task=task, project_id=old_project, from_status=old_status, timestamp=now))
+    if task.project_id is not None:
+        events.append(TaskStatusEvent(task=task, project_id=task.project_id, to_status=task.status, timestamp=now))
+    return events
+
+
+def bulk_set_status(tasks, status):
+    """
+    Set ``status`` on every task in the queryset with one UPDATE and record
+    the transitions with one bulk_create. Returns the number of tasks changed.
+    """
+    with transaction.atomic():
+        changing = list(tasks.exclude(status=status).select_for_update().values_list('id', 'project_id', 'status'))
+        if not changing:
+            return 0
+        TodoItem.objects.filter(id__in=[task_id for task_id, _project, _status in changing]).update(
+            status=status, updated_at=timezone.now(),
+        )
+        now = timezone.now()
+        TaskStatusEvent.objects.bulk_create([
+            TaskStatusEvent(task_id=task_id, project_id=project_id, from_status=old_status, to_status=status, timestamp=now)
+            for task_id, project_id, old_status in changing if project_id is not None
+        ], batch_size=500)
+        # update() skips the ProjectStats hooks, so move the counters here.
+        deltas = {}
+        for _task_id, project_id, old_status in changing:
+            project_deltas = deltas.setdefault(project_id, {})
+            project_deltas[status_field(old_status)] = project_deltas.get(status_field(old_status), 0) - 1
+            project_deltas[status_field(status)] = project_deltas.get(status_field(status), 0) + 1
+        for project_id, project_deltas in deltas.items():
+            apply_deltas(project_id, project_deltas)
+    return len(changing)
+
+
+def bulk_reassign(tasks, **changes):
+    """
+    Move every task in the queryset to another owner and/or project
+    (``user_id=``, ``project_id=``; a project_id of None detaches them) with
+    one UPDATE. Project moves are recorded as leave/enter events. Stats,
+    digests and time-series caches are caught up once. Returns the number of
+    tasks changed.
+    """
+    from .deferred import DeferredWork
+
+    with transaction.atomic():
+        moving = [
+            (task_id, project_id, user_id, status)
+            for task_id, project_id, user_id, status in tasks.select_for_update().values_list(
+                'id', 'project_id', 'user_id', 'status'
+            )
+            if changes.get('project_id', project_id) != project_id or changes.get('user_id', user_id) != user_id
+        ]
+        if not moving:
+            return 0
+        TodoItem.objects.filter(id__in=[task[0] for task in moving]).update(**changes, updated_at=timezone.now())
+
+        if 'project_id' in changes:
+            now, new_project = timezone.now(), changes['project_id']
+            events = []
+            for task_id, project_id, _user_id, status in moving:
+                if project_id == new_project:
+                    continue
+                if project_id is not None:
+                    events.append(TaskStatusEvent(task_id=task_id, project_id=project_id, from_status=status, timestamp=now))
+                if new_project is not None:
+                    events.append(TaskStatusEvent(task_id=task_id, project_id=new_project, to_status=status, timestamp=now))
+            TaskStatusEvent.objects.bulk_create(events, batch_size=500)
+
+        # update() skips the model hooks; catch up on what they would have done.
+        work = DeferredWork()
+        work.project_ids.update({project_id for _id, project_id, _user_id, _status in moving} | {changes.get('project_id')})
+        work.user_ids.update({user_id for _id, _project_id, user_id, _status in moving} | {changes.get('user_id')})
+        work.apply()
+    return len(moving)
+
+
+def _end_of_day(day):
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def cumulative_flow(project_id, start, end):
+    """
+    Tasks per status at the end of each day from ``start`` to ``end``:
+    {'days': [...], 'series': {status: [counts]}}.
+    """
+    counts = dict.fromkeys(STATUSES, 0)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    series = {status: [] for status in STATUSES}
+    boundaries = iter(days)
+    day = next(boundaries, None)
+    boundary = _end_of_day(day) if day else None
+
+    events = TaskStatusEvent.objects.filter(project_id=project_id, timestamp__lt=_end_of_day(end)).order_by(
+        'timestamp', 'id'
+    ).values_list('timestamp', 'from_status', 'to_status')
+    for timestamp, from_status, to_status in events.iterator(chunk_size=5000):
+        while boundary is not None and timestamp >= boundary:
+            for status in STATUSES:
+                series[status].append(counts[status])
+            day = next(boundaries, None)
+            boundary = _end_of_day(day) if day else None
+        if from_status in counts:
+            counts[from_status] -= 1
+        if to_status in counts:
+            counts[to_status] += 1
+
+    while boundary is not None:
+        for status in STATUSES:
+            series[status].append(counts[status])
+        day = next(boundaries, None)
+        boundary = _end_of_day(day) if day else None
+    return {'days': days, 'series': series}
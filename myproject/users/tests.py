@@ -1,9 +1,48 @@
-from django.test import TestCase, Client
+import csv
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
 from django.contrib.auth.models import User
-from .models import TodoItem
-from .forms import TodoForm
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from django.db.models import Sum
+from django.utils import timezone
+
+from . import analytics, jobs, partitioning, positions, serving
+from .archive import latest_archived_log_date
+from .avatars import get_avatar_urls
+from .deferred import defer_signals
+from .forms import TodoForm
+from .identity import IdentityMap, identity_map
+from .importer import import_tasks
+from .management.commands import profile_startup
+from .models import (
+    ArchivedTodoItem, ArchivedTodoLog, Job, Project, ProjectMembership, ProjectStats, StandupDigest,
+    TaskStatusEvent, TodoItem, TodoLog, UserProfile,
+)
+from .responses import FastJsonResponse, OrjsonEncoder, StdlibEncoder, orjson, records
+from .standup import standup_summary
+from .status_history import bulk_set_status
+from .thumbnails import generate_thumbnail, thumbnail_name, thumbnail_url
+from .timeseries import logged_hours_by_project, logged_hours_series
+
 
 class UserModelTests(TestCase):
     def setUp(self):
@@ -458,10 +497,6 @@ class TodoViewTests(TestCase):
         task.refresh_from_db()
         self.assertEqual(task.status, 'done')
 
-import json # Make sure json is imported for inline_edit_todo tests
-
-from django.core.files.uploadedfile import SimpleUploadedFile
-from .models import UserProfile
 
 class UserProfileTests(TestCase):
     def setUp(self):
@@ -584,9 +619,6 @@ class UserProfileTests(TestCase):
         self.assertEqual(response.status_code, 302)
         self.assertTrue(response.url.startswith(reverse('login')))
 
-import csv
-from io import StringIO
-from django.utils import timezone
 
 class CSVReportTests(TestCase):
     def setUp(self):
@@ -764,22 +796,13 @@ class CSVReportTests(TestCase):
         self.assertEqual(data_row[1], self.user.email)
         self.assertEqual(data_row[2], "") # Bio should be empty if profile is missing
 
-        # The signal create_or_update_user_profile should have recreated the profile
-        # when self.client.login() was called, or during other user model saves.
-        # So, explicit recreation here is not needed and can cause issues if
-        # the profile already exists due to the signal.
-        # If we want to ensure it's in a certain state for subsequent tests (though usually tests are isolated),
-        # we'd fetch and update, or be mindful of test execution order if TestCases share state (not ideal).
-        # For now, removing this explicit creation.
-        self.assertTrue(UserProfile.objects.filter(user=self.user).exists(), "Profile should have been recreated by signal.")
-        profile = UserProfile.objects.get(user=self.user)
+        # Logins no longer touch the profile; it is recreated on first access.
+        self.assertFalse(UserProfile.objects.filter(user=self.user).exists())
+        profile = UserProfile.for_user(self.user)
         profile.bio = "Recreated bio for subsequent tests if any" # Example update
         profile.save()
 
 
-from .models import Project, ProjectMembership
-from django.contrib.auth.models import Group
-
 class ProjectModelTests(TestCase):
     def setUp(self):
         self.user1 = User.objects.create_user(username='user1_proj', password='password123')
@@ -802,7 +825,6 @@ class ProjectModelTests(TestCase):
         ProjectMembership.objects.create(project=project, user=self.user2)
         self.assertEqual(project.members.count(), 2)
 
-from django.db import IntegrityError
 
 class ProjectModelTests(TestCase):
     def setUp(self):
@@ -1207,3 +1229,1475 @@ class ProjectViewTests(TestCase):
         self.assertContains(response, "No tasks currently associated with this project.")
         self.assertIn('tasks', response.context)
         self.assertEqual(len(response.context['tasks']), 0)
+
+
+class FastJsonResponseTests(TestCase):
+    def test_records_zips_columns_with_tuples(self):
+        rows = [(1, 'a'), (2, 'b')]
+        self.assertEqual(records(('id', 'name'), rows), [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}])
+
+    def test_safe_rejects_non_dict(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2, 3])
+
+    def test_stdlib_encoder_matches_json_response(self):
+        from django.http import JsonResponse
+        data = {'ids': [1, 2], 'task_date': date(2025, 7, 1), 'name': 'Ünïcode'}
+        response = FastJsonResponse(data, encoder=StdlibEncoder())
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JsonResponse(data).content)
+
+    @skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_encoder_output_parses_identically(self):
+        data = [{'id': 1, 'task_date': date(2025, 7, 1), 'log_time': 1.5, 'notes': None}]
+        fast = FastJsonResponse(data, encoder=OrjsonEncoder(), safe=False)
+        slow = FastJsonResponse(data, encoder=StdlibEncoder(), safe=False)
+        self.assertEqual(json.loads(fast.content), json.loads(slow.content))
+
+    def test_project_logs_api_returns_task_and_user_ids(self):
+        from .models import Project, TodoLog
+        user = User.objects.create_user(username='json_logs_user', password='password123')
+        project = Project.objects.create(name='JSON Logs Project', owner=user)
+        task = TodoItem.objects.create(user=user, title='Logged', description='', project=project)
+        log = TodoLog.objects.create(todo_item=task, log_time=2, task_date=date.today(), notes='n')
+        self.client.login(username='json_logs_user', password='password123')
+        response = self.client.get(reverse('project_logs_api', args=[project.id]))
+        self.assertEqual(response.json(), [
+            {'id': log.id, 'log_time': 2.0, 'notes': 'n', 'task_id': task.id, 'user_id': user.id}
+        ])
+
+
+class AvatarCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='avatar_user', password='password123')
+        self.other = User.objects.create_user(username='avatar_other', password='password123')
+        self.user.profile.profile_picture = 'profile_pics/avatar.png'
+        self.user.profile.save()
+        self.client.login(username='avatar_user', password='password123')
+
+    def test_batched_lookup_uses_one_query_then_cache(self):
+        with self.assertNumQueries(2):  # Profiles, then the job rendering the missing thumbnail
+            urls = get_avatar_urls([self.user.id, self.other.id])
+        self.assertEqual(urls, {self.user.id: '/media/profile_pics/avatar.png', self.other.id: None})
+        self.assertEqual(list(Job.objects.values_list('kind', 'user_id', 'payload')),
+                         [('avatar_thumbnail', self.user.id, {'name': 'profile_pics/avatar.png'})])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_avatar_urls([self.user.id, self.other.id]), urls)
+
+    def test_profile_save_invalidates_cached_url(self):
+        get_avatar_urls([self.other.id])
+        self.other.profile.profile_picture = 'profile_pics/new.png'
+        self.other.profile.save()
+        self.assertEqual(get_avatar_urls([self.other.id]), {self.other.id: '/media/profile_pics/new.png'})
+
+    def test_user_profile_pictures_api(self):
+        response = self.client.get(reverse('user_profile_pictures_api'), {'ids': f'{self.user.id},{self.other.id}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            str(self.user.id): '/media/profile_pics/avatar.png',
+            str(self.other.id): None,
+        })
+
+    def test_user_profile_pictures_api_rejects_bad_ids(self):
+        response = self.client.get(reverse('user_profile_pictures_api'), {'ids': '1,abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_kanban_tasks_use_cached_avatar(self):
+        from .models import Project
+        project = Project.objects.create(name='Avatar Project', owner=self.user)
+        TodoItem.objects.create(user=self.user, title='Avatar task', description='', project=project)
+        response = self.client.get(reverse('api_kanban_tasks'))
+        self.assertEqual(response.json()[0]['user']['profile_picture_url'], '/media/profile_pics/avatar.png')
+
+
+class ProfileThumbnailTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        cache.clear()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _save_image(self, name, size=(800, 600)):
+        from io import BytesIO
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, format='PNG')
+        return default_storage.save(name, SimpleUploadedFile(name, buffer.getvalue()))
+
+    def test_generate_thumbnail_is_fixed_size(self):
+        from PIL import Image
+        name = self._save_image('profile_pics/big.png')
+        thumb = generate_thumbnail(default_storage, name)
+        self.assertEqual(thumb, thumbnail_name(name))
+        with default_storage.open(thumb) as f:
+            self.assertEqual(Image.open(f).size, (64, 64))
+
+    def test_size_setting_is_read_when_used(self):
+        from PIL import Image
+        name = self._save_image('profile_pics/small.png')
+        with override_settings(USERS_AVATAR_THUMBNAIL_SIZE=32):
+            thumb = generate_thumbnail(default_storage, name)
+            self.assertIn('/thumbs/small_32.', thumbnail_url(default_storage, name))
+        with default_storage.open(thumb) as f:
+            self.assertEqual(Image.open(f).size, (32, 32))
+
+    def test_thumbnail_url_is_versioned_and_never_renders(self):
+        name = self._save_image('profile_pics/lazy.png')
+        self.assertIsNone(thumbnail_url(default_storage, name))
+        self.assertFalse(default_storage.exists(thumbnail_name(name)))
+        generate_thumbnail(default_storage, name)
+        url = thumbnail_url(default_storage, name)
+        self.assertIn('/thumbs/lazy_64.', url)
+        self.assertRegex(url, r'\?v=\d+$')
+
+    def test_thumbnail_url_is_none_for_missing_file(self):
+        self.assertIsNone(thumbnail_url(default_storage, 'profile_pics/missing.png'))
+
+    def test_thumbnail_url_is_none_without_pillow(self):
+        name = self._save_image('profile_pics/nopil.png')
+        generate_thumbnail(default_storage, name)
+        with mock.patch.dict(sys.modules, {'PIL': None}):
+            self.assertIsNone(thumbnail_url(default_storage, name))
+
+    def test_regenerating_replaces_thumbnail_in_place(self):
+        name = self._save_image('profile_pics/again.png')
+        generate_thumbnail(default_storage, name)
+        generate_thumbnail(default_storage, name)
+        _dirs, files = default_storage.listdir('profile_pics/thumbs')
+        self.assertEqual(files, [os.path.basename(thumbnail_name(name))])
+
+    def test_only_picture_changes_touch_thumbnails(self):
+        user = User.objects.create_user(username='thumb_owner', password='password123')
+        profile = UserProfile.objects.get(user=user)
+        old = self._save_image('profile_pics/old.png')
+        profile.profile_picture = old
+        with mock.patch('users.models.generate_thumbnail_in_background') as background:
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.save()
+            self.assertEqual(background.call_args[0][1], old)
+            background.reset_mock()
+
+            generate_thumbnail(default_storage, old)
+            profile.bio = 'Just the bio'
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.save()
+            background.assert_not_called()
+            self.assertTrue(default_storage.exists(thumbnail_name(old)))
+
+            profile = UserProfile.objects.get(user=user)
+            profile.profile_picture = self._save_image('profile_pics/new.png')
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.save()
+            self.assertEqual(background.call_args[0][1], 'profile_pics/new.png')
+            self.assertFalse(default_storage.exists(thumbnail_name(old)))
+
+    def test_profile_picture_api_returns_thumbnail(self):
+        user = User.objects.create_user(username='thumb_user', password='password123')
+        user.profile.profile_picture = self._save_image('profile_pics/me.png')
+        user.profile.save()
+        self.client.login(username='thumb_user', password='password123')
+        url = reverse('user_profile_picture_api', args=[user.id])
+        # The original until the queued job has rendered the thumbnail.
+        self.assertEqual(self.client.get(url).json()['profile_picture_url'], '/media/profile_pics/me.png')
+        self.assertFalse(default_storage.exists(thumbnail_name('profile_pics/me.png')))
+        jobs.run_job(jobs.claim_next_job().id)
+        self.assertIn('/media/profile_pics/thumbs/me_64.', self.client.get(url).json()['profile_picture_url'])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='job_user', password='password123')
+        self.other = User.objects.create_user(username='job_other', password='password123')
+        self.project = Project.objects.create(name='Job Project', owner=self.user)
+        TodoItem.objects.create(user=self.user, title='Billable', description='', time_spent=2, project=self.project)
+        self.client.login(username='job_user', password='password123')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def _run_queue(self):
+        while True:
+            job = jobs.claim_next_job()
+            if job is None:
+                break
+            jobs.run_job(job.id)
+
+    def test_csv_export_job_round_trip(self):
+        response = self.client.post(reverse('enqueue_job_api', args=['csv_report']))
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(self.client.get(reverse('job_status_api', args=[job_id])).json()['status'], 'queued')
+
+        self._run_queue()
+
+        status = self.client.get(reverse('job_status_api', args=[job_id])).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['progress'], 100)
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        content = b''.join(download.streaming_content).decode('utf-8')
+        self.assertIn('Billable', content)
+
+    def test_task_report_job_returns_aggregates(self):
+        response = self.client.post(reverse('enqueue_job_api', args=['task_report']) + '?status=todo')
+        self._run_queue()
+        result = Job.objects.get(id=response.json()['job_id']).result
+        self.assertEqual(result['hours_by_status'], {'todo': 2.0})
+
+    def test_project_summary_job_requires_membership(self):
+        self.client.login(username='job_other', password='password123')
+        response = self.client.post(reverse('enqueue_job_api', args=['project_summary']), {'project_id': self.project.id}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_kind_and_foreign_job(self):
+        self.assertEqual(self.client.post(reverse('enqueue_job_api', args=['nope'])).status_code, 404)
+        job = jobs.enqueue('csv_report', self.other)
+        self.assertEqual(self.client.get(reverse('job_status_api', args=[job.id])).status_code, 404)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = jobs.enqueue('project_summary', self.user, {'project_id': 999999}, max_attempts=2)
+        jobs.run_job(jobs.claim_next_job().id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(jobs.claim_next_job())  # Backing off
+
+        Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        jobs.run_job(jobs.claim_next_job().id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('DoesNotExist', job.error)
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        retry = jobs.enqueue('task_report', self.user, max_attempts=2)
+        exhausted = jobs.enqueue('task_report', self.user, max_attempts=1)
+        jobs.claim_next_job()
+        jobs.claim_next_job()
+        Job.objects.update(started_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(jobs.requeue_stale_jobs(timedelta(hours=1)), (1, 1))
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retry.status, Job.STATUS_QUEUED)
+        self.assertEqual(exhausted.status, Job.STATUS_FAILED)
+        self.assertEqual(exhausted.error, jobs.WORKER_DIED)
+
+    def test_released_jobs_are_only_running_ones(self):
+        job = jobs.enqueue('task_report', self.user)
+        self.assertEqual(jobs.release_jobs([job.id]), (0, 0))
+        jobs.claim_next_job()
+        self.assertEqual(jobs.release_jobs([job.id]), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+
+    def test_expired_results_are_gone_and_purged(self):
+        job = jobs.enqueue('task_report', self.user)
+        self._run_queue()
+        Job.objects.filter(id=job.id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.get(reverse('job_status_api', args=[job.id])).status_code, 410)
+        self.assertEqual(jobs.purge_expired_jobs(), 1)
+        self.assertFalse(Job.objects.filter(id=job.id).exists())
+
+
+class StandupDigestTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.yesterday = self.today - timedelta(days=1)
+        self.owner = User.objects.create_user(username='standup_owner', password='password123')
+        self.member = User.objects.create_user(username='standup_member', password='password123')
+        self.project = Project.objects.create(name='Standup Project', owner=self.owner)
+        ProjectMembership.objects.create(user=self.member, project=self.project)
+        self.task = TodoItem.objects.create(user=self.member, title='Write docs', description='', project=self.project)
+        TodoLog.objects.create(todo_item=self.task, log_time=2, task_date=self.yesterday)
+        TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=self.today)
+
+    def test_summary_is_built_once_then_served_from_digest(self):
+        summary = standup_summary(self.project, self.today)
+        self.assertEqual(summary, [{
+            'member': {'id': self.member.id, 'username': 'standup_member'},
+            'total_yesterday': 2.0,
+            'total_today': 1.0,
+            'yesterday_tasks': {'Write docs': 2.0},
+            'today_tasks': {'Write docs': 1.0},
+        }])
+        self.assertEqual(StandupDigest.objects.filter(project=self.project).count(), 2)
+        with self.assertNumQueries(1):
+            standup_summary(self.project, self.today)
+
+    def test_log_writes_refresh_digest_incrementally(self):
+        standup_summary(self.project, self.today)
+        log = TodoLog.objects.create(todo_item=self.task, log_time=1.5, task_date=self.today)
+        self.assertEqual(standup_summary(self.project, self.today)[0]['total_today'], 2.5)
+
+        # Moving a log to another day refreshes both days.
+        log.task_date = self.yesterday
+        log.save()
+        summary = standup_summary(self.project, self.today)[0]
+        self.assertEqual((summary['total_yesterday'], summary['total_today']), (3.5, 1.0))
+
+        log.delete()
+        self.assertEqual(standup_summary(self.project, self.today)[0]['total_yesterday'], 2.0)
+
+    def test_task_rename_and_membership_change_invalidate(self):
+        standup_summary(self.project, self.today)
+        task = TodoItem.objects.get(id=self.task.id)
+        task.title = 'Write better docs'
+        task.save()
+        self.assertFalse(StandupDigest.objects.filter(project=self.project).exists())
+        self.assertEqual(standup_summary(self.project, self.today)[0]['today_tasks'], {'Write better docs': 1.0})
+
+        ProjectMembership.objects.create(user=self.owner, project=self.project)
+        self.assertEqual(len(standup_summary(self.project, self.today)), 2)
+
+    def test_members_add_invalidates(self):
+        standup_summary(self.project, self.today)
+        self.project.members.add(self.owner)
+        self.assertEqual(len(standup_summary(self.project, self.today)), 2)
+
+        newcomer = User.objects.create_user(username='standup_newcomer', password='password123')
+        newcomer.projects.add(self.project)
+        self.assertEqual(len(standup_summary(self.project, self.today)), 3)
+
+    def test_project_summary_page_and_api(self):
+        self.client.login(username='standup_member', password='password123')
+        page = self.client.get(reverse('project_summary', args=[self.project.id]))
+        self.assertContains(page, 'Write docs (2.0h)')
+        api = self.client.get(reverse('project_summary_api', args=[self.project.id])).json()
+        self.assertEqual(api['summary'][0]['total_today'], 1.0)
+        self.assertEqual(api['today'], self.today.isoformat())
+
+    def test_project_summary_api_requires_access(self):
+        User.objects.create_user(username='standup_outsider', password='password123')
+        self.client.login(username='standup_outsider', password='password123')
+        self.assertEqual(self.client.get(reverse('project_summary_api', args=[self.project.id])).status_code, 404)
+
+    def test_build_standup_digests_command(self):
+        call_command('build_standup_digests', stdout=io.StringIO())
+        self.assertEqual(set(StandupDigest.objects.values_list('day', flat=True)), {self.today, self.yesterday})
+
+
+class ProjectDetailQueryTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='detail_owner', password='password123')
+        self.member = User.objects.create_user(username='detail_member', password='password123')
+        self.project = Project.objects.create(name='Detail Project', owner=self.owner)
+        self.project.members.add(self.member)
+        for i in range(60):
+            TodoItem.objects.create(user=self.member, title=f'Task {i}', description='', project=self.project,
+                                    status='done' if i % 3 == 0 else 'todo')
+        self.client.login(username='detail_member', password='password123')
+        self.url = reverse('project_detail', args=[self.project.pk])
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        self.client.get(self.url)  # Warm session/auth caches
+        # session, user, project, membership EXISTS, members, counts aggregate, task page
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_status_counts_and_pagination(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['task_total'], 60)
+        counts = {status['value']: status['count'] for status in response.context['status_counts']}
+        self.assertEqual(counts, {'todo': 40, 'inprogress': 0, 'done': 20, 'blocker': 0})
+        self.assertEqual(len(response.context['tasks']), 50)
+
+        response = self.client.get(self.url, {'status': 'done'})
+        self.assertEqual(len(response.context['tasks']), 20)
+        self.assertTrue(all(task.status == 'done' for task in response.context['tasks']))
+
+
+class KanbanColumnApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='kanban_cols', password='password123')
+        self.project = Project.objects.create(name='Kanban Columns', owner=self.user)
+        self.other_project = Project.objects.create(name='Kanban Elsewhere', owner=User.objects.create_user(username='kanban_other'))
+        for i in range(25):
+            TodoItem.objects.create(user=self.user, title=f'Done {i}', description='', project=self.project, status='done')
+        for i in range(3):
+            TodoItem.objects.create(user=self.user, title=f'Todo {i}', description='', project=self.project, status='todo')
+        self.client.login(username='kanban_cols', password='password123')
+
+    def test_columns_return_counts_and_first_page(self):
+        data = self.client.get(reverse('api_kanban_columns'), {'limit': 10}).json()['columns']
+        self.assertEqual({status: column['count'] for status, column in data.items()},
+                         {'todo': 3, 'inprogress': 0, 'done': 25, 'blocker': 0})
+        self.assertEqual(len(data['done']['tasks']), 10)
+        self.assertIsNotNone(data['done']['next_cursor'])
+        self.assertEqual(len(data['todo']['tasks']), 3)
+        self.assertIsNone(data['todo']['next_cursor'])
+
+    def test_cursor_walks_the_whole_column_without_repeats(self):
+        first = self.client.get(reverse('api_kanban_columns'), {'limit': 10}).json()['columns']['done']
+        titles = [task['title'] for task in first['tasks']]
+        cursor = first['next_cursor']
+        while cursor:
+            page = self.client.get(reverse('api_kanban_column', args=['done']), {'limit': 10, 'cursor': cursor}).json()
+            titles += [task['title'] for task in page['tasks']]
+            cursor = page['next_cursor']
+        self.assertEqual(titles, [f'Done {i}' for i in range(25)])
+
+    def test_column_rejects_bad_status_cursor_and_foreign_project(self):
+        self.assertEqual(self.client.get(reverse('api_kanban_column', args=['nope'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_kanban_column', args=['done']), {'cursor': '!!'}).status_code, 400)
+        data = self.client.get(reverse('api_kanban_columns'), {'project_id': self.other_project.id}).json()['columns']
+        self.assertEqual(data['done'], {'count': 0, 'tasks': [], 'next_cursor': None})
+
+
+class TodoLogPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='log_pager', password='password123')
+        self.todo = TodoItem.objects.create(user=self.user, title='Long task', description='')
+        TodoLog.objects.bulk_create([
+            TodoLog(todo_item=self.todo, log_time=1.5, task_date=date(2024, 1, 1) + timedelta(days=i), notes=f'Log {i}')
+            for i in range(30)
+        ])
+        self.client.login(username='log_pager', password='password123')
+
+    def test_detail_renders_first_page_and_summary(self):
+        response = self.client.get(reverse('todo_detail', args=[self.todo.id]))
+        self.assertEqual(len(response.context['logs']), 25)
+        self.assertIsNotNone(response.context['logs_next_after'])
+        self.assertEqual(response.context['log_summary'], {
+            'count': 30, 'total_hours': 45.0,
+            'first_date': date(2024, 1, 1), 'last_date': date(2024, 1, 30),
+        })
+        self.assertContains(response, 'Load more')
+        self.assertNotContains(response, 'Log 25<')
+
+    def test_edit_page_uses_the_same_log_page(self):
+        response = self.client.get(reverse('edit_todo', args=[self.todo.id]))
+        self.assertEqual(len(response.context['logs']), 25)
+        self.assertContains(response, 'Add Log', count=1)
+
+    def test_load_more_returns_remaining_logs(self):
+        first_page = self.client.get(reverse('todo_detail', args=[self.todo.id])).context
+        response = self.client.get(reverse('todo_logs_api', args=[self.todo.id]), {'after': first_page['logs_next_after']})
+        data = response.json()
+        self.assertEqual([log['notes'] for log in data['logs']], [f'Log {i}' for i in range(25, 30)])
+        self.assertIsNone(data['next_after'])
+
+    def test_load_more_rejects_bad_cursor(self):
+        response = self.client.get(reverse('todo_logs_api', args=[self.todo.id]), {'after': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectStatsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='stats_owner', password='password123')
+        self.member = User.objects.create_user(username='stats_member', password='password123')
+        self.project = Project.objects.create(name='Stats Project', owner=self.owner)
+        self.other = Project.objects.create(name='Stats Other', owner=self.owner)
+        self.project.members.add(self.owner)
+        ProjectMembership.objects.create(project=self.project, user=self.member)
+
+    def stats(self, project=None):
+        return ProjectStats.objects.get(project=project or self.project)
+
+    def test_counters_follow_tasks_logs_and_members(self):
+        task = TodoItem.objects.create(user=self.owner, title='Counted', description='', project=self.project)
+        blocker = TodoItem.objects.create(user=self.owner, title='Stuck', description='', project=self.project, status='blocker')
+        TodoLog.objects.create(todo_item=task, log_time=2.5, task_date=date(2024, 5, 1))
+        task.refresh_from_db()
+        task.status = 'done'
+        task.save()
+        stats = self.stats()
+        self.assertEqual((stats.todo_count, stats.done_count, stats.blocker_count, stats.member_count), (0, 1, 1, 2))
+        self.assertEqual(stats.total_hours, 2.5)
+
+        task.project = self.other
+        task.save()
+        blocker.delete()
+        self.project.members.remove(self.member)
+        stats, other = self.stats(), self.stats(self.other)
+        self.assertEqual((stats.task_count, stats.member_count, stats.total_hours), (0, 1, 0))
+        self.assertEqual((other.done_count, other.total_hours), (1, 2.5))
+
+    def test_repair_command_fixes_drift(self):
+        TodoItem.objects.create(user=self.owner, title='Drift', description='', project=self.project)
+        ProjectStats.objects.filter(project=self.project).update(todo_count=7, member_count=0)
+        ProjectStats.objects.filter(project=self.other).delete()
+        out = io.StringIO()
+        call_command('repair_project_stats', stdout=out)
+        self.assertIn('Repaired stats for 2 project(s)', out.getvalue())
+        self.assertEqual((self.stats().todo_count, self.stats().member_count), (1, 2))
+        self.assertTrue(ProjectStats.objects.filter(project=self.other).exists())
+
+    def test_project_lists_read_stats_without_extra_queries(self):
+        self.client.login(username='stats_owner', password='password123')
+        for name in ('Stats A', 'Stats B', 'Stats C'):
+            Project.objects.create(name=name, owner=self.owner).members.add(self.owner)
+        with self.assertNumQueries(3):  # session, user, projects with stats
+            response = self.client.get(reverse('project_list'))
+        self.assertContains(response, '2 members')
+        with self.assertNumQueries(3):
+            self.client.get(reverse('project_summary_list'))
+
+
+class LoggedHoursTimeseriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='series_user', password='password123')
+        self.outsider = User.objects.create_user(username='series_outsider', password='password123')
+        self.project = Project.objects.create(name='Series Project', owner=self.user)
+        self.task = TodoItem.objects.create(user=self.user, title='Charted', description='', project=self.project)
+        self.today = date.today()
+        for days_ago, hours in ((0, 1.0), (1, 2.0), (1, 0.5), (9, 4.0)):
+            TodoLog.objects.create(todo_item=self.task, log_time=hours, task_date=self.today - timedelta(days=days_ago))
+        self.url = reverse('logged_hours_timeseries_api')
+        self.client.login(username='series_user', password='password123')
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_daily_buckets_include_empty_days(self):
+        data = self.get(project=self.project.id, start=str(self.today - timedelta(days=2)), end=str(self.today)).json()
+        self.assertEqual([bucket['hours'] for bucket in data['series']], [0, 2.5, 1.0])
+        self.assertEqual(data['total_hours'], 3.5)
+
+    def test_weekly_and_monthly_buckets_sum_to_total(self):
+        start = str(self.today - timedelta(days=20))
+        for bucket in ('week', 'month'):
+            data = self.get(task=self.task.id, bucket=bucket, start=start, end=str(self.today)).json()
+            self.assertEqual(data['total_hours'], 7.5)
+
+    def test_closed_buckets_are_cached_and_backdated_logs_invalidate(self):
+        params = {'user': self.user.id, 'start': str(self.today - timedelta(days=9)), 'end': str(self.today)}
+        self.get(**params)
+        with self.assertNumQueries(4):  # session, user, latest archived date, today's bucket
+            self.assertEqual(self.get(**params).json()['total_hours'], 7.5)
+        TodoLog.objects.create(todo_item=self.task, log_time=3.0, task_date=self.today - timedelta(days=5))
+        self.assertEqual(self.get(**params).json()['total_hours'], 10.5)
+
+    def test_requires_access_and_valid_parameters(self):
+        self.client.login(username='series_outsider', password='password123')
+        self.assertEqual(self.get(project=self.project.id).status_code, 403)
+        self.assertEqual(self.get(user=self.user.id).status_code, 403)
+        self.assertEqual(self.get(task=self.task.id).status_code, 403)
+        self.assertEqual(self.get(user=self.outsider.id, bucket='year').status_code, 400)
+        self.assertEqual(self.get().status_code, 400)
+
+
+class ImmutablePeriodReportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='period_user', password='password123')
+        self.project = Project.objects.create(name='Period Project', owner=self.user)
+        self.task = TodoItem.objects.create(user=self.user, title='Weekly', description='', project=self.project)
+        self.this_week = date.today() - timedelta(days=date.today().weekday())
+        self.weeks_ago = lambda n: self.this_week - timedelta(weeks=n)
+        for n in (1, 2, 3):
+            TodoLog.objects.create(todo_item=self.task, log_time=n, task_date=self.weeks_ago(n))
+
+    def series(self, start, end):
+        return logged_hours_by_project(start, end, 'week', user_id=self.user.id)
+
+    def test_elapsed_weeks_are_served_from_cache(self):
+        self.series(self.weeks_ago(3), self.weeks_ago(1))
+        with self.assertNumQueries(0):
+            buckets = self.series(self.weeks_ago(3), self.weeks_ago(1))
+        self.assertEqual([hours for _week, hours in buckets], [{self.project.id: 3}, {self.project.id: 2}, {self.project.id: 1}])
+
+    def test_backdated_log_invalidates_only_its_week(self):
+        self.series(self.weeks_ago(3), self.weeks_ago(1))
+        TodoLog.objects.create(todo_item=self.task, log_time=5, task_date=self.weeks_ago(2) + timedelta(days=1))
+        with self.assertNumQueries(0):
+            self.series(self.weeks_ago(3), self.weeks_ago(3))
+        buckets = dict(self.series(self.weeks_ago(3), self.weeks_ago(1)))
+        self.assertEqual(buckets[self.weeks_ago(2)], {self.project.id: 7})
+
+    def test_todays_log_leaves_cache_alone(self):
+        self.series(self.weeks_ago(3), self.weeks_ago(1))
+        TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=date.today())
+        with self.assertNumQueries(0):
+            self.series(self.weeks_ago(3), self.weeks_ago(1))
+
+    def test_task_report_shows_weekly_logged_hours(self):
+        self.client.login(username='period_user', password='password123')
+        response = self.client.get(reverse('task_report'))
+        logged = response.context['logged_hours']
+        self.assertEqual(logged['projects'], ['Period Project'])
+        self.assertEqual(logged['total'], 6)
+        self.assertEqual(len(logged['weeks']), 8)
+        self.assertContains(response, 'Logged Hours by Week')
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        self.dev = User.objects.create_user(username='analytics_dev', password='password123')
+        self.staff = User.objects.create_user(username='analytics_staff', password='password123', is_staff=True)
+        self.project = Project.objects.create(name='Analytics Project', owner=self.staff)
+        self.today = date.today()
+        for title, estimate, spent, status in (
+            ('Under', 4, 2, 'done'), ('Exact', 2, 2, 'done'), ('Over', 1, 3, 'inprogress'), ('Blocked', 3, 0, 'blocker'),
+        ):
+            task = TodoItem.objects.create(
+                user=self.dev, title=title, description='', project=self.project,
+                estimation_time=estimate, status=status,
+            )
+            if spent:
+                TodoLog.objects.create(todo_item=task, log_time=spent, task_date=self.today)
+
+    def test_estimation_error_distribution(self):
+        errors = analytics.analytics_report(project_id=self.project.id)['estimation_error']
+        self.assertEqual(errors['count'], 3)
+        self.assertAlmostEqual(errors['median'], 0.0)
+        self.assertAlmostEqual(errors['mean'], (-0.5 + 0 + 2) / 3)
+        self.assertAlmostEqual(errors['within_25_percent'], 1 / 3)
+        self.assertEqual([bucket['count'] for bucket in errors['histogram']], [0, 1, 0, 1, 0, 0, 0, 1])
+        self.assertEqual(errors['by_user'][0]['username'], 'analytics_dev')
+
+    def test_velocity_burn_down_and_blockers(self):
+        report = analytics.analytics_report(project_id=self.project.id)
+        dev = report['velocity']['users'][0]
+        self.assertEqual((sum(dev['completed']), sum(dev['logged'])), (6, 7))
+        self.assertEqual(report['burn_down'][-1], {'day': self.today, 'remaining': 4.0})
+        self.assertEqual(report['blocker_dwell']['count'], 1)
+        self.assertEqual(report['blocker_dwell']['longest'][0]['title'], 'Blocked')
+
+    def test_fallback_matches_vectorized_results(self):
+        if analytics.np is None:
+            self.skipTest('NumPy is not installed')
+        now = timezone.now()
+        vectorized = analytics.analytics_report(now=now)
+        with mock.patch.object(analytics, 'np', None):
+            fallback = analytics.analytics_report(now=now)
+        vectorized.pop('backend'), fallback.pop('backend')
+        self.assertEqual(vectorized, fallback)
+
+    def test_pure_python_percentiles_match_linear_interpolation(self):
+        self.assertEqual(analytics._percentile([1, 2, 3, 4], 50), 2.5)
+        self.assertAlmostEqual(analytics._percentile([0, 10], 10), 1.0)
+
+    def test_view_is_staff_only_and_command_runs(self):
+        self.client.login(username='analytics_dev', password='password123')
+        self.assertEqual(self.client.get(reverse('analytics_report')).status_code, 302)
+        self.client.login(username='analytics_staff', password='password123')
+        response = self.client.get(reverse('analytics_report'), {'project': self.project.id})
+        self.assertContains(response, 'Estimation Error')
+        self.assertContains(response, 'Blocked')
+        out = io.StringIO()
+        call_command('task_analytics', '--project', str(self.project.id), stdout=out)
+        self.assertIn('Estimation error over 3 task(s)', out.getvalue())
+
+
+class TaskStatusHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='flow_user', password='password123')
+        self.project = Project.objects.create(name='Flow Project', owner=self.user)
+        self.other = Project.objects.create(name='Flow Other', owner=self.user)
+        self.client.login(username='flow_user', password='password123')
+
+    def transitions(self, project=None):
+        return list(TaskStatusEvent.objects.filter(project=project or self.project).order_by('id').values_list(
+            'from_status', 'to_status'
+        ))
+
+    def test_events_follow_creation_transitions_moves_and_deletes(self):
+        task = TodoItem.objects.create(user=self.user, title='Flowing', description='', project=self.project)
+        task.status = 'inprogress'
+        task.save()
+        task.title = 'Renamed'
+        task.save()
+        task.project = self.other
+        task.save()
+        task.delete()
+        self.assertEqual(self.transitions(), [('', 'todo'), ('todo', 'inprogress'), ('inprogress', '')])
+        self.assertEqual(self.transitions(self.other), [('', 'inprogress'), ('inprogress', '')])
+
+    def test_inline_edit_records_transition(self):
+        task = TodoItem.objects.create(user=self.user, title='Inline', description='', project=self.project)
+        self.client.post(reverse('inline_edit_todo', args=[task.id]), json.dumps({'status': 'done'}), content_type='application/json')
+        self.assertEqual(self.transitions()[-1], ('todo', 'done'))
+
+    def test_bulk_set_status_writes_events_in_bulk_and_keeps_stats(self):
+        for i in range(3):
+            TodoItem.objects.create(user=self.user, title=f'Bulk {i}', description='', project=self.project)
+        with self.assertNumQueries(6):  # savepoint, select, update, bulk insert, stats update, release
+            changed = bulk_set_status(TodoItem.objects.filter(project=self.project), 'done')
+        self.assertEqual(changed, 3)
+        self.assertEqual(self.transitions().count(('todo', 'done')), 3)
+        stats = ProjectStats.objects.get(project=self.project)
+        self.assertEqual((stats.todo_count, stats.done_count), (0, 3))
+
+    def test_cumulative_flow_endpoint(self):
+        today = date.today()
+        task = TodoItem.objects.create(user=self.user, title='Old', description='', project=self.project)
+        TaskStatusEvent.objects.filter(task=task).update(timestamp=timezone.now() - timedelta(days=2))
+        TaskStatusEvent.objects.create(task=task, project=self.project, from_status='todo', to_status='done',
+                                       timestamp=timezone.now() - timedelta(days=1))
+        TodoItem.objects.create(user=self.user, title='New', description='', project=self.project)
+        response = self.client.get(reverse('project_cumulative_flow_api', args=[self.project.id]),
+                                   {'start': str(today - timedelta(days=3)), 'end': str(today)})
+        data = response.json()
+        self.assertEqual(data['series']['todo'], [0, 1, 0, 1])
+        self.assertEqual(data['series']['done'], [0, 0, 1, 1])
+        self.assertEqual(data['remaining'], [0, 1, 0, 1])
+
+    def test_cumulative_flow_requires_membership(self):
+        User.objects.create_user(username='flow_outsider', password='password123')
+        self.client.login(username='flow_outsider', password='password123')
+        response = self.client.get(reverse('project_cumulative_flow_api', args=[self.project.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskImportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username='importer', password='password123', is_staff=True)
+        self.dev = User.objects.create_user(username='imported_dev', password='password123')
+        self.project = Project.objects.create(name='Import Target', owner=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def write(self, name, text):
+        path = f'{self.media_root}/{name}'
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def test_jsonl_with_nested_logs(self):
+        lines = [
+            {'ref': 'A-1', 'username': 'imported_dev', 'project': 'Import Target', 'title': 'Migrated', 'description': 'Old',
+             'status': 'inprogress', 'estimation_time_hours': 3,
+             'logs': [{'log_time': 1.5, 'task_date': '2024-03-01'}, {'log_time': 2, 'task_date': '2024-03-02', 'notes': 'more'}]},
+            {'username': 'imported_dev', 'project': str(self.project.id), 'title': 'No logs', 'description': '', 'time_spent_hours': 4},
+            {'username': 'nobody', 'title': 'Bad user', 'description': ''},
+            {'username': 'imported_dev', 'title': '', 'description': ''},
+        ]
+        stream = io.BytesIO('\n'.join(json.dumps(line) for line in lines).encode() + b'\nnot json\n')
+        result = import_tasks(stream, 'jsonl', batch_size=1)
+        self.assertEqual((result.tasks, result.logs, result.skipped), (2, 2, 3))
+        self.assertIn("unknown user 'nobody'", ' '.join(result.errors))
+
+        migrated = TodoItem.objects.get(title='Migrated')
+        self.assertEqual((migrated.user, migrated.status, migrated.estimation_time, migrated.time_spent), (self.dev, 'inprogress', 3, 3.5))
+        self.assertEqual(TodoItem.objects.get(title='No logs').time_spent, 4)
+        stats = ProjectStats.objects.get(project=self.project)
+        self.assertEqual((stats.todo_count, stats.inprogress_count, stats.total_hours), (1, 1, 7.5))
+        self.assertEqual(TaskStatusEvent.objects.filter(project=self.project).count(), 2)
+
+    def test_ids_survive_concurrent_inserts(self):
+        bulk_create = TodoItem.objects.bulk_create
+
+        def bulk_create_then_concurrent_insert(tasks, *args, **kwargs):
+            created = bulk_create(tasks, *args, **kwargs)
+            TodoItem.objects.create(user=self.user, title='Written meanwhile', description='')
+            return created
+
+        lines = [
+            {'ref': f'T-{i}', 'username': 'imported_dev', 'title': f'Task {i}', 'description': '',
+             'logs': [{'log_time': i, 'task_date': '2024-03-01'}]}
+            for i in range(1, 4)
+        ]
+        stream = io.BytesIO('\n'.join(json.dumps(line) for line in lines).encode())
+        with mock.patch.object(TodoItem.objects, 'bulk_create', bulk_create_then_concurrent_insert):
+            result = import_tasks(stream, 'jsonl')
+        self.assertEqual((result.tasks, result.logs), (3, 3))
+        for i in range(1, 4):
+            self.assertEqual(list(TodoLog.objects.filter(todo_item__title=f'Task {i}').values_list('log_time', flat=True)), [i])
+        self.assertFalse(TodoLog.objects.filter(todo_item__title='Written meanwhile').exists())
+
+    def test_csv_tasks_and_logs_via_command(self):
+        tasks = self.write('tasks.csv', 'ref,username,project,title,description,status\n'
+                                        'T1,,Import Target,From CSV,desc,done\n'
+                                        'T2,imported_dev,New Project,Needs project,desc,todo\n')
+        logs = self.write('logs.csv', 'ref,log_time,task_date,notes\nT1,2,2024-01-05,x\nT1,-,2024-01-06,\nT9,1,,\n')
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_tasks', tasks, '--logs', logs, '--default-user', 'importer',
+                     '--create-projects', stdout=out, stderr=err)
+        self.assertIn('Imported 2 task(s) and 1 log(s); skipped 2 invalid row(s).', out.getvalue())
+        self.assertEqual(TodoItem.objects.get(title='From CSV').time_spent, 2)
+        self.assertEqual(TodoItem.objects.get(title='Needs project').project.name, 'New Project')
+
+    def test_dry_run_writes_nothing(self):
+        tasks = self.write('tasks.jsonl', json.dumps({'username': 'imported_dev', 'title': 'Dry', 'description': ''}) + '\n')
+        out = io.StringIO()
+        call_command('import_tasks', tasks, '--dry-run', stdout=out)
+        self.assertIn('Validated 1 task(s)', out.getvalue())
+        self.assertFalse(TodoItem.objects.filter(title='Dry').exists())
+
+    def test_staff_upload_enqueues_import_job(self):
+        self.client.login(username='importer', password='password123')
+        upload = SimpleUploadedFile('tasks.jsonl', json.dumps({'title': 'Uploaded', 'description': ''}).encode())
+        response = self.client.post(reverse('import_tasks'), {'tasks_file': upload})
+        job = response.context['job']
+        self.assertEqual(job.kind, 'import_tasks')
+        jobs.run_job(jobs.claim_next_job().id)
+        job.refresh_from_db()
+        self.assertEqual(job.result['tasks'], 1)
+        self.assertEqual(TodoItem.objects.get(title='Uploaded').user, self.user)
+        self.assertFalse(default_storage.exists(job.payload['tasks']))
+
+    def test_upload_is_staff_only(self):
+        self.client.login(username='imported_dev', password='password123')
+        self.assertEqual(self.client.get(reverse('import_tasks')).status_code, 302)
+        response = self.client.post(reverse('enqueue_job_api', args=['import_tasks']), {'tasks': 'task_imports/x.csv'})
+        self.assertEqual(response.status_code, 403)
+
+
+class DeferredSignalsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='bulk_writer', password='password123')
+        self.project = Project.objects.create(name='Bulk Project')
+        self.task = TodoItem.objects.create(user=self.user, title='Bulk', description='d', project=self.project)
+
+    def test_log_writes_make_no_bookkeeping_queries(self):
+        with defer_signals():
+            with self.assertNumQueries(10):
+                for day in range(1, 11):
+                    TodoLog.objects.create(todo_item=self.task, log_time=0.5, task_date=date(2024, 1, day))
+            self.task.refresh_from_db()
+            self.assertEqual(self.task.time_spent, 0)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.time_spent, 5)
+        self.assertEqual(ProjectStats.objects.get(project=self.project).total_hours, 5)
+
+    def test_task_moves_and_deletes_rebuild_stats(self):
+        other = Project.objects.create(name='Other Bulk Project')
+        doomed = TodoItem.objects.create(user=self.user, title='Doomed', description='d', project=self.project)
+        TodoLog.objects.create(todo_item=doomed, log_time=2, task_date=date(2024, 1, 1))
+        with defer_signals():
+            self.task.project = other
+            self.task.status = 'done'
+            self.task.save()
+            doomed.delete()
+        self.assertEqual(ProjectStats.objects.get(project=self.project).task_count, 0)
+        self.assertEqual(ProjectStats.objects.get(project=self.project).total_hours, 0)
+        self.assertEqual(ProjectStats.objects.get(project=other).done_count, 1)
+        # Status history isn't deferred.
+        self.assertTrue(TaskStatusEvent.objects.filter(project=other, to_status='done').exists())
+
+    def test_users_get_profiles_in_one_insert(self):
+        @defer_signals()
+        def create_users():
+            for index in range(3):
+                User.objects.create_user(username=f'fixture_user_{index}')
+            self.assertFalse(UserProfile.objects.filter(user__username__startswith='fixture_user_').exists())
+
+        create_users()
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='fixture_user_').count(), 3)
+
+    def test_nested_blocks_catch_up_once_at_the_end(self):
+        with defer_signals() as outer:
+            with defer_signals() as inner:
+                self.assertIs(inner, outer)
+                TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=date(2024, 1, 1))
+            self.task.refresh_from_db()
+            self.assertEqual(self.task.time_spent, 0)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.time_spent, 1)
+
+    def test_catch_up_rolls_back_with_the_block(self):
+        with transaction.atomic():
+            with self.assertRaises(ValueError):
+                with transaction.atomic(), defer_signals():
+                    TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=date(2024, 1, 1))
+                    raise ValueError
+        self.assertFalse(TodoLog.objects.exists())
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.time_spent, 0)
+        # Outside a block the receivers run as usual again.
+        TodoLog.objects.create(todo_item=self.task, log_time=2, task_date=date(2024, 1, 2))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.time_spent, 2)
+
+    def test_failed_block_skips_catch_up(self):
+        with mock.patch('users.deferred.DeferredWork.apply') as apply:
+            with self.assertRaises(ValueError):
+                with defer_signals():
+                    raise ValueError
+            apply.assert_not_called()
+            with defer_signals():
+                pass
+            apply.assert_called_once()
+
+
+class UserProfileCreationTests(TestCase):
+    def test_profile_created_once_and_logins_skip_it(self):
+        user = User.objects.create_user(username='profiled', password='password123')
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+        user = User.objects.get(pk=user.pk)
+        # The last_login save makes no profile query.
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+    def test_missing_profile_created_on_first_access(self):
+        user = User.objects.create_user(username='no_profile', password='password123')
+        UserProfile.objects.filter(user=user).delete()
+        self.client.login(username='no_profile', password='password123')
+        response = self.client.get(reverse('profile_view'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserProfile.objects.filter(user=user).exists())
+
+    def test_backfill_command_and_login_benchmark(self):
+        users = [User.objects.create_user(username=f'legacy_{i}') for i in range(3)]
+        UserProfile.objects.filter(user__in=users).delete()
+        out = io.StringIO()
+        call_command('backfill_profiles', '--check', stdout=out)
+        self.assertIn('3 user(s) without a profile.', out.getvalue())
+        call_command('backfill_profiles', stdout=out)
+        self.assertIn('Created 3 profile(s).', out.getvalue())
+        self.assertFalse(User.objects.filter(profile__isnull=True).exists())
+
+        out = io.StringIO()
+        call_command('bench_logins', '--users', '5', '--repeat', '1', stdout=out)
+        self.assertIn('legacy get_or_create on every save', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench_login_').exists())
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin_perf', password='password123', email='a@example.com')
+        self.client.login(username='admin_perf', password='password123')
+        self.url = reverse('admin:users_todoitem_changelist')
+
+    def make_tasks(self, count, prefix):
+        for index in range(count):
+            user = User.objects.create_user(username=f'{prefix}_{index}')
+            project = Project.objects.create(name=f'{prefix} project {index}')
+            task = TodoItem.objects.create(user=user, project=project, title=f'{prefix} {index}', description='d')
+            TodoLog.objects.create(todo_item=task, log_time=1, task_date=date(2024, 1, 1))
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(captured)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.make_tasks(2, 'few')
+        urls = (self.url, reverse('admin:users_todolog_changelist'), reverse('admin:auth_user_changelist'))
+        for index, url in enumerate(urls):
+            few = self.changelist_queries(url)
+            self.make_tasks(5, f'more{index}')
+            self.assertEqual(self.changelist_queries(url), few, url)
+
+    def test_filters_are_text_inputs(self):
+        self.make_tasks(3, 'filtered')
+        response = self.client.get(self.url, {'username': 'filtered_1'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'name="username" value="filtered_1"')
+        # No link per user or project.
+        self.assertNotContains(response, 'user__id__exact')
+        response = self.client.get(reverse('admin:users_todolog_changelist'), {'project_name': 'filtered project 2'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_unfiltered_count_is_estimated_on_big_tables(self):
+        self.make_tasks(3, 'estimated')
+        TodoItem.objects.filter(title='estimated 0').delete()
+        with mock.patch('users.admin_tools.EXACT_COUNT_THRESHOLD', 0):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(self.url)
+            # SQLite's estimate is MAX(rowid), which still counts the deleted row.
+            self.assertEqual(response.context['cl'].result_count, TodoItem.objects.order_by('-id').first().id)
+            self.assertFalse([q for q in captured if 'COUNT(' in q['sql'] and 'users_todoitem' in q['sql']])
+            response = self.client.get(self.url, {'status__exact': 'todo'})
+            self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class AdminBulkActionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(username='bulk_admin', password='password123', email='b@example.com')
+        self.client.login(username='bulk_admin', password='password123')
+        self.team = [User.objects.create_user(username=f'onboarded_{i}') for i in range(4)]
+        self.projects = [Project.objects.create(name=f'Team project {i}') for i in range(2)]
+
+    def post_action(self, model, action, ids, **data):
+        url = reverse(f'admin:users_{model}_changelist')
+        return self.client.post(url, {'action': action, ACTION_CHECKBOX_NAME: ids, 'index': 0, **data})
+
+    def test_add_and_remove_members(self):
+        ids = [project.id for project in self.projects]
+        ProjectMembership.objects.create(project=self.projects[0], user=self.team[0])
+        response = self.post_action('project', 'add_members', ids)
+        self.assertContains(response, 'Add users to projects')
+        self.assertEqual(list(response.context['selected']), [str(pk) for pk in ids])
+
+        response = self.post_action('project', 'add_members', ids, apply='1', users=[user.id for user in self.team])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ProjectMembership.objects.filter(project__in=self.projects).count(), 8)
+        self.assertEqual([project.stats.member_count for project in Project.objects.filter(id__in=ids)], [4, 4])
+
+        self.post_action('project', 'remove_members', ids, apply='1', users=[self.team[0].id, self.team[1].id])
+        self.assertEqual(ProjectMembership.objects.filter(project__in=self.projects).count(), 4)
+        self.assertEqual([project.stats.member_count for project in Project.objects.filter(id__in=ids)], [2, 2])
+
+    def test_reassign_tasks_in_one_update(self):
+        tasks = [TodoItem.objects.create(user=self.team[0], project=self.projects[0], title=f'Move {i}', description='d')
+                 for i in range(3)]
+        TodoLog.objects.create(todo_item=tasks[0], log_time=2, task_date=date(2024, 1, 1))
+        ids = [task.id for task in tasks]
+
+        response = self.post_action('todoitem', 'reassign_tasks', ids, apply='1')
+        self.assertContains(response, 'Choose a new owner or project.')
+
+        response = self.post_action('todoitem', 'reassign_tasks', ids, apply='1',
+                                    user=self.team[1].id, project=self.projects[1].id)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(set(TodoItem.objects.filter(id__in=ids).values_list('user_id', 'project_id')),
+                         {(self.team[1].id, self.projects[1].id)})
+        old_stats, new_stats = (ProjectStats.objects.get(project=project) for project in self.projects)
+        self.assertEqual((old_stats.todo_count, old_stats.total_hours), (0, 0))
+        self.assertEqual((new_stats.todo_count, new_stats.total_hours), (3, 2))
+        self.assertEqual(TaskStatusEvent.objects.filter(project=self.projects[0], from_status='todo').count(), 3)
+
+        self.post_action('todoitem', 'reassign_tasks', ids, apply='1', remove_project='on')
+        self.assertFalse(TodoItem.objects.filter(id__in=ids, project__isnull=False).exists())
+        self.assertEqual(ProjectStats.objects.get(project=self.projects[1]).task_count, 0)
+
+    def test_close_tasks(self):
+        tasks = [TodoItem.objects.create(user=self.team[0], project=self.projects[0], title=f'Close {i}', description='d')
+                 for i in range(2)]
+        self.post_action('todoitem', 'close_tasks', [task.id for task in tasks])
+        self.assertEqual(ProjectStats.objects.get(project=self.projects[0]).done_count, 2)
+        self.assertFalse(TodoItem.objects.exclude(status='done').filter(id__in=[task.id for task in tasks]).exists())
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='archivist', password='password123')
+        self.project = Project.objects.create(name='Archive Project')
+        self.old_done = [self.make_task(f'Old done {i}', 'done', days_ago=120) for i in range(3)]
+        self.recent_done = self.make_task('Recent done', 'done', days_ago=5)
+        self.old_open = self.make_task('Old open', 'inprogress', days_ago=120)
+        self.client.login(username='archivist', password='password123')
+
+    def make_task(self, title, status, days_ago):
+        task = TodoItem.objects.create(user=self.user, project=self.project, title=title, description='d', status=status)
+        TodoLog.objects.create(todo_item=task, log_time=1.5, task_date=date(2024, 2, 1), notes='n')
+        TodoItem.objects.filter(id=task.id).update(updated_at=timezone.now() - timedelta(days=days_ago))
+        return task
+
+    def archive(self, *args):
+        out = io.StringIO()
+        call_command('archive', '--older-than', '90', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_old_done_tasks_in_batches(self):
+        series_before = logged_hours_series(date(2024, 2, 1), date(2024, 2, 1), project_id=self.project.id)
+        events_before = TaskStatusEvent.objects.count()
+        self.assertIn('Would archive 3 task(s) and 3 log(s).', self.archive('--dry-run'))
+        self.assertEqual(ArchivedTodoItem.objects.count(), 0)
+
+        self.assertIn('Archived 3 task(s) and 3 log(s).', self.archive('--batch-size', '2'))
+        self.assertEqual(set(ArchivedTodoItem.objects.values_list('id', flat=True)), {task.id for task in self.old_done})
+        self.assertEqual(ArchivedTodoLog.objects.count(), 3)
+        self.assertEqual(set(TodoItem.objects.values_list('title', flat=True)), {'Recent done', 'Old open'})
+        self.assertEqual(TodoLog.objects.count(), 2)
+        # Stats cover live tasks; history and charts are unchanged.
+        self.assertEqual(ProjectStats.objects.get(project=self.project).done_count, 1)
+        self.assertEqual(TaskStatusEvent.objects.count(), events_before)
+        self.assertEqual(logged_hours_series(date(2024, 2, 1), date(2024, 2, 1), project_id=self.project.id), series_before)
+
+    def test_archived_tasks_read_through(self):
+        self.archive()
+        task = self.old_done[0]
+        response = self.client.get(reverse('todo_detail', args=[task.id]))
+        self.assertContains(response, 'Archived At')
+        self.assertNotContains(response, reverse('edit_todo', args=[task.id]))
+        self.assertEqual(response.context['log_summary']['count'], 1)
+        data = self.client.get(reverse('todo_logs_api', args=[task.id])).json()
+        self.assertIsNone(data['logs'][0]['edit_url'])
+        self.assertEqual(self.client.get(reverse('todo_detail', args=[999999])).status_code, 404)
+
+        response = self.client.get(reverse('task_report'), {'order_by': 'title'})
+        self.assertEqual([task.title for task in response.context['page_obj']], ['Old open', 'Recent done'])
+        response = self.client.get(reverse('task_report'), {'order_by': '-title', 'archived': '1'})
+        titles = [task.title for task in response.context['page_obj']]
+        self.assertEqual(titles, ['Recent done', 'Old open', 'Old done 2', 'Old done 1', 'Old done 0'])
+        self.assertContains(response, 'Archived</span>', count=3)
+
+        content = self.client.get(reverse('download_csv_report'), {'archived': '1'}).content.decode()
+        self.assertIn('Old done 1', content)
+        self.assertNotIn('Old done 1', self.client.get(reverse('download_csv_report')).content.decode())
+
+    def test_archive_run_elsewhere_is_seen_by_time_series(self):
+        self.assertEqual(latest_archived_log_date(), date.min)
+        # Archive as another process would: straight to the tables.
+        task = ArchivedTodoItem.objects.create(id=999999, user=self.user, project=self.project, title='Elsewhere',
+                                               description='d', status='done', created_at=timezone.now(),
+                                               updated_at=timezone.now())
+        ArchivedTodoLog.objects.create(id=999999, todo_item=task, log_time=2.0, task_date=date(2024, 3, 1))
+        self.assertEqual(latest_archived_log_date(), date(2024, 3, 1))
+        self.assertEqual(logged_hours_series(date(2024, 3, 1), date(2024, 3, 1), project_id=self.project.id),
+                         [(date(2024, 3, 1), 2.0)])
+
+
+class TodoLogPartitioningTests(TestCase):
+    def test_month_helpers(self):
+        self.assertEqual(partitioning.month_starts(date(2024, 11, 15), date(2025, 2, 1)),
+                         [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)])
+        self.assertEqual(partitioning.add_months(date(2024, 12, 1), 3), date(2025, 3, 1))
+        self.assertEqual(partitioning.partition_name(date(2025, 1, 1)), 'users_todolog_p202501')
+
+    def test_partition_command_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, 'Partitioning needs PostgreSQL'):
+            call_command('partition_todologs')
+
+    def test_benchmark_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, 'needs PostgreSQL'):
+            call_command('bench_log_partitions', '--seed', '10')
+
+    def test_partition_todolog_refuses_other_databases(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'needs PostgreSQL'):
+            partitioning.partition_todolog()
+
+
+@skipIf(connection.vendor != 'postgresql', 'TodoLog partitioning needs PostgreSQL (set DB_ENGINE)')
+class TodoLogPartitioningPostgresTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='partition_user', password='password123')
+        self.task = TodoItem.objects.create(user=user, title='Partitioned', description='')
+        for day in (date(2024, 1, 31), date(2024, 2, 1), date(2030, 1, 1)):
+            TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=day)
+
+    def count(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            return cursor.fetchone()[0]
+
+    def test_converts_table_keeping_rows_sequence_and_foreign_key(self):
+        last_id = TodoLog.objects.order_by('-id').values_list('id', flat=True)[0]
+        created = partitioning.partition_todolog(months_ahead=1, today=date(2024, 2, 15))
+        self.assertEqual(created, ['users_todolog_default', 'users_todolog_p202401',
+                                   'users_todolog_p202402', 'users_todolog_p202403'])
+        with connection.cursor() as cursor:
+            self.assertTrue(partitioning.is_partitioned(cursor))
+            cursor.execute('SELECT to_regclass(%s)', [partitioning.UNPARTITIONED_TABLE])
+            self.assertIsNone(cursor.fetchone()[0])
+        self.assertEqual(self.count('users_todolog_p202401'), 1)
+        self.assertEqual(self.count('users_todolog_p202402'), 1)
+        self.assertEqual(self.count('users_todolog_default'), 1)
+        self.assertEqual(TodoLog.objects.filter(task_date=date(2024, 2, 1)).count(), 1)
+
+        log = TodoLog.objects.create(todo_item=self.task, log_time=2, task_date=date(2024, 3, 5))
+        self.assertGreater(log.id, last_id)
+        self.assertEqual(self.count('users_todolog_p202403'), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            TodoLog.objects.bulk_create([TodoLog(todo_item_id=999999, log_time=1, task_date=date(2024, 2, 2))])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TodoLog.objects.bulk_create([TodoLog(id=log.id, todo_item=self.task, log_time=1, task_date=log.task_date)])
+
+    def test_undated_logs_block_the_conversion(self):
+        TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=None)
+        with self.assertRaisesMessage(CommandError, '1 log(s) have no task_date'):
+            call_command('partition_todologs')
+        with connection.cursor() as cursor:
+            self.assertFalse(partitioning.is_partitioned(cursor))
+
+    def test_benchmark_reports_one_partition_touched(self):
+        partitioning.partition_todolog(months_ahead=0, today=date(2024, 2, 15))
+        out = io.StringIO()
+        call_command('bench_log_partitions', '--day', '2024-02-01', '--repeat', '1', stdout=out)
+        self.assertIn('Partitions touched: 1 (users_todolog_p202402)', out.getvalue())
+
+    def test_rerun_adds_months_and_moves_rows_out_of_default(self):
+        partitioning.partition_todolog(months_ahead=0, today=date(2024, 2, 15), keep_unpartitioned=True)
+        self.assertEqual(self.count(partitioning.UNPARTITIONED_TABLE), 3)
+        TodoLog.objects.create(todo_item=self.task, log_time=1, task_date=date(2024, 4, 10))
+        self.assertEqual(self.count('users_todolog_default'), 2)
+
+        self.assertEqual(partitioning.partition_todolog(months_ahead=0, today=date(2024, 4, 1)),
+                         ['users_todolog_p202404'])
+        self.assertEqual(self.count('users_todolog_p202404'), 1)
+        self.assertEqual(self.count('users_todolog_default'), 1)
+        self.assertEqual(partitioning.partition_todolog(months_ahead=0, today=date(2024, 4, 1)), [])
+
+
+class IdentityMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='mapper', password='password')
+        self.project = Project.objects.create(name='Mapped', owner=self.user)
+        self.project.members.add(self.user)
+        self.client.login(username='mapper', password='password')
+
+    def test_rows_load_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        identities = identity_map(request)
+        self.assertIs(identity_map(request), identities)
+        with self.assertNumQueries(1):
+            project = identities.accessible_project(self.project.id)
+            self.assertIs(identities.project(self.project.id), project)
+            self.assertIs(identities.user(self.user.id), self.user)
+        task = TodoItem.objects.create(title='Mapped task', user=self.user, project=self.project)
+        task.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertIs(identities.related(task, 'project'), project)
+
+        # A new request starts from an empty map.
+        other = RequestFactory().get('/')
+        other.user = self.user
+        with self.assertNumQueries(1):
+            identity_map(other).project(self.project.id)
+
+    def test_inaccessible_project(self):
+        outsider = User.objects.create_user(username='outsider', password='password')
+        identities = IdentityMap(outsider)
+        with self.assertRaises(Project.DoesNotExist):
+            identities.accessible_project(self.project.id)
+        identities.project(self.project.id)
+        with self.assertNumQueries(0), self.assertRaises(Project.DoesNotExist):
+            identities.accessible_project(self.project.id)
+
+    def test_api_lookups_go_through_the_map(self):
+        task = TodoItem.objects.create(title='Task', user=self.user, project=self.project)
+        log = TodoLog.objects.create(todo_item=task, log_time=2, task_date=date.today())
+        response = self.client.post(reverse('delete_log_api_updated', args=[log.id]))
+        self.assertEqual(response.json()['total_time_spent'], 0)
+        self.assertEqual(response.wsgi_request._identity_map.task(task.id).time_spent, 0)
+
+        response = self.client.get(reverse('project_users_api', args=[self.project.id]))
+        self.assertEqual([user['username'] for user in response.json()], ['mapper'])
+        with self.assertNumQueries(0):
+            response.wsgi_request._identity_map.project(self.project.id)
+
+    def test_inline_edit_loads_project_once(self):
+        task = TodoItem.objects.create(title='Task', user=self.user)
+        url = reverse('inline_edit_todo', args=[task.id])
+        payload = json.dumps({'project_id': self.project.id})
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.post(url, payload, content_type='application/json').json()
+        self.assertEqual(data['todo']['project_name'], 'Mapped')
+        project_selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'FROM "users_project"' in q['sql']]
+        self.assertEqual(len(project_selects), 1)
+
+        other = User.objects.create_user(username='other', password='password')
+        hidden = Project.objects.create(name='Hidden', owner=other)
+        response = self.client.post(url, json.dumps({'project_id': hidden.id}), content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class InlineEditPatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='patcher', password='password')
+        self.task = TodoItem.objects.create(title='Patch me', description='Keep', user=self.user)
+        self.client.login(username='patcher', password='password')
+        self.url = reverse('inline_edit_todo', args=[self.task.id])
+
+    def patch(self, payload):
+        return self.client.generic('PATCH', self.url, json.dumps(payload), content_type='application/json')
+
+    def test_patch_writes_only_changed_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.patch({'status': 'inprogress', 'title': 'Patch me'}).json()
+        self.assertEqual(data['todo']['status'], 'inprogress')
+        self.assertEqual(data['todo']['description'], 'Keep')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "users_todoitem"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"title"', updates[0])
+        self.assertIn('"status"', updates[0])
+
+        # Nothing changed, nothing written.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.patch({'status': 'inprogress'}).json()['success'])
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+    def test_stale_updated_at_is_rejected(self):
+        first = self.patch({'status': 'inprogress'}).json()['todo']
+        stale = self.task.updated_at.isoformat()
+        response = self.patch({'status': 'done', 'updated_at': stale})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['todo']['status'], 'inprogress')
+        self.assertEqual(TodoItem.objects.get(id=self.task.id).status, 'inprogress')
+
+        response = self.patch({'status': 'done', 'updated_at': first['updated_at']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(TodoItem.objects.get(id=self.task.id).status, 'done')
+        self.assertEqual(self.patch({'updated_at': 'yesterday'}).status_code, 400)
+
+    def test_updated_at_round_trips_through_stdlib_encoder(self):
+        # The stdlib encoder sends milliseconds back; the stored value has microseconds.
+        TodoItem.objects.filter(id=self.task.id).update(updated_at=timezone.now().replace(microsecond=123456))
+        with override_settings(USERS_JSON_ENCODER='stdlib'), mock.patch('users.responses._default_encoder', None):
+            updated_at = self.patch({}).json()['todo']['updated_at']
+            self.assertTrue(updated_at.endswith('.123Z'))
+            for status in ('inprogress', 'done', 'todo'):
+                response = self.patch({'status': status, 'updated_at': updated_at})
+                self.assertEqual(response.status_code, 200)
+                updated_at = response.json()['todo']['updated_at']
+
+    def test_errors(self):
+        self.assertEqual(self.patch({'time_spent_hours': -1}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        other = TodoItem.objects.create(title='Not mine', user=User.objects.create_user(username='x', password='x'))
+        response = self.client.generic('PATCH', reverse('inline_edit_todo', args=[other.id]), '{}',
+                                       content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class KanbanPositionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='mover', password='password')
+        self.project = Project.objects.create(name='Kanban Order', owner=self.user)
+        self.tasks = [
+            TodoItem.objects.create(title=f'Card {i}', description='', user=self.user, project=self.project)
+            for i in range(4)
+        ]
+        self.client.login(username='mover', password='password')
+
+    def move(self, task, payload):
+        return self.client.generic('PATCH', reverse('api_kanban_move_task', args=[task.id]), json.dumps(payload),
+                                   content_type='application/json')
+
+    def column_titles(self, status='todo'):
+        data = self.client.get(reverse('api_kanban_columns')).json()['columns'][status]
+        return [task['title'] for task in data['tasks']]
+
+    def test_ranks_sort_between_their_neighbours(self):
+        ranks = [positions.rank_between(None, None)]
+        for i in range(300):
+            index = (i * 7) % (len(ranks) + 1)
+            before = ranks[index - 1] if index else None
+            after = ranks[index] if index < len(ranks) else None
+            rank = positions.position_between(None, 'todo', before and (None, before), after and (None, after))
+            self.assertTrue((before or '') < rank and (after is None or rank < after))
+            self.assertFalse(rank.endswith('0'))
+            ranks.insert(index, rank)
+        self.assertEqual(ranks, sorted(ranks))
+        # Appending steps the last rank instead of halving the gap to the end.
+        rank = 'i'
+        for _ in range(1000):
+            rank = positions.rank_after(rank)
+        self.assertEqual(len(rank), positions.STEP_WIDTH)
+
+    def test_new_tasks_go_to_the_end_of_their_column(self):
+        self.assertEqual(self.column_titles(), ['Card 0', 'Card 1', 'Card 2', 'Card 3'])
+
+    def test_move_writes_only_the_moved_row(self):
+        first, second, third, last = self.tasks
+        with CaptureQueriesContext(connection) as queries:
+            response = self.move(last, {'status': 'todo', 'before_id': first.id, 'after_id': second.id})
+        self.assertTrue(response.json()['success'])
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.column_titles(), ['Card 0', 'Card 3', 'Card 1', 'Card 2'])
+
+        self.move(first, {'status': 'done', 'before_id': None, 'after_id': None})
+        self.move(third, {'status': 'done', 'after_id': first.id})
+        self.assertEqual(self.column_titles('done'), ['Card 2', 'Card 0'])
+        self.assertEqual(self.column_titles(), ['Card 3', 'Card 1'])
+
+    def test_tied_neighbours_rebalance_the_column(self):
+        TodoItem.objects.filter(id__in=[task.id for task in self.tasks]).update(position='i')
+        first, second, third, last = self.tasks
+        self.assertTrue(self.move(last, {'status': 'todo', 'before_id': first.id, 'after_id': second.id}).json()['success'])
+        self.assertEqual(self.column_titles(), ['Card 0', 'Card 3', 'Card 1', 'Card 2'])
+        ranks = list(TodoItem.objects.order_by('position').values_list('position', flat=True))
+        self.assertEqual(len(set(ranks)), 4)
+
+    def test_status_change_elsewhere_moves_the_card_to_the_end(self):
+        TodoItem.objects.create(title='Already done', description='', user=self.user, project=self.project, status='done')
+        self.client.generic('PATCH', reverse('inline_edit_todo', args=[self.tasks[0].id]),
+                            json.dumps({'status': 'done'}), content_type='application/json')
+        self.assertEqual(self.column_titles('done'), ['Already done', 'Card 0'])
+
+    def test_move_errors(self):
+        first, second, third, last = self.tasks
+        self.assertEqual(self.move(first, {'status': 'nope'}).status_code, 400)
+        self.assertEqual(self.move(first, {'status': 'done', 'before_id': second.id}).status_code, 400)
+        self.assertEqual(self.move(first, {'before_id': third.id, 'after_id': second.id}).status_code, 400)
+        self.assertEqual(self.move(first, {'before_id': 'x'}).status_code, 400)
+        stale = self.move(first, {'status': 'done', 'updated_at': '2000-01-01T00:00:00+00:00'})
+        self.assertEqual(stale.status_code, 409)
+        self.assertEqual(stale.json()['todo']['status'], 'todo')
+        other = TodoItem.objects.create(title='Not mine', user=User.objects.create_user(username='y', password='y'))
+        self.assertEqual(self.move(other, {'status': 'done'}).status_code, 404)
+
+    def test_drop_precondition_round_trips_through_stdlib_encoder(self):
+        first = self.tasks[0]
+        TodoItem.objects.filter(id=first.id).update(updated_at=timezone.now().replace(microsecond=654321))
+        with override_settings(USERS_JSON_ENCODER='stdlib'), mock.patch('users.responses._default_encoder', None):
+            card = next(task for task in self.client.get(reverse('api_kanban_columns')).json()['columns']['todo']['tasks']
+                        if task['id'] == first.id)
+            self.assertTrue(card['updated_at'].endswith('.654Z'))
+            response = self.move(first, {'status': 'done', 'updated_at': card['updated_at']})
+            self.assertEqual(response.status_code, 200)
+            response = self.move(first, {'status': 'todo', 'updated_at': response.json()['todo']['updated_at']})
+            self.assertEqual(response.status_code, 200)
+
+
+class ServingTests(TestCase):
+    def test_worker_config_follows_cpu_count(self):
+        self.assertEqual(serving.worker_config('gthread', cpus=4), {'worker_class': 'gthread', 'workers': 5, 'threads': 4})
+        uvicorn = serving.worker_config('uvicorn', cpus=4)
+        self.assertEqual((uvicorn['workers'], uvicorn['threads']), (9, 1))
+        self.assertTrue(uvicorn['worker_class'].endswith('UvicornWorker'))
+        with self.assertRaises(ValueError):
+            serving.worker_config('eventlet')
+
+    def test_tracker_reports_busy_share_since_last_report(self):
+        now = [0.0]
+        tracker = serving.UtilizationTracker(capacity=4, clock=lambda: now[0])
+        tracker.begin()
+        tracker.begin()
+        now[0] = 5.0
+        tracker.end()
+        now[0] = 10.0
+        stats = tracker.report()
+        # 2 threads for 5s, then 1 thread for 5s, out of 4 threads x 10s.
+        self.assertEqual((stats['requests'], stats['peak'], stats['utilization']), (1, 2, 0.375))
+        now[0] = 20.0
+        tracker.end()
+        self.assertEqual(tracker.report()['utilization'], 0.25)
+        self.assertIn('of 4 thread(s) busy', serving.format_report(1, 4, stats))
+
+    def test_serve_print_config(self):
+        out = StringIO()
+        call_command('serve', '--workers', '3', '--max-requests', '1000', '--print-config', stdout=out)
+        config = json.loads(out.getvalue().split('\n', 1)[1])
+        self.assertEqual(config['workers'], 3)
+        self.assertEqual(config['max_requests_jitter'], 100)
+        self.assertTrue(config['preload_app'])
+
+    def test_warm_up_compiles_templates(self):
+        self.assertGreater(serving.warm_up(), 0)
+
+
+class StartupProfileTests(TestCase):
+    def test_profile_startup_reports_every_phase(self):
+        out = StringIO()
+        call_command('profile_startup', '--runs', '1', '--top', '5', '--json', stdout=out)
+        profile = json.loads(out.getvalue())
+        self.assertEqual(list(profile['phases']), ['interpreter', 'setup', 'urls', 'templates'])
+        self.assertGreater(profile['phases']['setup']['modules'], 0)
+        self.assertEqual(len(profile['packages']), 5)
+
+    def test_parse_importtime_splits_phases(self):
+        log = ('import time: self [us] | cumulative | imported package\n'
+               'import time:        50 |         50 | encodings\n'
+               '#phase urls\n'
+               'import time:       100 |        250 |   users.views\n')
+        phases = profile_startup.parse_importtime(log)
+        self.assertEqual(phases['interpreter'], [('encodings', 50, 50, 0)])
+        self.assertEqual(phases['urls'], [('users.views', 100, 250, 1)])
+
+    def test_analytics_stays_off_the_startup_path(self):
+        # NumPy-backed analytics are only imported by the view that needs them.
+        script = 'import django, sys; django.setup(); from django.urls import get_resolver; ' \
+                 'get_resolver().url_patterns; print("users.analytics" in sys.modules, "csv" in sys.modules)'
+        completed = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True,
+                                   env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE})
+        self.assertEqual(completed.stdout.split(), ['False', 'False'])
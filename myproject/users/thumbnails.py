@@ -0,0 +1,133 @@
+"""
+Fixed-size thumbnails for uploaded profile pictures.
+
+The boards draw avatars at 24px, but UserProfile.profile_picture holds whatever
+users upload. Thumbnails are written next to the originals under
+``<upload dir>/thumbs/`` and reused from disk afterwards. They are generated in
+a background thread right after an upload commits. Requests never render one:
+until it exists, avatars show the original picture and an ``avatar_thumbnail``
+job is queued for it (see avatars.py).
+
+Thumbnail URLs carry a ``?v=`` query string derived from the thumbnail's
+modification time, so browsers can cache them aggressively and still pick up a
+new picture immediately.
+"""
+import logging
+import os
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THUMBNAIL_SIZE = 64
+
+
+def thumbnail_size():
+    # Read on each use, so override_settings and runtime changes apply.
+    return getattr(settings, 'USERS_AVATAR_THUMBNAIL_SIZE', DEFAULT_THUMBNAIL_SIZE)
+
+
+def _output_format():
+    from PIL import features
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def _thumbnail_name(name, size, extension):
+    size = size or thumbnail_size()
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'thumbs', f'{stem}_{size}.{extension}')
+
+
+def thumbnail_name(name, size=None):
+    """Storage name of the thumbnail for the original file ``name``."""
+    return _thumbnail_name(name, size, _output_format()[1])
+
+
+def thumbnail_is_stale(storage, name, size=None):
+    """True when the thumbnail is missing or older than the original."""
+    thumb = thumbnail_name(name, size)
+    if not storage.exists(thumb):
+        return True
+    return storage.get_modified_time(thumb) < storage.get_modified_time(name)
+
+
+def generate_thumbnail(storage, name, size=None):
+    """
+    Render a size x size thumbnail of ``name`` into storage and return its name.
+
+    An existing thumbnail is replaced. The new one is written under a free
+    temporary name and renamed over it, so concurrent renders of the same
+    picture (the upload thread and an avatar_thumbnail job) never leave a suffixed
+    copy behind.
+    """
+    from PIL import Image, ImageOps
+
+    size = size or thumbnail_size()
+    image_format = _output_format()[0]
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image = ImageOps.fit(image.convert('RGB'), (size, size), Image.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, quality=85)
+
+    thumb = thumbnail_name(name, size)
+    temporary = storage.save(f'{thumb}.tmp', ContentFile(buffer.getvalue()))
+    try:
+        os.replace(storage.path(temporary), storage.path(thumb))
+    except NotImplementedError:
+        # Remote storage without local paths: no rename, overwrite in place.
+        if storage.exists(thumb):
+            storage.delete(thumb)
+        with storage.open(temporary, 'rb') as rendered:
+            storage.save(thumb, rendered)
+        storage.delete(temporary)
+    return thumb
+
+
+def delete_thumbnails(storage, name, size=None):
+    """Remove the thumbnails of ``name`` in either output format."""
+    for extension in ('webp', 'jpg'):
+        thumb = _thumbnail_name(name, size, extension)
+        if storage.exists(thumb):
+            storage.delete(thumb)
+
+
+def thumbnail_url(storage, name, size=None):
+    """
+    Return the versioned URL of the thumbnail for ``name``, or None when there
+    is no up-to-date one (not rendered yet, missing original, Pillow
+    unavailable). Never renders.
+    """
+    try:
+        thumb = thumbnail_name(name, size)
+        if thumbnail_is_stale(storage, name, size):
+            return None
+        version = int(storage.get_modified_time(thumb).timestamp())
+    except Exception:
+        logger.warning('Could not look up the thumbnail of %s', name, exc_info=True)
+        return None
+    return f'{storage.url(thumb)}?v={version}'
+
+
+def generate_thumbnail_in_background(storage, name, on_done=None):
+    """Generate the thumbnail for ``name`` on a daemon thread, if it is stale."""
+    def run():
+        try:
+            if not thumbnail_is_stale(storage, name):
+                return
+            generate_thumbnail(storage, name)
+        except Exception:
+            logger.warning('Background thumbnail of %s failed', name, exc_info=True)
+            return
+        if on_done is not None:
+            on_done()
+
+    thread = threading.Thread(target=run, name='avatar-thumbnail', daemon=True)
+    thread.start()
+    return thread
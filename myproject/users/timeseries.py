@@ -0,0 +1,184 @@
+"""
+Logged hours bucketed by day, week or month, for charts and reports.
+
+``logged_hours_series`` answers for any mix of project, user and task over an
+arbitrary date range with a single grouped query; ``logged_hours_by_project``
+does the same with each bucket split per project.
+
+Days, weeks and months that have fully elapsed are treated as immutable:
+their aggregates are cached and a request only queries from its first
+uncached bucket onwards. A report over a long history therefore costs about
+as much as one over the current period.
+
+Past buckets can still change when someone logs time against an earlier
+day. The TodoLog save/delete hooks (see models.py) call
+``invalidate_logged_day`` for such backdated logs, which deletes exactly the
+cached buckets containing that day. Moving a task to another user or project
+rewrites its whole history, so that bumps a per-project/user/task generation
+instead, orphaning every cached bucket of the scopes involved.
+"""
+from datetime import date, timedelta
+from itertools import combinations
+
+from django.core.cache import cache
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .archive import latest_archived_log_date
+from .models import ArchivedTodoLog, TodoLog
+
+GRANULARITIES = ('day', 'week', 'month')
+GROUPINGS = (None, 'project')
+MAX_BUCKETS = 750
+BUCKET_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+_TRUNCATE = {
+    # task_date is already a date, so day buckets need no truncation.
+    'day': lambda: F('task_date'),
+    'week': lambda: TruncWeek('task_date'),
+    'month': lambda: TruncMonth('task_date'),
+}
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())  # Monday, like TruncWeek
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_starts(start, end, granularity):
+    """Start dates of every bucket touching [start, end]."""
+    starts = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        starts.append(current)
+        current = next_bucket(current, granularity)
+    return starts
+
+
+def _generation_key(kind, pk):
+    return f'users:timeseries:gen:{kind}:{pk}'
+
+
+def _generations(scope):
+    keys = {_generation_key(kind, pk): kind for kind, pk in scope if pk is not None}
+    cached = cache.get_many(keys)
+    return {kind: cached.get(key, 0) for key, kind in keys.items()}
+
+
+def _scope_prefix(scope, generations, granularity, group_by):
+    parts = [f'{kind}{pk}.{generations.get(kind, 0)}' for kind, pk in scope if pk is not None]
+    return f'users:timeseries:{granularity}:{group_by or "all"}:{"-".join(parts)}'
+
+
+def bump_generations(project_ids=(), user_ids=(), task_ids=()):
+    """Invalidate every cached bucket that involves these projects, users or tasks."""
+    keys = [_generation_key('project', pk) for pk in project_ids if pk is not None]
+    keys += [_generation_key('user', pk) for pk in user_ids if pk is not None]
+    keys += [_generation_key('task', pk) for pk in task_ids if pk is not None]
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def invalidate_logged_day(day, project_id, user_id, task_id):
+    """
+    Drop the cached buckets containing ``day`` for every scope a log on task
+    ``task_id`` (owned by ``user_id``, in ``project_id``) counts towards.
+    """
+    full_scope = [('project', project_id), ('user', user_id), ('task', task_id)]
+    full_scope = [(kind, pk) for kind, pk in full_scope if pk is not None]
+    generations = _generations(full_scope)
+    keys = []
+    for size in range(1, len(full_scope) + 1):
+        for subset in combinations(full_scope, size):
+            scope = _full_scope(**{f'{kind}_id': pk for kind, pk in subset})
+            for granularity in GRANULARITIES:
+                for group_by in GROUPINGS:
+                    prefix = _scope_prefix(scope, generations, granularity, group_by)
+                    keys.append(f'{prefix}:{bucket_start(day, granularity).isoformat()}')
+    cache.delete_many(keys)
+
+
+def _full_scope(project_id=None, user_id=None, task_id=None):
+    return [('project', project_id), ('user', user_id), ('task', task_id)]
+
+
+def _cached_buckets(start, end, granularity, scope, group_by, today):
+    """
+    {bucket_start: value} for every bucket touching [start, end], reading
+    closed buckets from the cache and computing the rest in one query.
+    Values are hours, or {project_id: hours} when grouping by project.
+    """
+    today = today or date.today()
+    starts = bucket_starts(start, end, granularity)
+    prefix = _scope_prefix(scope, _generations(scope), granularity, group_by)
+    closed = {bucket for bucket in starts if next_bucket(bucket, granularity) <= today}
+    keys = {f'{prefix}:{bucket.isoformat()}': bucket for bucket in closed}
+    values = {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    pending = [bucket for bucket in starts if bucket not in values]
+    if pending:
+        if group_by == 'project':
+            fetched = {bucket: {} for bucket in pending}
+        else:
+            fetched = dict.fromkeys(pending, 0)
+        # Archived logs (see archive.py) still count; the same columns exist on
+        # both tables. The archive only holds old days, so recent ranges skip it.
+        models = [TodoLog]
+        if pending[0] <= latest_archived_log_date():
+            models.append(ArchivedTodoLog)
+        for model in models:
+            logs = model.objects.filter(task_date__gte=pending[0], task_date__lt=next_bucket(starts[-1], granularity))
+            filters = {'project': 'todo_item__project_id', 'user': 'todo_item__user_id', 'task': 'todo_item_id'}
+            for kind, pk in scope:
+                if pk is not None:
+                    logs = logs.filter(**{filters[kind]: pk})
+            columns = ['bucket', 'todo_item__project_id'] if group_by == 'project' else ['bucket']
+            rows = logs.annotate(bucket=_TRUNCATE[granularity]()).order_by().values_list(*columns).annotate(
+                hours=Sum('log_time')
+            )
+            if group_by == 'project':
+                for bucket, project_id, hours in rows:
+                    if bucket in fetched:
+                        fetched[bucket][project_id] = fetched[bucket].get(project_id, 0) + (hours or 0)
+            else:
+                for bucket, hours in rows:
+                    if bucket in fetched:
+                        fetched[bucket] += hours or 0
+        cache.set_many(
+            {f'{prefix}:{bucket.isoformat()}': fetched[bucket] for bucket in pending if bucket in closed},
+            BUCKET_CACHE_TIMEOUT,
+        )
+        values.update(fetched)
+
+    return {bucket: values[bucket] for bucket in starts}
+
+
+def logged_hours_series(start, end, granularity='day', project_id=None, user_id=None, task_id=None, today=None):
+    """
+    Hours logged per bucket between ``start`` and ``end`` (inclusive), as a
+    list of (bucket_start, hours) covering every bucket that touches the
+    range, empty ones included. The first and last buckets are whole
+    weeks/months even if the range starts or ends inside them.
+    """
+    scope = _full_scope(project_id, user_id, task_id)
+    return list(_cached_buckets(start, end, granularity, scope, None, today).items())
+
+
+def logged_hours_by_project(start, end, granularity='week', project_id=None, user_id=None, task_id=None, today=None):
+    """Like ``logged_hours_series``, but each bucket is {project_id: hours}."""
+    scope = _full_scope(project_id, user_id, task_id)
+    return list(_cached_buckets(start, end, granularity, scope, 'project', today).items())
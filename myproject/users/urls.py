@@ -11,6 +11,9 @@ urlpatterns = [
     path('projects/<int:pk>/', views.ProjectDetailView.as_view(), name='project_detail'),
     path('projects/summaries/', views.project_summary_list_view, name='project_summary_list'),
     path('projects/<int:project_id>/summary/', views.project_summary_view, name='project_summary'),
+    path('api/projects/<int:project_id>/summary/', api_views.project_summary_api, name='project_summary_api'),
+    path('api/projects/<int:project_id>/cumulative-flow/', api_views.project_cumulative_flow_api, name='project_cumulative_flow_api'),
+    path('api/timeseries/hours/', api_views.logged_hours_timeseries_api, name='logged_hours_timeseries_api'),
 
     path('todo_list/', views.todo_list, name='todo_list'),
     path('add_todo/', views.add_todo, name='add_todo'),
@@ -21,7 +24,10 @@ urlpatterns = [
     path('log/<int:log_id>/delete/', views.delete_log, name='delete_log'),
     path('log/<int:log_id>/edit/', views.edit_log, name='edit_log'),
     path('todo/<int:todo_id>/add_log/', views.add_log, name='add_log'),
+    path('todo/<int:todo_id>/logs/', views.todo_logs_api, name='todo_logs_api'),
     path('report/', views.task_report, name='task_report'),
+    path('report/analytics/', views.analytics_report_view, name='analytics_report'),
+    path('tasks/import/', views.import_tasks_view, name='import_tasks'),
     # Profile URLs
     path('profile/', views.profile_view, name='profile_view'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile_view'),
@@ -32,6 +38,9 @@ urlpatterns = [
     path('ds_board_updated/', views.ds_board_updated_view, name='ds_board_updated'),
     # API URL for fetching Kanban tasks
     path('api/kanban_tasks/', views.api_get_kanban_tasks, name='api_kanban_tasks'),
+    path('api/kanban/columns/', views.api_kanban_columns, name='api_kanban_columns'),
+    path('api/kanban/columns/<str:status>/', views.api_kanban_column, name='api_kanban_column'),
+    path('api/kanban/tasks/<int:task_id>/move/', views.api_kanban_move_task, name='api_kanban_move_task'),
     # DS Board APIs
     path('api/ds_board/current_user/', api_views.current_user_api, name='current_user_api'),
     path('api/ds_board/projects/', api_views.project_list_api, name='project_list_api'),
@@ -41,6 +50,7 @@ urlpatterns = [
     path('api/ds_board/project/<int:project_id>/blockers/', api_views.project_blockers_api, name='project_blockers_api'),
     path('api/ds_board/create_task/', api_views.create_task_api, name='create_task_api'),
     path('api/ds_board/user/<int:user_id>/profile_picture/', api_views.user_profile_picture_api, name='user_profile_picture_api'),
+    path('api/ds_board/users/profile_pictures/', api_views.user_profile_pictures_api, name='user_profile_pictures_api'),
     path('api/ds_board/log_time/', api_views.log_time_api, name='log_time_api'),
     path('api/ds_board/task/<int:task_id>/total_time/', api_views.task_total_time_api, name='task_total_time_api'),
     path('api/ds_board/task/<int:task_id>/logs/', api_views.task_logs_api, name='task_logs_api'),
@@ -55,4 +65,8 @@ urlpatterns = [
     path('api/ds_board_updated/project/<int:project_id>/tasks/<str:date_str>/', api_views.project_tasks_by_date_api, name='project_tasks_by_date_api'),
     path('api/ds_board_updated/project/<int:project_id>/user/<int:user_id>/stats/<str:date_str>/', api_views.user_stats_api, name='user_stats_api'),
     path('api/ds_board_updated/task/<int:task_id>/log/create/', api_views.create_log_api, name='create_log_api'),
+    # Background jobs
+    path('api/jobs/<int:job_id>/', api_views.job_status_api, name='job_status_api'),
+    path('api/jobs/<int:job_id>/download/', api_views.job_download, name='job_download'),
+    path('api/jobs/<str:kind>/', api_views.enqueue_job_api, name='enqueue_job_api'),
 ]
@@ -1,15 +1,32 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import base64
+import json
+from datetime import date
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login
-from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from django.contrib.auth.decorators import login_required
-from .models import TodoItem, UserProfile, TodoLog
-from .forms import TodoForm, TodoLogForm
-from django.db.models import Sum, Q
-from django.urls import reverse
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.views import redirect_to_login
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
-from django.http import JsonResponse
-import json
-from datetime import date
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum, Q
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_http_methods
+from django.views.generic import ListView, DetailView
+
+from . import jobs, positions
+from .archive import find_task
+from .avatars import get_avatar_urls
+from .forms import CustomAuthenticationForm, CustomUserCreationForm, TodoForm, TodoLogForm, UserProfileForm
+from .identity import identity_map
+from .models import Project, ProjectMembership, TodoItem, TodoLog
+from .reports import load_report_tasks, logged_hours_report, project_summary_data, report_tasks, write_csv_report
+from .responses import FastJsonResponse
 
 def register(request):
     if request.method == 'POST':
@@ -32,7 +49,6 @@ def user_login(request):
         form = CustomAuthenticationForm()
     return render(request, 'registration/login.html', {'form': form})
 
-from .models import Project # Make sure Project is imported
 
 @login_required
 def todo_list(request):
@@ -138,7 +154,7 @@ def add_todo(request):
                 form = TodoForm(data, user=request.user)
                 log_form = TodoLogForm(data)
             except json.JSONDecodeError:
-                return JsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+                return FastJsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
         else:
             # Pass user to form for project filtering
             form = TodoForm(request.POST, user=request.user)
@@ -148,6 +164,8 @@ def add_todo(request):
             todo = form.save(commit=False)
             todo.user = request.user
             todo.save()
+            # The form already loaded the project; keep that instance for the response.
+            project = identity_map(request).related(todo, 'project')
 
             if log_form.is_valid() and log_form.cleaned_data.get('log_time'):
                 log = log_form.save(commit=False)
@@ -164,16 +182,16 @@ def add_todo(request):
                     'get_status_display': todo.get_status_display(),
                     'time_spent_hours': todo.time_spent_hours,
                     'estimation_time_hours': todo.estimation_time_hours,
-                    'project_id': todo.project.id if todo.project else None,
-                    'project_name': todo.project.name if todo.project else None,
+                    'project_id': todo.project_id,
+                    'project_name': project.name if project else None,
                 }
-                return JsonResponse({'success': True, 'todo': serialized_todo})
+                return FastJsonResponse({'success': True, 'todo': serialized_todo})
             else:
                 return redirect('todo_list')
         else: # Form is invalid
             if is_ajax:
                 # form.errors.as_json() returns a JSON string of errors by field
-                return JsonResponse({'success': False, 'errors': form.errors.as_json()}, status=400)
+                return FastJsonResponse({'success': False, 'errors': form.errors.as_json()}, status=400)
             else:
                 # For non-AJAX, re-render the page with form and errors
                 return render(request, 'todo/add_todo.html', {'form': form})
@@ -185,7 +203,7 @@ def add_todo(request):
             # Typically, a GET to an 'add' endpoint via AJAX might not be standard,
             # but if needed, could return form structure or similar.
             # For now, let's assume GET AJAX calls are not expected for this view or return an error.
-            return JsonResponse({'error': 'GET request not supported for AJAX here'}, status=405) # Method Not Allowed
+            return FastJsonResponse({'error': 'GET request not supported for AJAX here'}, status=405) # Method Not Allowed
         return render(request, 'todo/add_todo.html', {'form': form, 'log_form': log_form})
 
 @login_required
@@ -196,7 +214,7 @@ def delete_todo(request, todo_id):
     if request.method == 'POST':
         todo.delete()
         if is_ajax:
-            return JsonResponse({'success': True})
+            return FastJsonResponse({'success': True})
         else:
             # Fallback for non-AJAX POST, though primarily expecting AJAX now
             return redirect('todo_list')
@@ -214,10 +232,68 @@ def delete_todo(request, todo_id):
 #         return redirect('todo_list')
 #     return render(request, 'todo/delete_todo.html', {'todo': todo})
 
+TODO_LOGS_PER_PAGE = 25
+
+
+def _todo_log_page(todo, after=None, limit=TODO_LOGS_PER_PAGE):
+    """
+    One page of a task's logs in id order, starting after log id ``after``.
+    Returns (logs, next_after); next_after is None on the last page.
+    """
+    logs = todo.logs.order_by('id')
+    if after is not None:
+        logs = logs.filter(id__gt=after)
+    logs = list(logs[:limit + 1])
+    if len(logs) > limit:
+        logs = logs[:limit]
+        return logs, logs[-1].id
+    return logs, None
+
+
+def _todo_log_summary(todo):
+    """Count, total hours and date range of a task's logs, in one aggregate query."""
+    return todo.logs.aggregate(
+        count=Count('id'), total_hours=Sum('log_time'),
+        first_date=Min('task_date'), last_date=Max('task_date'),
+    )
+
+
+def _todo_log_context(todo):
+    logs, next_after = _todo_log_page(todo)
+    return {'logs': logs, 'logs_next_after': next_after, 'log_summary': _todo_log_summary(todo)}
+
+
 @login_required
 def todo_detail(request, todo_id):
-    todo = get_object_or_404(TodoItem, id=todo_id)
-    return render(request, 'todo/todo_detail.html', {'todo': todo})
+    # Archived tasks are shown read-only from the archive tables.
+    todo = find_task(todo_id)
+    if todo is None:
+        raise Http404('No task matches the given query.')
+    return render(request, 'todo/todo_detail.html', {'todo': todo, **_todo_log_context(todo)})
+
+
+@login_required
+def todo_logs_api(request, todo_id):
+    """The next page of a task's logs for the "Load more" button on todo_detail/edit_todo."""
+    todo = find_task(todo_id)
+    if todo is None:
+        raise Http404('No task matches the given query.')
+    try:
+        after = int(request.GET['after']) if request.GET.get('after') else None
+    except ValueError:
+        return FastJsonResponse({'error': 'Invalid after parameter.'}, status=400)
+    logs, next_after = _todo_log_page(todo, after)
+    return FastJsonResponse({
+        'logs': [{
+            'id': log.id,
+            'task_date': log.task_date,
+            'log_time': log.log_time,
+            'notes': log.notes or '',
+            'edit_url': None if todo.is_archived else reverse('edit_log', args=[log.id]),
+            'delete_url': None if todo.is_archived else reverse('delete_log', args=[log.id]),
+        } for log in logs],
+        'next_after': next_after,
+    })
 
 @login_required
 def task_report(request):
@@ -226,18 +302,7 @@ def task_report(request):
     todays_tasks = TodoItem.objects.filter(user=request.user, created_at__date=today)
     total_time_spent_today_hours = todays_tasks.aggregate(total_time=Sum('time_spent'))['total_time'] or 0
 
-    # Get tasks for display, apply search and ordering
-    # This part remains the same, for the main list of tasks displayed in the table
-    tasks_for_display = TodoItem.objects.filter(user=request.user, time_spent__gt=0)
-
-    # Search
     query = request.GET.get('q')
-    if query:
-        tasks_for_display = tasks_for_display.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(project__name__icontains=query)
-        )
 
     # Ordering
     order_by = request.GET.get('order_by', '-created_at') # Default order
@@ -252,19 +317,9 @@ def task_report(request):
     end_date_filter = request.GET.get('end_date', '')
     project_filter_id = request.GET.get('project', '')
 
-    # Apply filters
-    if status_filter:
-        # Filter by the new status field
-        tasks_for_display = tasks_for_display.filter(status=status_filter)
-    if start_date_filter:
-        tasks_for_display = tasks_for_display.filter(created_at__gte=start_date_filter)
-    if end_date_filter:
-        tasks_for_display = tasks_for_display.filter(created_at__lte=end_date_filter)
-    if project_filter_id:
-        tasks_for_display = tasks_for_display.filter(project_id=project_filter_id)
-
-    if order_by:
-        tasks_for_display = tasks_for_display.order_by(order_by)
+    # Search, filters and ordering (shared with the background task report job).
+    # ?archived=1 adds archived tasks.
+    tasks_for_display = report_tasks(request.user, request.GET, order_by)
 
     # Get unique statuses for dropdown
     # Updated to use the new status choices from the model
@@ -282,6 +337,8 @@ def task_report(request):
     paginator = Paginator(tasks_for_display, 10) # Show 10 tasks per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    if request.GET.get('archived'):
+        page_obj.object_list = load_report_tasks(page_obj.object_list)
 
     context = {
         'page_obj': page_obj, # Paginated tasks
@@ -294,6 +351,8 @@ def task_report(request):
         'selected_end_date': end_date_filter,
         'project_options': project_options,
         'selected_project_id': int(project_filter_id) if project_filter_id else None,
+        'include_archived': bool(request.GET.get('archived')),
+        'logged_hours': logged_hours_report(request.user, request.GET),
     }
     return render(request, 'todo/report.html', context)
 
@@ -313,7 +372,7 @@ def edit_todo(request, todo_id):
     else:
         form = TodoForm(instance=todo, user=request.user)
         log_form = TodoLogForm()
-    return render(request, 'todo/edit_todo.html', {'form': form, 'log_form': log_form, 'todo': todo})
+    return render(request, 'todo/edit_todo.html', {'form': form, 'log_form': log_form, 'todo': todo, **_todo_log_context(todo)})
 
 
 @login_required
@@ -352,113 +411,146 @@ def add_log(request, todo_id):
     return render(request, 'todo/add_log.html', {'form': form, 'todo': todo})
 
 
-import json
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+def _inline_hours(raw, name, label):
+    """
+    Hours from an inline-edit payload ('' or null mean 0). Raises ValueError
+    with the message to send back.
+    """
+    if raw is None or str(raw).strip() == '':
+        return 0
+    try:
+        hours = float(raw)
+    except ValueError:
+        raise ValueError(f'Invalid time format for {name}.')
+    if hours < 0:
+        raise ValueError(f'{label} cannot be negative.')
+    return hours
+
+
+def _inline_todo_data(todo, project):
+    return {
+        'id': todo.id,
+        'title': todo.title,
+        'description': todo.description,
+        'status': todo.status,
+        'get_status_display': todo.get_status_display(),
+        'time_spent_hours': todo.time_spent_hours,
+        'estimation_time_hours': todo.estimation_time_hours,
+        'project_id': todo.project_id,
+        'project_name': project.name if project else None,
+        'updated_at': todo.updated_at,
+    }
+
+
+def _to_milliseconds(value):
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def _updated_at_conflict(data, todo, identities):
+    """
+    Check the ``updated_at`` precondition of an inline edit or move against
+    the locked task. Returns None when the body has none or it matches, else
+    the 400 or 409 response to send.
+
+    The stdlib JSON encoder cuts datetimes to milliseconds, so that's the
+    precision clients can echo back and the precision compared.
+    """
+    if 'updated_at' not in data:
+        return None
+    expected = parse_datetime(str(data['updated_at'] or ''))
+    if expected is None:
+        return FastJsonResponse({'success': False, 'error': 'Invalid updated_at.'}, status=400)
+    if timezone.is_naive(expected):
+        expected = timezone.make_aware(expected)
+    if _to_milliseconds(expected) == _to_milliseconds(todo.updated_at):
+        return None
+    return FastJsonResponse({
+        'success': False,
+        'error': 'The task was changed since you loaded it.',
+        'todo': _inline_todo_data(todo, identities.related(todo, 'project')),
+    }, status=409)
+
 
 @login_required
-@require_POST # Ensures this view only accepts POST requests
+@require_http_methods(['POST', 'PATCH'])
 def inline_edit_todo(request, todo_id):
+    """
+    Partial update for the task list and the Kanban board. Only the keys in
+    the JSON body are applied (PATCH; POST is accepted for older clients) and
+    only the columns that actually change are written.
+
+    A body with ``updated_at`` (as returned by the previous response) only
+    applies if the task hasn't been saved since. Otherwise the response is a
+    409 carrying the task's current state, so quick successive drags can't
+    overwrite each other.
+    """
     try:
-        todo = get_object_or_404(TodoItem, id=todo_id, user=request.user)
         data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return FastJsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+    if not isinstance(data, dict):
+        return FastJsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+    identities = identity_map(request)
 
-        todo.title = data.get('title', todo.title)
-        todo.description = data.get('description', todo.description)
-
-        # Handle status
-        new_status = data.get('status', todo.status)
-        if new_status in [choice[0] for choice in TodoItem.STATUS_CHOICES]:
-            todo.status = new_status
-
-        # Handle project
-        if 'project_id' in data: # Check if project_id key is in the payload
-            project_id_val = data['project_id']
-            if project_id_val is None or str(project_id_val).lower() == 'null' or str(project_id_val) == '':
-                todo.project = None
-            else:
-                try:
-                    project_id_int = int(project_id_val)
-                    # Check if project exists and user has access (owner or member)
-                    user_accessible_projects = Project.objects.filter(
-                        Q(owner=request.user) | Q(members=request.user)
-                    ).distinct()
-
-                    project_instance = get_object_or_404(user_accessible_projects, id=project_id_int)
-                    todo.project = project_instance # Assign the validated project instance
-                except ValueError:
-                    return JsonResponse({'success': False, 'error': 'Invalid project_id format.'}, status=400)
-                except Project.DoesNotExist:
-                     # This error will be raised by get_object_or_404 if project_id_int is not in user_accessible_projects
-                    return JsonResponse({'success': False, 'error': 'Project not found or user does not have access.'}, status=404)
-                except Exception as e:
-                    # Log error e for server-side inspection
-                    return JsonResponse({'success': False, 'error': f'Could not assign project: {str(e)}'}, status=500) # 500 for unexpected
-        # If 'project_id' is not in data, todo.project remains unchanged by this block.
-
-        if 'time_spent_hours' in data:
-            try:
-                hours_str = data['time_spent_hours']
-                if hours_str is None or str(hours_str).strip() == '':
-                    todo.time_spent = 0
-                else:
-                    hours = float(hours_str)
-                    if hours < 0:
-                        return JsonResponse({'success': False, 'error': 'Time spent cannot be negative.'}, status=400)
-                    todo.time_spent = hours
-            except ValueError:
-                return JsonResponse({'success': False, 'error': 'Invalid time format for time_spent_hours.'}, status=400)
-
-        if 'estimation_time_hours' in data:
+    try:
+        with transaction.atomic():
+            todo = get_object_or_404(TodoItem.objects.select_for_update(), id=todo_id, user=request.user)
+            conflict = _updated_at_conflict(data, todo, identities)
+            if conflict is not None:
+                return conflict
+
+            changes = {name: data[name] for name in ('title', 'description') if name in data}
+            # Unknown statuses are ignored, as they always were.
+            if data.get('status') in dict(TodoItem.STATUS_CHOICES):
+                changes['status'] = data['status']
             try:
-                hours_str = data['estimation_time_hours']
-                if hours_str is None or str(hours_str).strip() == '':
-                    todo.estimation_time = 0
+                for name, field, label in (('time_spent_hours', 'time_spent', 'Time spent'),
+                                           ('estimation_time_hours', 'estimation_time', 'Estimation time')):
+                    if name in data:
+                        changes[field] = _inline_hours(data[name], name, label)
+            except ValueError as error:
+                return FastJsonResponse({'success': False, 'error': str(error)}, status=400)
+            changed = [name for name, value in changes.items() if getattr(todo, name) != value]
+
+            if 'project_id' in data: # If absent, the project stays as it is
+                project_id_val = data['project_id']
+                if project_id_val is None or str(project_id_val).lower() == 'null' or str(project_id_val) == '':
+                    project_instance = None
                 else:
-                    hours = float(hours_str)
-                    if hours < 0:
-                        return JsonResponse({'success': False, 'error': 'Estimation time cannot be negative.'}, status=400)
-                    todo.estimation_time = hours
-            except ValueError:
-                return JsonResponse({'success': False, 'error': 'Invalid time format for estimation_time_hours.'}, status=400)
-
-        todo.save()
-        todo.refresh_from_db()
-
-        return JsonResponse({
-            'success': True,
-            'todo': {
-                'id': todo.id,
-                'title': todo.title,
-                'description': todo.description,
-                'status': todo.status,
-                'get_status_display': todo.get_status_display(),
-                'time_spent_hours': todo.time_spent_hours,
-                'estimation_time_hours': todo.estimation_time_hours,
-                'project_id': todo.project.id if todo.project else None,
-                'project_name': todo.project.name if todo.project else None,
-            }
-        })
-    except json.JSONDecodeError:
-        return JsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
-    except Exception as e:
-        # Log the exception e
-        return JsonResponse({'success': False, 'error': 'An unexpected error occurred.'}, status=500)
+                    try:
+                        # Checked against the user's projects once per request (see identity.py)
+                        project_instance = identities.accessible_project(int(project_id_val))
+                    except ValueError:
+                        return FastJsonResponse({'success': False, 'error': 'Invalid project_id format.'}, status=400)
+                    except Project.DoesNotExist:
+                        return FastJsonResponse({'success': False, 'error': 'Project not found or user does not have access.'}, status=404)
+                if todo.project_id != (project_instance.id if project_instance else None):
+                    changes['project'] = project_instance
+                    changed.append('project')
+
+            for name in changed:
+                setattr(todo, name, changes[name])
+            if changed:
+                todo.save(update_fields=changed + ['updated_at'])
+    except Http404:
+        raise
+    except Exception:
+        return FastJsonResponse({'success': False, 'error': 'An unexpected error occurred.'}, status=500)
+
+    # Serialized from memory: the project was either just validated or is
+    # loaded once through the identity map.
+    return FastJsonResponse({'success': True, 'todo': _inline_todo_data(todo, identities.related(todo, 'project'))})
 
 @login_required
 def profile_view(request):
-    # UserProfile is automatically created for each User by a signal
-    # So, request.user.profile should exist.
-    # If it might not (e.g., if profiles are optional or created differently),
-    # you might use: profile, created = UserProfile.objects.get_or_create(user=request.user)
-    profile = request.user.profile
+    # New users get a profile from a signal; profile() covers any created without one.
+    profile = identity_map(request).profile()
     return render(request, 'profile/profile.html', {'profile': profile})
 
-from .forms import UserProfileForm # Import UserProfileForm
 
 @login_required
 def edit_profile_view(request):
-    profile = request.user.profile
+    profile = identity_map(request).profile()
     if request.method == 'POST':
         form = UserProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
@@ -476,53 +568,12 @@ def edit_profile_view(request):
         }
     )
 
-import csv
-from django.http import HttpResponse
 
 @login_required
 def download_csv_report(request):
-    user = request.user
-    try:
-        profile = user.profile
-        user_bio = profile.bio if profile else ""
-    except UserProfile.DoesNotExist: # Django raises User.profile.RelatedObjectDoesNotExist if profile doesn't exist
-        user_bio = ""
-
-    todo_items = TodoItem.objects.filter(user=user, time_spent__gt=0) # Only include todos with time spent
-
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="todo_report.csv"'
-
-    writer = csv.writer(response)
-
-    # Write header row
-    writer.writerow([
-        'Username', 'Email', 'Bio',
-        'Todo Title', 'Todo Description', 'Project Name', 'Status',
-        'Time Spent (hours)', 'Created At', 'Updated At'
-    ])
-
-    if not todo_items.exists():
-        # Write a row with user info even if there are no todos
-        writer.writerow([
-            user.username, user.email, user_bio,
-            'N/A', 'N/A', 'N/A', 'N/A', 'N/A', 'N/A', 'N/A'
-        ])
-    else:
-        for item in todo_items:
-            writer.writerow([
-                user.username,
-                user.email,
-                user_bio,
-                item.title,
-                item.description,
-                item.project.name if item.project else 'N/A', # Project Name
-                item.get_status_display(),
-                item.time_spent_hours,
-                item.created_at.strftime('%Y-%m-%d %H:%M:%S') if item.created_at else '',
-                item.updated_at.strftime('%Y-%m-%d %H:%M:%S') if item.updated_at else ''
-            ])
-
+    write_csv_report(request.user, response, include_archived=bool(request.GET.get('archived')))
     return response
 
 
@@ -564,79 +615,195 @@ def kanban_board_view(request):
     return render(request, 'users/kanban_board.html', context)
 
 
-from django.http import JsonResponse, HttpResponseForbidden
-from django.views.generic import ListView, DetailView
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.contrib.auth.views import redirect_to_login
-# Make sure TodoItem and Project are imported if not already:
-# from .models import TodoItem, Project
-
-@login_required
-def api_get_kanban_tasks(request):
+def _kanban_tasks_queryset(user, project_id_filter=None):
     """
-    API endpoint to fetch all tasks for projects the logged-in user is part of (owner or member),
-    formatted for the Kanban board.
+    Tasks visible on the user's Kanban board: every task of the projects they
+    own or belong to, plus their own project-less tasks. Returns None when the
+    user has no projects or filters by a project they are not part of.
     """
-    current_user = request.user
-
     # Find projects where the user is an owner or a member
     # Q objects are used to combine queries with OR
     user_projects = Project.objects.filter(
-        Q(owner=current_user) | Q(members=current_user)
+        Q(owner=user) | Q(members=user)
     ).distinct()
 
     if not user_projects.exists():
-        # If the user is not part of any projects, return an empty list
-        return JsonResponse([], safe=False)
+        return None
 
-    # Filter tasks that belong to these projects
-    # Also, ensure tasks are selected with related user profile and project for efficiency
-    # and ordered by creation date.
     tasks_query = TodoItem.objects.filter(
-        Q(project__in=user_projects) | Q(project__isnull=True, user=current_user)
-    ).select_related('user__profile', 'project').order_by('created_at')
+        Q(project__in=user_projects) | Q(project__isnull=True, user=user)
+    ).select_related('user', 'project')
 
     # Apply the project filter from the request, if any
-    project_id_filter = request.GET.get('project_id')
     if project_id_filter and project_id_filter.lower() != 'all' and project_id_filter.isdigit():
         # Ensure the filtered project is one of the user's projects
         # This prevents users from accessing tasks of projects they are not part of via the filter
-        if user_projects.filter(id=project_id_filter).exists():
-            tasks_query = tasks_query.filter(project_id=project_id_filter)
-        else:
-            # If the user tries to filter by a project they are not part of,
-            # return an empty list or handle as an error.
-            # For simplicity, returning empty list of tasks.
-            return JsonResponse([], safe=False)
-
-    tasks_data = []
-    for task in tasks_query:
-        profile_picture_url = None
-        if hasattr(task.user, 'profile') and task.user.profile.profile_picture:
-            profile_picture_url = task.user.profile.profile_picture.url
-        # else:
-            # Optionally, set a default placeholder image URL here
-            # profile_picture_url = '/static/images/default_avatar.png'
-
-        tasks_data.append({
-            "id": task.id,
-            "title": task.title,
-            "description": task.description, # Still needed for edit functionality
-            "status": task.status,
-            "get_status_display": task.get_status_display(),
-            "time_spent_hours": task.time_spent_hours,
-            "estimation_time_hours": task.estimation_time_hours,
-            "project_id": task.project.id if task.project else None,
-            "project_name": task.project.name if task.project else None,
-            "user": {
-                "username": task.user.username,
-                "profile_picture_url": profile_picture_url
-            }
-        })
-
-    return JsonResponse(tasks_data, safe=False)
+        if not user_projects.filter(id=project_id_filter).exists():
+            return None
+        tasks_query = tasks_query.filter(project_id=project_id_filter)
+    return tasks_query
+
+
+def _serialize_kanban_tasks(tasks):
+    # One cached lookup for every avatar on the board instead of a profile
+    # join and a storage call per card.
+    avatar_urls = get_avatar_urls({task.user_id for task in tasks})
+    return [{
+        "id": task.id,
+        "title": task.title,
+        "description": task.description, # Still needed for edit functionality
+        "status": task.status,
+        "get_status_display": task.get_status_display(),
+        "time_spent_hours": task.time_spent_hours,
+        "estimation_time_hours": task.estimation_time_hours,
+        "project_id": task.project.id if task.project else None,
+        "project_name": task.project.name if task.project else None,
+        "updated_at": task.updated_at,
+        "user": {
+            "username": task.user.username,
+            "profile_picture_url": avatar_urls[task.user_id]
+        }
+    } for task in tasks]
+
+
+@login_required
+def api_get_kanban_tasks(request):
+    """
+    API endpoint to fetch all tasks for projects the logged-in user is part of (owner or member),
+    formatted for the Kanban board.
+    """
+    tasks_query = _kanban_tasks_queryset(request.user, request.GET.get('project_id'))
+    if tasks_query is None:
+        return FastJsonResponse([], safe=False)
+    tasks = list(tasks_query.order_by('position', 'id'))
+    return FastJsonResponse(_serialize_kanban_tasks(tasks), safe=False)
+
+
+KANBAN_COLUMN_LIMIT = 20
+KANBAN_COLUMN_MAX_LIMIT = 100
+
+
+def _encode_kanban_cursor(task):
+    raw = f'{task.position}|{task.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_kanban_cursor(cursor):
+    position, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return position, int(task_id)
+
+
+def _kanban_column_page(tasks_query, status, limit, cursor=None):
+    """
+    One page of a Kanban column, in board order (see users/positions.py).
+    Pages are keyset-paginated on (position, id), so deep pages cost the
+    same as the first one.
+    """
+    column = tasks_query.filter(status=status).order_by('position', 'id')
+    if cursor:
+        position, task_id = _decode_kanban_cursor(cursor)
+        column = column.filter(Q(position__gt=position) | Q(position=position, id__gt=task_id))
+    tasks = list(column[:limit + 1])
+    next_cursor = _encode_kanban_cursor(tasks[limit - 1]) if len(tasks) > limit else None
+    return tasks[:limit], next_cursor
+
+
+def _kanban_limit(request):
+    try:
+        limit = int(request.GET.get('limit', KANBAN_COLUMN_LIMIT))
+    except ValueError:
+        limit = KANBAN_COLUMN_LIMIT
+    return max(1, min(limit, KANBAN_COLUMN_MAX_LIMIT))
 
 
+@login_required
+def api_kanban_columns(request):
+    """
+    Initial Kanban board load: the card count of every status column from one
+    GROUP BY, plus the first ``limit`` cards of each column and a cursor for
+    loading the rest with api_kanban_column.
+    """
+    limit = _kanban_limit(request)
+    tasks_query = _kanban_tasks_queryset(request.user, request.GET.get('project_id'))
+    columns = {}
+    counts = {}
+    if tasks_query is not None:
+        counts = dict(tasks_query.order_by().values_list('status').annotate(count=Count('id')))
+    for status, _display in TodoItem.STATUS_CHOICES:
+        count = counts.get(status, 0)
+        tasks, next_cursor = _kanban_column_page(tasks_query, status, limit) if count else ([], None)
+        columns[status] = {
+            'count': count,
+            'tasks': _serialize_kanban_tasks(tasks),
+            'next_cursor': next_cursor,
+        }
+    return FastJsonResponse({'columns': columns})
+
+
+@login_required
+def api_kanban_column(request, status):
+    """Next page of one Kanban column, continuing from ``?cursor=``."""
+    if status not in dict(TodoItem.STATUS_CHOICES):
+        return FastJsonResponse({'error': 'Unknown status.'}, status=404)
+    tasks_query = _kanban_tasks_queryset(request.user, request.GET.get('project_id'))
+    if tasks_query is None:
+        return FastJsonResponse({'tasks': [], 'next_cursor': None})
+    try:
+        tasks, next_cursor = _kanban_column_page(tasks_query, status, _kanban_limit(request), request.GET.get('cursor'))
+    except (ValueError, UnicodeDecodeError):
+        return FastJsonResponse({'error': 'Invalid cursor.'}, status=400)
+    return FastJsonResponse({'tasks': _serialize_kanban_tasks(tasks), 'next_cursor': next_cursor})
+
+
+@login_required
+@require_http_methods(['POST', 'PATCH'])
+def api_kanban_move_task(request, task_id):
+    """
+    Drag-and-drop move. The JSON body names the target ``status`` and the
+    cards the task was dropped between (``before_id``/``after_id``, null at
+    either end of the column). The task gets a rank between theirs, so only
+    its own row is written. Like inline_edit_todo, a body with ``updated_at``
+    only applies if the task hasn't been saved since (409 otherwise).
+    """
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return FastJsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+    if not isinstance(data, dict):
+        return FastJsonResponse({'success': False, 'error': 'Invalid JSON.'}, status=400)
+    identities = identity_map(request)
+
+    with transaction.atomic():
+        todo = get_object_or_404(TodoItem.objects.select_for_update(), id=task_id, user=request.user)
+        conflict = _updated_at_conflict(data, todo, identities)
+        if conflict is not None:
+            return conflict
+
+        status = data.get('status', todo.status)
+        if status not in dict(TodoItem.STATUS_CHOICES):
+            return FastJsonResponse({'success': False, 'error': 'Unknown status.'}, status=400)
+        try:
+            neighbour_ids = {key: int(data[key]) for key in ('before_id', 'after_id') if data.get(key) not in (None, '')}
+        except (TypeError, ValueError):
+            return FastJsonResponse({'success': False, 'error': 'Invalid neighbour id.'}, status=400)
+        # Neighbours have to be in the column the task is dropped into.
+        ranks = dict(positions.column(todo.project_id, status).exclude(id=todo.id).filter(
+            id__in=neighbour_ids.values()).values_list('id', 'position'))
+        if any(neighbour_id not in ranks for neighbour_id in neighbour_ids.values()):
+            return FastJsonResponse({'success': False, 'error': 'Neighbour task not found in the target column.'}, status=400)
+        neighbours = {key: (neighbour_id, ranks[neighbour_id]) for key, neighbour_id in neighbour_ids.items()}
+        if 'before_id' in neighbours and 'after_id' in neighbours and neighbours['before_id'][1] > neighbours['after_id'][1]:
+            return FastJsonResponse({'success': False, 'error': 'before_id must come before after_id.'}, status=400)
+
+        todo.position = positions.position_between(
+            todo.project_id, status, neighbours.get('before_id'), neighbours.get('after_id'),
+        )
+        changed = ['position'] + (['status'] if todo.status != status else [])
+        todo.status = status
+        todo.save(update_fields=changed + ['updated_at'])
+
+    return FastJsonResponse({'success': True, 'todo': _inline_todo_data(todo, identities.related(todo, 'project'))})
+
 class ProjectListView(LoginRequiredMixin, ListView):
     model = Project
     template_name = 'projects/project_list.html'  # Specify your template name
@@ -644,17 +811,27 @@ class ProjectListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         # Filter projects to only those the current user is a member of
-        return Project.objects.filter(members=self.request.user).order_by('name')
+        # Owner and counters come along in the same query (see ProjectStats).
+        return Project.objects.filter(members=self.request.user).select_related('owner', 'stats').order_by('name')
 
 class ProjectDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     model = Project
     template_name = 'projects/project_detail.html'  # Specify your template name
     context_object_name = 'project'
+    queryset = Project.objects.select_related('owner__profile')
+    tasks_per_page = 50
+
+    def get_object(self, queryset=None):
+        # test_func and get() both ask for the project; fetch it only once.
+        if not hasattr(self, '_project'):
+            self._project = super().get_object(queryset)
+        return self._project
 
     def test_func(self):
         project = self.get_object()
+        user = self.request.user
         # Allow access if the user is the owner OR a member of the project
-        return self.request.user == project.owner or self.request.user in project.members.all()
+        return user.id == project.owner_id or ProjectMembership.objects.filter(project=project, user=user).exists()
 
     def handle_no_permission(self):
         if not self.request.user.is_authenticated:
@@ -668,11 +845,34 @@ class ProjectDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        project = self.get_object()
+        project = self.object
         # Add members to context
-        context['members'] = project.members.all().select_related('profile')
-        # Add tasks associated with this project to the context
-        context['tasks'] = TodoItem.objects.filter(project=project).order_by('status', 'created_at')
+        context['members'] = list(project.members.all().select_related('profile'))
+
+        # Per-status counts for the whole project from one aggregate query
+        project_tasks = TodoItem.objects.filter(project=project)
+        counts = project_tasks.aggregate(
+            total=Count('id'),
+            **{value: Count('id', filter=Q(status=value)) for value, _display in TodoItem.STATUS_CHOICES}
+        )
+        context['task_total'] = counts['total']
+        context['status_counts'] = [
+            {'value': value, 'display': display, 'count': counts[value]}
+            for value, display in TodoItem.STATUS_CHOICES
+        ]
+
+        # Tasks associated with this project, one status and page at a time
+        status_filter = self.request.GET.get('status', '')
+        if status_filter not in dict(TodoItem.STATUS_CHOICES):
+            status_filter = ''
+        if status_filter:
+            project_tasks = project_tasks.filter(status=status_filter)
+        paginator = Paginator(project_tasks.select_related('user').order_by('status', 'created_at'), self.tasks_per_page)
+        paginator.count = counts[status_filter or 'total'] # Already known; skip the paginator's COUNT(*)
+        page_obj = paginator.get_page(self.request.GET.get('page'))
+        context['page_obj'] = page_obj
+        context['tasks'] = page_obj.object_list
+        context['selected_status'] = status_filter
         return context
 
 
@@ -684,43 +884,10 @@ def ds_board_updated_view(request):
     return render(request, 'users/ds_board_updated.html')
 
 
-from datetime import timedelta
-
 @login_required
 def project_summary_view(request, project_id):
     project = get_object_or_404(Project, id=project_id)
-    members = project.members.all()
-
-    today = date.today()
-    yesterday = today - timedelta(days=1)
-
-    summary_data = []
-    for member in members:
-        yesterday_logs = TodoLog.objects.filter(todo_item__user=member, todo_item__project=project, task_date=yesterday)
-        today_logs = TodoLog.objects.filter(todo_item__user=member, todo_item__project=project, task_date=today)
-
-        total_yesterday = yesterday_logs.aggregate(Sum('log_time'))['log_time__sum'] or 0
-        total_today = today_logs.aggregate(Sum('log_time'))['log_time__sum'] or 0
-
-        yesterday_tasks = {}
-        for log in yesterday_logs:
-            if log.todo_item.title not in yesterday_tasks:
-                yesterday_tasks[log.todo_item.title] = 0
-            yesterday_tasks[log.todo_item.title] += log.log_time
-
-        today_tasks = {}
-        for log in today_logs:
-            if log.todo_item.title not in today_tasks:
-                today_tasks[log.todo_item.title] = 0
-            today_tasks[log.todo_item.title] += log.log_time
-
-        summary_data.append({
-            'member': member,
-            'total_yesterday': total_yesterday,
-            'total_today': total_today,
-            'yesterday_tasks': yesterday_tasks,
-            'today_tasks': today_tasks,
-        })
+    summary_data = project_summary_data(project) # Served from the standup digests
 
     context = {
         'project': project,
@@ -731,8 +898,61 @@ def project_summary_view(request, project_id):
 
 @login_required
 def project_summary_list_view(request):
-    projects = Project.objects.filter(members=request.user)
+    projects = Project.objects.filter(members=request.user).select_related('stats')
     context = {
         'projects': projects,
     }
     return render(request, 'users/project_summary_list.html', context)
+
+
+@staff_member_required
+def analytics_report_view(request):
+    try:
+        project_id = int(request.GET['project']) if request.GET.get('project') else None
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+    except ValueError:
+        project_id = start = end = None
+    if start and end and start > end:
+        start, end = end, start
+
+    # Loaded on first use: analytics pulls in NumPy when it is installed,
+    # which would otherwise cost every process at startup.
+    from .analytics import analytics_report
+
+    report = analytics_report(project_id=project_id, start=start, end=end)
+    # Weekly samples keep the burn-down table readable over long ranges.
+    burn_down = report['burn_down'][::7]
+    if report['burn_down'] and burn_down[-1] is not report['burn_down'][-1]:
+        burn_down.append(report['burn_down'][-1])
+    velocity_rows = [
+        {**row, 'weeks': list(zip(row['completed'], row['logged']))}
+        for row in report['velocity']['users']
+    ]
+    return render(request, 'users/analytics_report.html', {
+        'report': report,
+        'burn_down': burn_down,
+        'velocity_rows': velocity_rows,
+        'projects': Project.objects.order_by('name').only('id', 'name'),
+        'selected_project_id': project_id,
+    })
+
+
+@staff_member_required
+def import_tasks_view(request):
+    """Upload a tasks file (and optional logs CSV) and import it in the background."""
+    context = {}
+    if request.method == 'POST':
+        tasks_file = request.FILES.get('tasks_file')
+        logs_file = request.FILES.get('logs_file')
+        if tasks_file is None:
+            context['error'] = 'Choose a tasks file to import.'
+        else:
+            params = {'create_projects': request.POST.get('create_projects')}
+            for key, upload in (('tasks', tasks_file), ('logs', logs_file)):
+                if upload is not None:
+                    params[key] = default_storage.save(f'{jobs.IMPORT_UPLOAD_PREFIX}{upload.name}', upload)
+            job = jobs.enqueue('import_tasks', request.user, jobs.prepare_payload('import_tasks', request, params))
+            context['job'] = job
+            context['job_status_url'] = reverse('job_status_api', args=[job.id])
+    return render(request, 'users/import_tasks.html', context)